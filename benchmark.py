@@ -0,0 +1,259 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from table import Table
+import binary_module
+import csv_module
+import pickle_module
+import text_module
+
+# Замеры производительности операций Table и модулей ввода-вывода.
+#
+# Таблицы генерируются по зерну (--seed), поэтому прогоны воспроизводимы.
+# Для каждой операции меряется лучшее время из --repeat запусков и
+# пиковая память (tracemalloc, отдельным запуском - трассировка замедляет код).
+# Результат - JSON (в stdout или в --output) для сравнения между версиями.
+#
+#   python benchmark.py --rows 100000 --cols 8 --types int,float,str,bool --output base.json
+#   python benchmark.py --only csv_load,csv_save --storage columns
+
+TYPES = {"int": int, "float": float, "str": str, "bool": bool}
+
+_WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta",
+          "iota", "kappa", "lambda", "mu", "nu", "xi", "omicron", "pi"]
+
+
+def _value(rng, t):
+    if t is int:
+        return rng.randint(-1000000, 1000000)
+    if t is float:
+        return round(rng.uniform(-1000.0, 1000.0), 3)
+    if t is bool:
+        return rng.random() < 0.5
+    return rng.choice(_WORDS) + str(rng.randint(0, 999))
+
+
+def make_rows(nrows, types, seed):
+    # Случайные строки со значениями типов types (по столбцам)
+    rng = random.Random(seed)
+    return [[_value(rng, t) for t in types] for _ in range(nrows)]
+
+
+class SkipBenchmark(Exception):
+    # Замер неприменим к заданному набору столбцов
+    pass
+
+
+class Bench:
+    # Общие входные данные для всех замеров
+    def __init__(self, nrows, ncols, type_mix, storage, seed, workdir):
+        self.types = [TYPES[type_mix[i % len(type_mix)]] for i in range(ncols)]
+        self.columns = [f"c{i}_{t.__name__}" for i, t in enumerate(self.types)]
+        self.type_dict = dict(zip(self.columns, self.types))
+        self.storage = storage
+        self.rows = make_rows(nrows, self.types, seed)
+        self.text_rows = [[str(v) for v in row] for row in self.rows]
+        self.workdir = workdir
+        self.int_column = next((c for c, t in self.type_dict.items() if t is int), None)
+
+    def path(self, name):
+        return os.path.join(self.workdir, name)
+
+    def table(self):
+        return Table(columns=list(self.columns), data=[list(r) for r in self.rows],
+                     types=dict(self.type_dict), storage=self.storage)
+
+    def text_table(self):
+        return Table(columns=list(self.columns), data=[list(r) for r in self.text_rows], storage=self.storage)
+
+
+# Замеры: имя -> функция(bench), возвращающая (подготовка, замеряемая операция).
+# Подготовка выполняется перед каждым запуском и не входит в замер.
+
+def _construct(b):
+    return None, lambda _: b.table()
+
+
+def _detect_types(b):
+    return b.text_table, lambda t: t.detect_column_types()
+
+
+def _set_types(b):
+    return b.text_table, lambda t: t.set_column_types(dict(b.type_dict), by_number=False)
+
+
+def _compare_filter(b):
+    if b.int_column is None:
+        raise SkipBenchmark("нужен столбец типа int")
+    return b.table, lambda t: t.filter_rows(t.gr(0, b.int_column))
+
+
+def _concat(b):
+    return lambda: (b.table(), b.table()), lambda ts: Table.concat(*ts)
+
+
+def _split(b):
+    return b.table, lambda t: t.split(t.num_rows // 2)
+
+
+def _merge_by_number(b):
+    def setup():
+        t1 = b.table()
+        t2 = Table(columns=[c + "_r" for c in b.columns], data=[list(r) for r in b.rows],
+                   types={c + "_r": t for c, t in b.type_dict.items()}, storage=b.storage)
+        return t1, t2
+    return setup, lambda ts: Table.merge_tables(*ts, by_number=True)
+
+
+def _merge_by_index(b):
+    def setup():
+        # первый столбец - уникальный ключ, во второй таблице строки в обратном порядке
+        n = len(b.rows)
+        t1 = Table(columns=["key"] + b.columns, data=[[i] + list(r) for i, r in enumerate(b.rows)],
+                   types=dict(b.type_dict, key=int), storage=b.storage)
+        t2 = Table(columns=["key", "extra"], data=[[i, i * 2] for i in range(n - 1, -1, -1)],
+                   types={"key": int, "extra": int}, storage=b.storage)
+        return t1, t2
+    return setup, lambda ts: Table.merge_tables(*ts, by_number=False)
+
+
+def _csv_save(b):
+    return b.table, lambda t: csv_module.save_table(t, b.path("bench.csv"))
+
+
+def _csv_load(b):
+    csv_module.save_table(b.table(), b.path("bench_in.csv"))
+    return None, lambda _: csv_module.load_table(b.path("bench_in.csv"), types=dict(b.type_dict),
+                                                 storage=b.storage)
+
+
+def _pickle_save(b):
+    return b.table, lambda t: pickle_module.save_table(t, b.path("bench.pkl"))
+
+
+def _pickle_load(b):
+    pickle_module.save_table(b.table(), b.path("bench_in.pkl"))
+    return None, lambda _: pickle_module.load_table(b.path("bench_in.pkl"), storage=b.storage)
+
+
+def _text_save(b):
+    return b.table, lambda t: text_module.save_table(t, b.path("bench.txt"))
+
+
+def _binary_save(b):
+    return b.table, lambda t: binary_module.save_table(t, b.path("bench.mytb"))
+
+
+def _binary_load(b):
+    binary_module.save_table(b.table(), b.path("bench_in.mytb"))
+    return None, lambda _: binary_module.load_table(b.path("bench_in.mytb"), storage=b.storage)
+
+
+BENCHMARKS = {
+    "construct": _construct,
+    "detect_column_types": _detect_types,
+    "set_column_types": _set_types,
+    "compare_filter": _compare_filter,
+    "concat": _concat,
+    "split": _split,
+    "merge_by_number": _merge_by_number,
+    "merge_by_index": _merge_by_index,
+    "csv_save": _csv_save,
+    "csv_load": _csv_load,
+    "pickle_save": _pickle_save,
+    "pickle_load": _pickle_load,
+    "text_save": _text_save,
+    "binary_save": _binary_save,
+    "binary_load": _binary_load,
+}
+
+
+def run_one(bench, name, repeat):
+    setup, func = BENCHMARKS[name](bench)
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        gc.collect()
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+        del arg
+
+    # пиковая память - отдельным запуском, считается только сама операция
+    arg = setup() if setup is not None else None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"name": name, "seconds": min(times), "seconds_all": times, "peak_bytes": peak}
+
+
+def run(names, nrows, ncols, type_mix, storage="rows", repeat=3, seed=0):
+    with tempfile.TemporaryDirectory() as workdir:
+        bench = Bench(nrows, ncols, type_mix, storage, seed, workdir)
+        results = []
+        for name in names:
+            try:
+                results.append(run_one(bench, name, repeat))
+            except SkipBenchmark as e:
+                results.append({"name": name, "skipped": str(e)})
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "rows": nrows,
+            "cols": ncols,
+            "types": type_mix,
+            "storage": storage,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности Table")
+    parser.add_argument("--rows", type=int, default=100000, help="число строк")
+    parser.add_argument("--cols", type=int, default=6, help="число столбцов")
+    parser.add_argument("--types", default="int,float,str,bool",
+                        help="типы столбцов по кругу, через запятую (int, float, str, bool)")
+    parser.add_argument("--storage", choices=("rows", "columns"), default="rows")
+    parser.add_argument("--repeat", type=int, default=3, help="число запусков каждой операции")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", help="только эти замеры, через запятую")
+    parser.add_argument("--output", help="файл для JSON (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    type_mix = [s.strip() for s in args.types.split(",") if s.strip()]
+    unknown = [s for s in type_mix if s not in TYPES]
+    if not type_mix or unknown:
+        parser.error(f"неизвестные типы: {unknown}")
+    names = list(BENCHMARKS) if not args.only else [s.strip() for s in args.only.split(",")]
+    unknown = [s for s in names if s not in BENCHMARKS]
+    if unknown:
+        parser.error(f"неизвестные замеры: {unknown}; доступны: {', '.join(BENCHMARKS)}")
+
+    report = run(names, args.rows, args.cols, type_mix, args.storage, args.repeat, args.seed)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import bz2
+import importlib
+import json
+import lzma
+import mmap
+import pickle
+import struct
+import sys
+import zlib
+from array import array
+from table import Table
+from profiling import instrumented
+from storage import ColumnStore
+from columns import Column, IntColumn, FloatColumn, BoolColumn, StrColumn, DictColumn, concat_columns, make_column
+from exceptions import StructureMismatchError, TableException
+from stats import _min_max, decide
+
+# Бинарный поколоночный формат таблицы.
+#
+# Файл: MAGIC(4) VERSION(1) выравнивание(3) | блоки данных | заголовок JSON | длина заголовка (uint64) | MAGIC
+#
+# Строки таблицы разбиты на группы по block_rows строк, в каждой группе -
+# по одному блоку на столбец. Заголовок хранит имена и типы столбцов и для
+# каждого блока - вид данных, кодек сжатия, смещение и размер в файле.
+# Несжатые блоки выровнены по 8 байт и при загрузке через mmap используются
+# как буферы столбцов напрямую, без разбора.
+#
+# Виды блоков:
+#   int   - array('q'), float - array('d'), bool - по байту 0/1,
+#   str   - смещения array('q') (n + 1 значение) и следом байты utf-8,
+#   dict  - номера значений array('i') и следом python-список различных значений
+#           (словарный столбец, тип Category),
+#   pickle - python-список значений (для столбцов произвольных типов и с None)
+#
+# Для каждого блока в заголовке хранится зона (zone map): min, max и число None
+# значений блока (min/max - только для чисел, строк и bool). Загрузка с условием
+# where пропускает группы, в которых условие заведомо не выполняется.
+
+MAGIC = b"MYTB"
+VERSION = 1
+
+CODECS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "bz2": (bz2.compress, bz2.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+_BUILTIN_TYPES = {"int": int, "float": float, "bool": bool, "str": str}
+
+# Операции сравнения в условиях where (имена методов Table)
+WHERE_OPS = ("eq", "ne", "gr", "ge", "ls", "le")
+
+_ZONE_TYPES = (int, float, str, bool)
+
+
+def _type_name(t):
+    if t in (int, float, bool, str):
+        return t.__name__
+    return f"{t.__module__}:{t.__qualname__}"
+
+
+def _type_from_name(name):
+    if name in _BUILTIN_TYPES:
+        return _BUILTIN_TYPES[name]
+    module, _, qualname = name.partition(":")
+    obj = importlib.import_module(module)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _encode_column(col):
+    # -> (вид блока, байты, доп. сведения для заголовка)
+    if isinstance(col, IntColumn):
+        return "int", col.values.tobytes(), {}
+    if isinstance(col, FloatColumn):
+        return "float", col.values.tobytes(), {}
+    if isinstance(col, BoolColumn):
+        return "bool", bytes(col.values), {}
+    if isinstance(col, StrColumn):
+        offsets = col.offsets.tobytes()
+        return "str", offsets + bytes(col.pool), {"offsets_size": len(offsets)}
+    if isinstance(col, DictColumn):
+        codes = col.codes.tobytes()
+        dictionary = pickle.dumps(col.dictionary, protocol=pickle.HIGHEST_PROTOCOL)
+        return "dict", codes + dictionary, {"codes_size": len(codes)}
+    return "pickle", pickle.dumps(col.tolist(), protocol=pickle.HIGHEST_PROTOCOL), {}
+
+
+def _decode_column(kind, buf, info, swap):
+    # buf - bytes или memoryview над mmap; для несжатых блоков без
+    # перестановки байтов столбец ссылается прямо на buf
+    if kind == "pickle":
+        return Column(pickle.loads(buf))
+    if kind == "bool":
+        return BoolColumn(buf)
+    if kind in ("int", "float"):
+        cls = IntColumn if kind == "int" else FloatColumn
+        if swap:
+            values = array(cls.typecode)
+            values.frombytes(buf)
+            values.byteswap()
+            return cls(values)
+        if isinstance(buf, memoryview):
+            return cls(buf.cast(cls.typecode))
+        values = array(cls.typecode)
+        values.frombytes(buf)
+        return cls(values)
+    if kind == "str":
+        size = info["offsets_size"]
+        offsets, pool = buf[:size], buf[size:]
+        if swap or not isinstance(buf, memoryview):
+            arr = array('q')
+            arr.frombytes(offsets)
+            if swap:
+                arr.byteswap()
+            return StrColumn(offsets=arr, pool=bytearray(pool))
+        return StrColumn(offsets=offsets.cast('q'), pool=pool)
+    if kind == "dict":
+        size = info["codes_size"]
+        codes, dictionary = buf[:size], pickle.loads(buf[size:])
+        if swap or not isinstance(buf, memoryview):
+            arr = array(DictColumn.typecode)
+            arr.frombytes(codes)
+            if swap:
+                arr.byteswap()
+            return DictColumn(codes=arr, dictionary=dictionary)
+        return DictColumn(codes=codes.cast(DictColumn.typecode), dictionary=dictionary)
+    raise TableException(f"Неизвестный вид блока {kind}")
+
+
+def _zone(col):
+    # -> {"min", "max", "nulls"} для блока; min/max значений других типов
+    # (их не сохранить в JSON без потерь) не сохраняются
+    vmin, vmax, nulls = _min_max(list(col))
+    zone = {"nulls": nulls}
+    if type(vmin) in _ZONE_TYPES and type(vmax) in _ZONE_TYPES:
+        zone["min"], zone["max"] = vmin, vmax
+    return zone
+
+
+def _group_matches(group, where, all_columns):
+    # False, если по зонам блоков группы условие where заведомо не выполняется
+    for col_name, op, value in where:
+        zone = group["blocks"][all_columns.index(col_name)]
+        if "min" in zone and decide(op, value, zone["min"], zone["max"], zone["nulls"]) is False:
+            return False
+    return True
+
+
+@instrumented("binary_module.save_table", io="write")
+def save_table(table, file_path, compression=None, block_rows=None, level=None):
+    # compression - None или имя кодека из CODECS (сжимается каждый блок отдельно)
+    # block_rows - число строк в группе (по умолчанию вся таблица - одна группа);
+    #   группы позволяют читать диапазон строк, не трогая остальные блоки
+    if compression is not None and compression not in CODECS:
+        raise TableException(f"Неизвестный кодек {compression}")
+    store = table._store
+    n = store.nrows()
+    cols = []
+    for j, c in enumerate(table.columns):
+        col = store.column(j)
+        if not isinstance(col, Column):
+            col = make_column(table.types[c], col)
+        cols.append(col)
+    if not block_rows:
+        block_rows = max(n, 1)
+
+    groups = []
+    with open(file_path, 'wb') as f:
+        f.write(MAGIC + bytes([VERSION]) + b"\0" * 3)
+        pos = 8
+        for start in range(0, max(n, 1), block_rows):
+            stop = min(start + block_rows, n)
+            blocks = []
+            for col in cols:
+                part = col.slice(start, stop)
+                kind, raw, info = _encode_column(part)
+                codec = None
+                if compression is not None:
+                    compress = CODECS[compression][0]
+                    raw = compress(raw) if level is None else compress(raw, level)
+                    codec = compression
+                pad = -len(raw) % 8
+                f.write(raw + b"\0" * pad)
+                blocks.append(dict(info, kind=kind, codec=codec, offset=pos, size=len(raw), **_zone(part)))
+                pos += len(raw) + pad
+            groups.append({"start": start, "nrows": stop - start, "blocks": blocks})
+
+        header = {
+            "columns": table.columns,
+            "types": [_type_name(table.types[c]) for c in table.columns],
+            "nrows": n,
+            "byteorder": sys.byteorder,
+            "groups": groups,
+        }
+        raw_header = json.dumps(header).encode('utf-8')
+        f.write(raw_header + struct.pack("<Q", len(raw_header)) + MAGIC)
+
+
+def read_header(file_path):
+    with open(file_path, 'rb') as f:
+        return _read_header(f)
+
+
+def _read_header(f):
+    if f.read(5)[:4] != MAGIC:
+        raise StructureMismatchError("Файл не является бинарной таблицей")
+    f.seek(-12, 2)
+    tail = f.read(12)
+    if tail[8:] != MAGIC:
+        raise StructureMismatchError("Файл бинарной таблицы поврежден")
+    (size,) = struct.unpack("<Q", tail[:8])
+    f.seek(-12 - size, 2)
+    return json.loads(f.read(size).decode('utf-8'))
+
+
+def _load_one(file_path, columns, rows, use_mmap, where):
+    with open(file_path, 'rb') as f:
+        header = _read_header(f)
+        all_columns = header["columns"]
+        if columns is None:
+            columns = list(all_columns)
+        # столбцы условий, которых нет среди columns, читаются по одному разу
+        wanted = list(columns)
+        for c, _, _ in where:
+            if c not in wanted:
+                wanted.append(c)
+        missing = [c for c in wanted if c not in all_columns]
+        if missing:
+            raise StructureMismatchError(f"Столбцы {missing} не найдены в файле")
+        selected = [all_columns.index(c) for c in wanted]
+
+        n = header["nrows"]
+        start, stop = (0, n) if rows is None else rows
+        start, stop = max(0, start), min(n, stop)
+        stop = max(start, stop)
+        swap = header["byteorder"] != sys.byteorder
+
+        buf = None
+        if use_mmap and n:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            buf = memoryview(mm)
+
+        parts = [[] for _ in selected]
+        nrows = 0
+        for group in header["groups"]:
+            g_start, g_stop = group["start"], group["start"] + group["nrows"]
+            # группы вне диапазона строк и группы, где условие не выполнится, не читаются
+            if g_stop <= start or g_start >= stop or not _group_matches(group, where, all_columns):
+                continue
+            nrows += min(stop, g_stop) - max(start, g_start)
+            for k, j in enumerate(selected):
+                block = group["blocks"][j]
+                if buf is not None:
+                    raw = buf[block["offset"]:block["offset"] + block["size"]]
+                else:
+                    f.seek(block["offset"])
+                    raw = f.read(block["size"])
+                if block["codec"] is not None:
+                    raw = CODECS[block["codec"]][1](raw)
+                col = _decode_column(block["kind"], raw, block, swap)
+                lo, hi = max(start, g_start) - g_start, min(stop, g_stop) - g_start
+                if lo or hi != group["nrows"]:
+                    col = col.slice(lo, hi)
+                parts[k].append(col)
+
+    names = [all_columns[j] for j in selected]
+    types = {all_columns[j]: _type_from_name(header["types"][j]) for j in selected}
+    cols = [concat_columns(p, types[c]) for p, c in zip(parts, names)]
+    table = Table._from_store(names, ColumnStore(cols, nrows), types)
+    if not where:
+        return table
+
+    # точная проверка условия в прочитанных группах
+    mask = None
+    for col_name, op, value in where:
+        m = getattr(table, op)(value, col_name)
+        mask = m if mask is None else mask & m
+    table = table.filter_rows(mask)
+    return table if names == columns else table.select(*columns)
+
+
+@instrumented("binary_module.load_table", io="read")
+def load_table(*files, columns=None, rows=None, use_mmap=True, storage="columns", detect_types=False,
+               where=None):
+    # columns - список имен столбцов, которые нужно прочитать (по умолчанию все)
+    # rows - диапазон строк (start, stop) внутри каждого файла
+    # where - условие отбора строк: список (столбец, операция, значение),
+    #   операции - WHERE_OPS, условия объединяются через "и"
+    # use_mmap - отображать файл в память; несжатые блоки не копируются
+    #   до первой записи в столбец
+    where = list(where or ())
+    for _, op, _ in where:
+        if op not in WHERE_OPS:
+            raise TableException(f"Неизвестная операция сравнения {op}")
+    tables = [_load_one(f, columns, rows, use_mmap, where) for f in files]
+
+    if not tables:
+        raise StructureMismatchError("Не удалось загрузить ни одной таблицы")
+
+    # Проверим структуру
+    for t in tables[1:]:
+        if t.columns != tables[0].columns:
+            raise StructureMismatchError("Структура столбцов не совпадает в разных файлах")
+        for c in t.columns:
+            if t.types[c] != tables[0].types[c]:
+                raise StructureMismatchError("Типы столбцов не совпадают в разных файлах")
+
+    # Объединим в первую таблицу без промежуточных копий
+    res = tables[0]
+    for t in tables[1:]:
+        res._writable_store().extend(t._store)
+
+    if storage != "columns":
+        res.set_storage(storage)
+
+    if detect_types:
+        res.detect_column_types()
+
+    return res
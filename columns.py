@@ -0,0 +1,434 @@
+from array import array
+from copy import deepcopy
+from itertools import accumulate
+
+
+class Column:
+    # Столбец общего вида: значения хранятся в обычном python-списке.
+    # Используется для произвольных типов и как запасной вариант,
+    # когда значения не помещаются в типизированный буфер.
+    type = None
+
+    def __init__(self, values=()):
+        self.values = list(values)
+
+    @classmethod
+    def accepts(cls, values):
+        # Можно ли без потерь сохранить значения в столбце этого класса
+        return True
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __getitem__(self, i):
+        # срез - список значений только из нужного диапазона
+        return self.values[i]
+
+    def __setitem__(self, i, value):
+        self.values[i] = value
+
+    def tolist(self):
+        return list(self.values)
+
+    def take(self, positions):
+        # Новый столбец из значений по указанным номерам строк
+        return type(self)(map(self.values.__getitem__, positions))
+
+    def slice(self, start, stop):
+        return type(self)(self.values[start:stop])
+
+    def extend(self, values):
+        self.values.extend(values)
+
+    def copy(self):
+        return Column(deepcopy(self.values))
+
+    def __getstate__(self):
+        # Буферы-memoryview (например, над mmap-файлом) не сериализуются -
+        # сохраняется их копия
+        state = dict(self.__dict__)
+        for k, v in state.items():
+            if isinstance(v, memoryview):
+                state[k] = bytearray(v) if v.format == 'B' else array(v.format, v)
+        return state
+
+
+class ArrayColumn(Column):
+    # Числовой столбец в непрерывном буфере array.
+    # Буфером может быть и memoryview того же формата (например, над mmap-файлом,
+    # см. binary_module.py): он копируется в array только при первой записи.
+    typecode = None
+    # типы значений, которые можно записать в буфер (int в float-столбце
+    # допустим, как и в convert.check_values, и хранится как float)
+    accepted = ()
+
+    def __init__(self, values=()):
+        if isinstance(values, array) and values.typecode == self.typecode:
+            self.values = values
+        elif isinstance(values, memoryview) and values.format == self.typecode:
+            self.values = values
+        else:
+            self.values = array(self.typecode, values)
+
+    def _writable(self):
+        if not isinstance(self.values, array):
+            self.values = array(self.typecode, self.values)
+
+    @classmethod
+    def accepts(cls, values):
+        return set(map(type, values)) <= cls.accepted
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.values[i].tolist()
+        return self.values[i]
+
+    def __setitem__(self, i, value):
+        if type(value) not in self.accepted:
+            raise TypeError("Значение не подходит для типизированного столбца")
+        self._writable()
+        self.values[i] = value
+
+    def tolist(self):
+        return self.values.tolist()
+
+    def take(self, positions):
+        return type(self)(array(self.typecode, map(self.values.__getitem__, positions)))
+
+    def slice(self, start, stop):
+        return type(self)(self.values[start:stop])
+
+    def extend(self, values):
+        self._writable()
+        if isinstance(values, ArrayColumn) and values.typecode == self.typecode:
+            other = values.values
+            if isinstance(other, array):
+                self.values.extend(other)
+            else:
+                self.values.frombytes(other.cast('B'))
+            return
+        values = list(values)
+        if not self.accepts(values):
+            raise TypeError("Значения не подходят для типизированного столбца")
+        self.values.extend(values)
+
+    def copy(self):
+        return type(self)(array(self.typecode, self.values))
+
+
+class IntColumn(ArrayColumn):
+    type = int
+    typecode = 'q'
+    accepted = {int}
+
+
+class FloatColumn(ArrayColumn):
+    type = float
+    typecode = 'd'
+    accepted = {float, int}
+
+
+class BoolColumn(Column):
+    # Логический столбец: по одному байту 0/1 на значение
+    type = bool
+
+    def __init__(self, values=()):
+        if isinstance(values, (bytearray, memoryview)):
+            self.values = values
+        else:
+            self.values = bytearray(values)
+
+    def _writable(self):
+        if not isinstance(self.values, bytearray):
+            self.values = bytearray(self.values)
+
+    @classmethod
+    def accepts(cls, values):
+        return set(map(type, values)) <= {bool}
+
+    def __iter__(self):
+        return map(bool, self.values)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(map(bool, self.values[i]))
+        return bool(self.values[i])
+
+    def __setitem__(self, i, value):
+        if type(value) is not bool:
+            raise TypeError("Значение не подходит для логического столбца")
+        self._writable()
+        self.values[i] = value
+
+    def tolist(self):
+        return list(map(bool, self.values))
+
+    def take(self, positions):
+        return BoolColumn(bytearray(map(self.values.__getitem__, positions)))
+
+    def slice(self, start, stop):
+        return BoolColumn(self.values[start:stop])
+
+    def extend(self, values):
+        self._writable()
+        if isinstance(values, BoolColumn):
+            self.values.extend(values.values)
+            return
+        values = list(values)
+        if not self.accepts(values):
+            raise TypeError("Значения не подходят для логического столбца")
+        self.values.extend(values)
+
+    def copy(self):
+        return BoolColumn(bytearray(self.values))
+
+
+class StrColumn(Column):
+    # Строковый столбец: общий пул байтов utf-8 и массив смещений.
+    # Строка i занимает pool[offsets[i]:offsets[i + 1]].
+    # offsets и pool могут быть memoryview (только для чтения) - как в ArrayColumn.
+    type = str
+
+    def __init__(self, values=(), offsets=None, pool=None):
+        if offsets is not None:
+            self.offsets = offsets
+            self.pool = pool
+            return
+        encoded = [s.encode('utf-8') for s in values]
+        self.pool = bytearray(b"".join(encoded))
+        self.offsets = array('q', accumulate(map(len, encoded), initial=0))
+
+    @classmethod
+    def accepts(cls, values):
+        return set(map(type, values)) <= {str}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _writable(self):
+        if not isinstance(self.offsets, array):
+            self.offsets = array('q', self.offsets)
+        if not isinstance(self.pool, bytearray):
+            self.pool = bytearray(self.pool)
+
+    def _get(self, i):
+        return str(self.pool[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        offsets, pool = self.offsets, self.pool
+        for i in range(len(offsets) - 1):
+            yield str(pool[offsets[i]:offsets[i + 1]], 'utf-8')
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._get(k) for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not (0 <= i < len(self)):
+            raise IndexError("Индекс вне диапазона")
+        return self._get(i)
+
+    def __setitem__(self, i, value):
+        if type(value) is not str:
+            raise TypeError("Значение не подходит для строкового столбца")
+        if i < 0:
+            i += len(self)
+        self._writable()
+        raw = value.encode('utf-8')
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        self.pool[start:stop] = raw
+        delta = len(raw) - (stop - start)
+        if delta:
+            for k in range(i + 1, len(self.offsets)):
+                self.offsets[k] += delta
+
+    def tolist(self):
+        return list(self)
+
+    def _from_parts(self, parts):
+        offsets = array('q', accumulate(map(len, parts), initial=0))
+        return StrColumn(offsets=offsets, pool=bytearray(b"".join(parts)))
+
+    def take(self, positions):
+        offsets, pool = self.offsets, self.pool
+        return self._from_parts([pool[offsets[i]:offsets[i + 1]] for i in positions])
+
+    def slice(self, start, stop):
+        offsets = self.offsets[start:stop + 1]
+        base = offsets[0]
+        return StrColumn(offsets=array('q', (o - base for o in offsets)), pool=self.pool[base:offsets[-1]])
+
+    def extend(self, values):
+        self._writable()
+        if isinstance(values, StrColumn):
+            base = self.offsets[-1]
+            self.pool.extend(values.pool)
+            self.offsets.extend(o + base for o in values.offsets[1:])
+            return
+        values = list(values)
+        if not self.accepts(values):
+            raise TypeError("Значения не подходят для строкового столбца")
+        end = self.offsets[-1]
+        for s in values:
+            raw = s.encode('utf-8')
+            self.pool.extend(raw)
+            end += len(raw)
+            self.offsets.append(end)
+
+    def copy(self):
+        return StrColumn(offsets=array('q', self.offsets), pool=bytearray(self.pool))
+
+
+class Category:
+    # Тип столбца для строк с небольшим числом различных значений
+    # (статусы, коды стран): types={"status": Category}.
+    # Значения - обычные str (или None); поколоночно хранятся в DictColumn,
+    # построчно - как интернированные строки (одна строка на значение).
+    pass
+
+
+class DictColumn(Column):
+    # Словарный столбец: различные значения хранятся один раз в списке
+    # dictionary, а строки - номерами значений в нем (codes, array('i')).
+    # Сравнение на равенство и поиск сводятся к сравнению номеров.
+    # Столбцы, полученные take/slice, разделяют dictionary: в него только
+    # дописываются новые значения, поэтому номера в других столбцах остаются верными.
+    type = Category
+    typecode = 'i'
+
+    def __init__(self, values=(), codes=None, dictionary=None):
+        self._lookup = None
+        if codes is not None:
+            self.codes = codes
+            self.dictionary = dictionary
+            return
+        lookup = {}
+        self.codes = array(self.typecode, [lookup.setdefault(v, len(lookup)) for v in values])
+        self.dictionary = list(lookup)
+        self._lookup = lookup
+
+    @classmethod
+    def accepts(cls, values):
+        return set(map(type, values)) <= {str, type(None)}
+
+    def _writable(self):
+        if not isinstance(self.codes, array):
+            self.codes = array(self.typecode, self.codes)
+
+    def lookup(self):
+        # Словарь {значение: номер}; перестраивается, если dictionary
+        # пополнил другой столбец с тем же dictionary
+        if self._lookup is None or len(self._lookup) != len(self.dictionary):
+            self._lookup = {v: i for i, v in enumerate(self.dictionary)}
+        return self._lookup
+
+    def code(self, value):
+        # Номер значения в dictionary или None, если такого значения нет
+        try:
+            return self.lookup().get(value)
+        except TypeError:
+            # нехешируемое значение
+            return None
+
+    def _encode(self, value):
+        lookup = self.lookup()
+        c = lookup.get(value)
+        if c is None:
+            c = lookup[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        return c
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return map(self.dictionary.__getitem__, self.codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(map(self.dictionary.__getitem__, self.codes[i]))
+        return self.dictionary[self.codes[i]]
+
+    def __setitem__(self, i, value):
+        if value is not None and type(value) is not str:
+            raise TypeError("Значение не подходит для словарного столбца")
+        self._writable()
+        self.codes[i] = self._encode(value)
+
+    def tolist(self):
+        return list(self)
+
+    def take(self, positions):
+        return DictColumn(codes=array(self.typecode, map(self.codes.__getitem__, positions)),
+                          dictionary=self.dictionary)
+
+    def slice(self, start, stop):
+        return DictColumn(codes=array(self.typecode, self.codes[start:stop]), dictionary=self.dictionary)
+
+    def extend(self, values):
+        self._writable()
+        if isinstance(values, DictColumn):
+            if values.dictionary is self.dictionary:
+                self.codes.extend(array(self.typecode, values.codes))
+                return
+            # перенумерация: каждое значение другого словаря кодируется один раз
+            remap = [self._encode(v) for v in values.dictionary]
+            self.codes.extend(array(self.typecode, map(remap.__getitem__, values.codes)))
+            return
+        values = list(values)
+        if not self.accepts(values):
+            raise TypeError("Значения не подходят для словарного столбца")
+        self.codes.extend(array(self.typecode, map(self._encode, values)))
+
+    def copy(self):
+        return DictColumn(codes=array(self.typecode, self.codes), dictionary=list(self.dictionary))
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["_lookup"] = None
+        return state
+
+
+COLUMN_CLASSES = {
+    int: IntColumn,
+    float: FloatColumn,
+    bool: BoolColumn,
+    str: StrColumn,
+    Category: DictColumn,
+}
+
+
+def make_column(t, values):
+    # Создать столбец, наиболее компактный для типа t.
+    # Если значения не подходят под типизированный буфер
+    # (None, значения другого типа, слишком большие числа) -
+    # используем обычный столбец на списке.
+    if not isinstance(values, list):
+        values = list(values)
+    cls = COLUMN_CLASSES.get(t, Column)
+    if cls is not Column and cls.accepts(values):
+        try:
+            return cls(values)
+        except OverflowError:
+            pass
+    return Column(values)
+
+
+def concat_columns(parts, t=None):
+    # Один столбец из частей по порядку; части не меняются, единственная
+    # часть возвращается как есть. Если части несовместимы с типизированным
+    # буфером первой - столбец на обычном списке. Без частей - пустой столбец типа t.
+    if not parts:
+        return make_column(t, [])
+    if len(parts) == 1:
+        return parts[0]
+    col = parts[0].copy()
+    for part in parts[1:]:
+        try:
+            col.extend(part)
+        except TypeError:
+            col = Column(col.tolist() + part.tolist())
+    return col
@@ -0,0 +1,151 @@
+import functools
+import threading
+from contextlib import ExitStack, contextmanager
+from exceptions import TableException
+
+# Модель конкурентного доступа к Table.
+#
+# По умолчанию таблица не блокируется: одновременное чтение из многих потоков
+# безопасно, пока таблицу никто не меняет; изменение во время чтения может дать
+# несогласованный результат (например, set_values во время get_rows_by_index).
+#
+# Два способа разделять таблицу между потоками:
+#
+#   1. Блокировка читатель/писатель (Table.enable_locking()): методы, которые
+#      только читают, выполняются параллельно друг с другом, методы, которые
+#      меняют таблицу, - по одному и без читателей. Ожидающий писатель не
+#      пропускает вперед новых читателей. Блокировка повторно входимая
+#      (метод таблицы может вызывать другие ее методы).
+#
+#   2. Снимки (Table.snapshot()): неизменяемая по соглашению копия таблицы
+#      без копирования данных (copy-on-write) с номером версии (Table.version).
+#      Писатель меняет таблицу, читатели работают со снимком и берут новый,
+#      когда версия таблицы изменилась:
+#
+#          snap = shared.snapshot()
+#          ...
+#          if shared.version != snap.version:
+#              snap = shared.snapshot()
+#
+# Номер версии растет при каждом изменении таблицы через ее методы
+# (независимо от того, включена ли блокировка).
+# Прямые изменения данных в обход методов Table (t.data[i][j] = ...) блокировкой
+# не защищены и версию не меняют.
+
+
+class RWLock:
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def _read_depth(self):
+        return getattr(self._local, "depth", 0)
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        depth = self._read_depth()
+        if depth or self._writer == me:
+            # повторный вход в том же потоке
+            self._local.depth = depth + 1
+            return
+        with self._cond:
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        self._local.depth = 1
+
+    def release_read(self):
+        depth = self._read_depth() - 1
+        self._local.depth = depth
+        if depth or self._writer == threading.get_ident():
+            return
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if self._read_depth():
+                raise TableException("Нельзя изменять таблицу внутри чтения в том же потоке")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def reading(func):
+    # Декоратор метода Table, который только читает таблицу
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        lock = self._lock
+        if lock is None:
+            return func(self, *args, **kwargs)
+        with lock.read():
+            return func(self, *args, **kwargs)
+    return wrapper
+
+
+def writing(func):
+    # Декоратор метода Table, который меняет таблицу: исключительная
+    # блокировка и новый номер версии
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        lock = self._lock
+        if lock is None:
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                self._version += 1
+        with lock.write():
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                self._version += 1
+    return wrapper
+
+
+@contextmanager
+def read_locked(*tables):
+    # Блокировки на чтение нескольких таблиц (для операций над двумя таблицами).
+    # Берутся в одном порядке (по id), чтобы потоки не ждали друг друга по кругу.
+    with ExitStack() as stack:
+        for t in sorted({id(t): t for t in tables}.values(), key=id):
+            if t._lock is not None:
+                stack.enter_context(t._lock.read())
+        yield
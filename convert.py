@@ -0,0 +1,128 @@
+import sys
+from array import array
+from columns import Category, Column, FloatColumn, IntColumn
+from exceptions import TableException, TypeConversionError
+from inference import detector_for
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Пакетное преобразование столбцов к типу.
+# Функция преобразования выбирается один раз на столбец (converter_for),
+# затем весь столбец проходит через map без проверок на каждое значение.
+# Если какое-то значение не преобразуется, столбец проходится еще раз
+# поштучно, и все неудачные значения собираются вместе:
+#   errors="raise"   - TypeConversionError со списком всех неудач (failures)
+#   errors="null"    - неудачные значения заменяются на None
+#   errors="default" - заменяются на default
+#   errors="skip"    - строки с неудачными значениями удаляются из таблицы
+
+ERROR_POLICIES = ("raise", "null", "default", "skip")
+
+# Сколько неудачных значений показывать в тексте исключения
+_REPORT_LIMIT = 5
+
+# Значения каких типов, кроме самого t, допустимы в столбце типа t (check_values)
+_ACCEPTED = {float: (float, int), Category: str}
+
+
+def _to_bool(value):
+    # Считаем истиной непустую строку "True" и ненулевые числа
+    if isinstance(value, str):
+        return value.lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+def _to_category(value):
+    # Одинаковые значения - один объект строки (и в построчном хранилище)
+    return None if value is None else sys.intern(str(value))
+
+
+def converter_for(t):
+    # Функция преобразования одного значения к типу t (None - оставить как есть)
+    if t is int:
+        return int
+    if t is float:
+        return float
+    if t is bool:
+        return _to_bool
+    if t is str:
+        return str
+    if t is Category:
+        return _to_category
+    # Пользовательские типы - через зарегистрированный детектор (inference.py)
+    detector = detector_for(t)
+    if detector is not None:
+        return detector.convert
+    return None
+
+
+def _bulk(values, t):
+    # Быстрые пути без вызова функции на каждое значение (None - не подходит)
+    if isinstance(values, Column) and type(values).type is t:
+        # столбец уже нужного типа
+        return values
+    if isinstance(values, IntColumn) and t is float:
+        if np is not None:
+            src = np.asarray(values.values, dtype=np.int64)
+            return FloatColumn(array('d', src.astype(np.float64).tobytes()))
+        return FloatColumn(array('d', values.values))
+    return None
+
+
+def convert_values(values, t, errors="raise", default=None):
+    # -> (преобразованные значения, список (номер, значение) неудач).
+    # Для errors="skip" на месте неудачных значений остается None -
+    # строки удаляет вызывающий код по списку неудач.
+    if errors not in ERROR_POLICIES:
+        raise TableException(f"Неизвестный режим обработки ошибок {errors}")
+    bulk = _bulk(values, t)
+    if bulk is not None:
+        return bulk, []
+    convert = converter_for(t)
+    if convert is None:
+        return values, []
+    try:
+        return list(map(convert, values)), []
+    except (ValueError, TypeError, ArithmeticError):
+        pass
+
+    # есть неудачные значения - второй проход поштучно
+    result = []
+    failures = []
+    fill = default if errors == "default" else None
+    for i, v in enumerate(values):
+        try:
+            result.append(convert(v))
+        except (ValueError, TypeError, ArithmeticError):
+            failures.append((i, v))
+            result.append(fill)
+    if errors == "raise":
+        raise TypeConversionError(
+            f"Не удалось преобразовать {len(failures)} значений к типу {t} ({describe_failures(failures)})", failures)
+    return result, failures
+
+
+def check_values(values, t, start=0):
+    # Пакетная проверка без преобразования: список (номер, значение) значений,
+    # которые не являются значениями типа t (None допускается).
+    # start - номер первого значения (для сообщений об ошибках)
+    if all(type(v) is t for v in values):
+        return []
+    accepted = _ACCEPTED.get(t, t)
+    return [(start + i, v) for i, v in enumerate(values) if v is not None and not isinstance(v, accepted)]
+
+
+def _describe_failure(failure):
+    i, v = failure
+    return f"строка {i}: {v!r}"
+
+
+def describe_failures(failures, describe=_describe_failure):
+    # Первые _REPORT_LIMIT неудач текстом для сообщения исключения;
+    # describe - текст одной неудачи
+    shown = ", ".join(map(describe, failures[:_REPORT_LIMIT]))
+    more = f" и еще {len(failures) - _REPORT_LIMIT}" if len(failures) > _REPORT_LIMIT else ""
+    return shown + more
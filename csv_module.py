@@ -1,44 +1,468 @@
+import asyncio
+import codecs
 import csv
+import gzip
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from operator import itemgetter
 from table import Table
-from exceptions import StructureMismatchError
+from storage import ColumnStore, chunk_stores
+from columns import ArrayColumn, BoolColumn, StrColumn
+from profiling import instrumented
+from exceptions import StructureMismatchError, TableException
+from output import open_output
 
-def load_table(*files, detect_types=False):
-    # Загрузка CSV из нескольких файлов и объединение.
-    # Предполагается, что все имеют одинаковые столбцы.
-    tables = []
+# Размер куска (в строках) при потоковом чтении и записи по умолчанию
+CHUNK_ROWS = 65536
+
+# Буфер файла при записи
+WRITE_BUFFER = 1 << 20
+
+# Асинхронная загрузка: размер блока чтения и сколько прочитанных блоков
+# может ждать разбора (при записи - сколько кусков может ждать записи)
+READ_BYTES = 4 << 20
+PREFETCH = 4
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+# Байты, из-за которых значение нужно заключать в кавычки
+_SPECIAL = (b",", b'"', b"\r", b"\n")
+
+
+def _is_gzip(path):
+    with open(path, 'rb') as f:
+        return f.read(2) == _GZIP_MAGIC
+
+
+def _open_input(path):
+    # Файлы, сжатые gzip, распознаются по первым байтам
+    if _is_gzip(path):
+        return gzip.open(path, 'rt', newline='', encoding='utf-8')
+    return open(path, newline='', encoding='utf-8')
+
+
+def _apply_types(table, types):
+    # types - словарь {имя_столбца: тип} или {номер_столбца: тип}
+    by_number = all(isinstance(k, int) for k in types)
+    table.set_column_types(types, by_number=by_number)
+
+
+def _select_columns(header, columns, types):
+    # Номера выбранных столбцов в файле и типы только для них (по именам)
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise StructureMismatchError(f"Столбцы {missing} не найдены в файле")
+    keep = [header.index(c) for c in columns]
+    if types is not None:
+        if all(isinstance(k, int) for k in types):
+            types = {header[k]: t for k, t in types.items() if 0 <= k < len(header)}
+        types = {c: t for c, t in types.items() if c in columns}
+    return keep, types
+
+
+def _project(rows, keep):
+    # Оставить в строках только столбцы keep
+    if len(keep) == 1:
+        k = keep[0]
+        return [[row[k]] for row in rows]
+    return list(map(list, map(itemgetter(*keep), rows)))
+
+
+def iter_table_chunks(*files, chunk_rows=CHUNK_ROWS, detect_types=False, types=None, storage="rows",
+                      columns=None, rows=None):
+    # Потоковое чтение CSV: файлы читаются по очереди, и для каждого
+    # куска из chunk_rows строк отдается отдельная таблица.
+    # В памяти одновременно находится только текущий кусок.
+    # Типы либо задаются явно (types), либо определяются по каждому куску отдельно.
+    # columns - список имен столбцов, которые нужно оставить (по умолчанию все)
+    # rows - диапазон строк данных (start, stop) внутри каждого файла
+    if chunk_rows <= 0:
+        raise TableException("chunk_rows должен быть положительным")
+    file_columns = None
+    keep = None
     for f in files:
-        with open(f, newline='', encoding='utf-8') as csvfile:
+        with _open_input(f) as csvfile:
             reader = csv.reader(csvfile)
-            rows = list(reader)
-            if not rows:
+            header = next(reader, None)
+            if header is None:
                 raise StructureMismatchError("Файл пустой или некорректный")
-            columns = rows[0]
-            data = rows[1:]
-            t = Table(columns=columns, data=data)
-            tables.append(t)
+            if file_columns is None:
+                file_columns = header
+                out_columns = header
+                if columns is not None:
+                    keep, types = _select_columns(header, columns, types)
+                    out_columns = list(columns)
+            elif header != file_columns:
+                raise StructureMismatchError("Структура столбцов не совпадает в разных файлах")
+            if rows is not None:
+                reader = islice(reader, max(0, rows[0]), max(0, rows[1]))
+            while True:
+                chunk = list(islice(reader, chunk_rows))
+                if not chunk:
+                    break
+                if keep is not None:
+                    chunk = _project(chunk, keep)
+                t = Table(columns=out_columns, data=chunk, storage=storage)
+                if types is not None:
+                    _apply_types(t, types)
+                elif detect_types:
+                    t.detect_column_types()
+                yield t
 
-    if not tables:
-        raise StructureMismatchError("Не удалось загрузить ни одной таблицы")
 
-    # Проверим структуру
-    for t in tables[1:]:
-        if t.columns != tables[0].columns:
+def read_header(path):
+    with _open_input(path) as csvfile:
+        header = next(csv.reader(csvfile), None)
+    if header is None:
+        raise StructureMismatchError("Файл пустой или некорректный")
+    return header
+
+
+def _split_file(path, chunk_bytes):
+    # Разбиение файла на куски примерно по chunk_bytes байт по границам строк.
+    # Перевод строки внутри значения в кавычках границей не считается:
+    # файл просматривается целиком с подсчетом кавычек (экранированная
+    # кавычка "" четность не меняет).
+    # Возвращает список (начало, конец) в байтах.
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        while True:
+            odd = f.read(chunk_bytes).count(b'"') % 2
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                odd ^= line.count(b'"') % 2
+                if not odd:
+                    break
+            pos = f.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _load_part(task):
+    # Разбор куска файла в отдельном процессе
+    path, start, end, columns, keep, types, storage = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        raw = f.read() if end is None else f.read(end - start)
+    rows = list(csv.reader(io.StringIO(raw.decode('utf-8'), newline='')))
+    if start == 0:
+        # заголовок уже прочитан в основном процессе
+        rows = rows[1:]
+    if keep is not None:
+        rows = _project(rows, keep)
+    t = Table(columns=columns, data=rows, storage=storage)
+    if types is not None:
+        _apply_types(t, types)
+    return t
+
+
+def _load_parallel(files, workers, chunk_bytes, types, storage, columns):
+    file_columns = None
+    keep = None
+    tasks = []
+    for f in files:
+        header = read_header(f)
+        if file_columns is None:
+            file_columns = header
+            out_columns = header
+            if columns is not None:
+                keep, types = _select_columns(header, columns, types)
+                out_columns = list(columns)
+        elif header != file_columns:
             raise StructureMismatchError("Структура столбцов не совпадает в разных файлах")
+        parts = _split_file(f, chunk_bytes) if chunk_bytes else [(0, None)]
+        tasks.extend((f, start, end, out_columns, keep, types, storage) for start, end in parts)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map сохраняет порядок кусков и файлов
+        return list(executor.map(_load_part, tasks))
+
+
+@instrumented("csv_module.load_table", io="read")
+def load_table(*files, detect_types=False, types=None, chunk_rows=CHUNK_ROWS, storage="rows",
+               workers=None, chunk_bytes=None, columns=None, rows=None):
+    # Загрузка CSV из нескольких файлов и объединение.
+    # Предполагается, что все имеют одинаковые столбцы.
+    # Файлы читаются кусками (iter_table_chunks), которые дописываются
+    # в одну результирующую таблицу - без промежуточных копий.
+    # workers - разбирать файлы в пуле из workers процессов;
+    # chunk_bytes - при этом делить большие файлы на куски примерно такого размера
+    #   по границам строк (с учетом значений в кавычках с переводом строки)
+    # columns - список имен столбцов, которые нужно прочитать (по умолчанию все)
+    # rows - диапазон строк данных (start, stop) внутри каждого файла
+    #   (при workers файлы читаются последовательно)
+    # Файлы, сжатые gzip, читаются последовательно.
+    # storage="spill" - таблица на диске (spill.py): в памяти только текущий кусок.
+    if not files:
+        raise StructureMismatchError("Не удалось загрузить ни одной таблицы")
 
-    # Объединим
-    res = tables[0]
-    for t in tables[1:]:
-        res = Table.concat(res, t)
+    res = None
+    chunk_storage = "columns" if storage == "spill" else storage
+    if workers is not None and workers > 1 and rows is None and not any(map(_is_gzip, files)):
+        chunks = _load_parallel(files, workers, chunk_bytes, types, chunk_storage, columns)
+    else:
+        chunks = iter_table_chunks(*files, chunk_rows=chunk_rows, types=types, storage=chunk_storage,
+                                   columns=columns, rows=rows)
+    for chunk in chunks:
+        if chunk.num_rows == 0:
+            continue
+        if res is None:
+            res = chunk
+            res.set_storage(storage)
+        else:
+            res._writable_store().extend(chunk._store)
 
-    # Опционально определить типы
-    if detect_types:
+    if res is None:
+        # во всех файлах только заголовок (или строки вне диапазона rows)
+        res = _empty_table(read_header(files[0]), columns, types, storage)
+
+    # Опционально определить типы.
+    # Определяем по всей таблице сразу, а не по кускам: иначе при расширении
+    # типа (например, int -> str) уже преобразованные значения теряли бы исходный вид.
+    if detect_types and types is None:
         res.detect_column_types()
 
     return res
 
-def save_table(table, file_path):
-    with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+
+def _empty_table(header, columns, types, storage):
+    if columns is not None:
+        _, types = _select_columns(header, columns, types)
+        header = list(columns)
+    res = Table(columns=header, data=[], storage=storage)
+    if types is not None:
+        _apply_types(res, types)
+    return res
+
+
+def _open_binary(path):
+    if _is_gzip(path):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _read_text(f, decoder, size):
+    # Очередной блок файла текстом ("" - файл закончился)
+    data = f.read(size)
+    return decoder.decode(data, final=not data)
+
+
+def _row_boundary(text):
+    # Конец последней полной строки CSV в text (0 - полной строки нет).
+    # Перевод строки внутри значения в кавычках границей не считается.
+    cut = text.rfind("\n")
+    while cut >= 0 and text.count('"', 0, cut) % 2:
+        cut = text.rfind("\n", 0, cut)
+    return cut + 1
+
+
+async def _produce_blocks(files, read_bytes, queue):
+    # Чтение файлов блоками в фоне: в очередь идут (номер файла, текст),
+    # после каждого файла - (номер файла, None), при ошибке - (None, исключение)
+    loop = asyncio.get_running_loop()
+    try:
+        for k, path in enumerate(files):
+            f = await loop.run_in_executor(None, _open_binary, path)
+            try:
+                decoder = codecs.getincrementaldecoder("utf-8")()
+                while True:
+                    text = await loop.run_in_executor(None, _read_text, f, decoder, read_bytes)
+                    if not text:
+                        break
+                    await queue.put((k, text))
+            finally:
+                await loop.run_in_executor(None, f.close)
+            await queue.put((k, None))
+    except Exception as e:
+        await queue.put((None, e))
+
+
+class _AsyncLoad:
+    # Состояние асинхронной загрузки: куски разбираются и дописываются
+    # в результат в потоках пула событийного цикла
+    def __init__(self, columns, types, storage):
+        self.columns = columns
+        self.types = types
+        self.storage = storage
+        self.file_columns = None
+        self.out_columns = None
+        self.keep = None
+        self.res = None
+
+    def add(self, text, first):
+        # Разобрать полные строки text; first - text начинается с заголовка файла
+        rows = list(csv.reader(io.StringIO(text)))
+        if first:
+            header = rows.pop(0)
+            if self.file_columns is None:
+                self.file_columns = self.out_columns = header
+                if self.columns is not None:
+                    self.keep, self.types = _select_columns(header, self.columns, self.types)
+                    self.out_columns = list(self.columns)
+            elif header != self.file_columns:
+                raise StructureMismatchError("Структура столбцов не совпадает в разных файлах")
+        if not rows:
+            return
+        if self.keep is not None:
+            rows = _project(rows, self.keep)
+        chunk = Table(columns=self.out_columns, data=rows,
+                      storage="columns" if self.storage == "spill" else self.storage)
+        if self.types is not None:
+            _apply_types(chunk, self.types)
+        if self.res is None:
+            self.res = chunk
+            self.res.set_storage(self.storage)
+        else:
+            self.res._writable_store().extend(chunk._store)
+
+
+async def load_table_async(*files, detect_types=False, types=None, storage="rows", columns=None,
+                           read_bytes=READ_BYTES, prefetch=PREFETCH):
+    # То же, что load_table, для asyncio: событийный цикл не блокируется.
+    # Файлы читаются блоками по read_bytes байт в фоне, пока уже прочитанные
+    # блоки разбираются и преобразуются к типам (в потоках пула цикла);
+    # прочитанных, но не разобранных блоков не больше prefetch.
+    #   t = await csv_module.load_table_async("a.csv", "b.csv.gz", types={...})
+    if not files:
+        raise StructureMismatchError("Не удалось загрузить ни одной таблицы")
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=prefetch)
+    producer = asyncio.ensure_future(_produce_blocks(files, read_bytes, queue))
+    state = _AsyncLoad(columns, types, storage)
+    try:
+        carry = ""
+        first = True
+        done = 0
+        while done < len(files):
+            k, text = await queue.get()
+            if k is None:
+                raise text
+            if text is None:
+                # файл закончился: последняя строка может быть без перевода строки
+                if carry or first:
+                    if first and not carry:
+                        raise StructureMismatchError("Файл пустой или некорректный")
+                    await loop.run_in_executor(None, state.add, carry, first)
+                carry = ""
+                first = True
+                done += 1
+                continue
+            text = carry + text
+            cut = _row_boundary(text)
+            carry = text[cut:]
+            if cut:
+                await loop.run_in_executor(None, state.add, text[:cut], first)
+                first = False
+    finally:
+        producer.cancel()
+
+    res = state.res
+    if res is None:
+        res = _empty_table(state.file_columns, columns, types, storage)
+    if detect_types and types is None:
+        await loop.run_in_executor(None, res.detect_column_types)
+    return res
+
+
+def _plain_block(store):
+    # Кусок поколоночного хранилища одной строкой CSV-текста, если ни одно
+    # значение не требует кавычек: числа и логические значения - никогда,
+    # строки - если в пуле байтов нет запятых, кавычек и переводов строк.
+    # Иначе None (кусок пишет csv.writer).
+    if not isinstance(store, ColumnStore) or len(store.cols) < 2 or not store.nrows():
+        return None
+    cols = []
+    for col in store.cols:
+        if isinstance(col, (ArrayColumn, BoolColumn)):
+            cols.append(map(str, col))
+        elif isinstance(col, StrColumn):
+            pool = col.pool if not isinstance(col.pool, memoryview) else bytes(col.pool)
+            if any(b in pool for b in _SPECIAL):
+                return None
+            cols.append(col)
+        else:
+            return None
+    return "\r\n".join(map(",".join, zip(*cols))) + "\r\n"
+
+
+@instrumented("csv_module.save_table", io="write")
+def save_table(table, file_path, columns=None, compression=None, chunk_rows=CHUNK_ROWS):
+    # table - таблица или итерируемое кусков (таблиц или списков строк),
+    #   например, из iter_table_chunks: куски пишутся по мере получения
+    #   (см. storage.chunk_stores; для кусков-списков нужен columns)
+    # compression - None или "gzip"
+    # Каждый кусок пишется одним вызовом через большой буфер файла;
+    # поколоночные куски без значений, требующих кавычек, форматируются
+    # столбцами целиком в обход csv.writer.
+    columns, stores = chunk_stores(table, columns, chunk_rows)
+    with _open_output(file_path, compression) as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(table.columns)
-        for row in table.data:
-            writer.writerow(row)
+        writer.writerow(columns)
+        for store in stores:
+            block = _plain_block(store)
+            if block is not None:
+                csvfile.write(block)
+            else:
+                writer.writerows(store.iter_rows())
+
+
+def _open_output(file_path, compression):
+    return open_output(file_path, compression, newline='', buffering=WRITE_BUFFER)
+
+
+def _format_block(store):
+    # Кусок хранилища CSV-текстом
+    block = _plain_block(store)
+    if block is None:
+        out = io.StringIO()
+        csv.writer(out).writerows(store.iter_rows())
+        block = out.getvalue()
+    return block
+
+
+async def save_table_async(table, file_path, columns=None, compression=None, chunk_rows=CHUNK_ROWS,
+                           prefetch=PREFETCH):
+    # То же, что save_table, для asyncio: куски форматируются и пишутся в потоках
+    # пула событийного цикла; следующий кусок форматируется, пока пишется
+    # предыдущий, незаписанных кусков не больше prefetch
+    loop = asyncio.get_running_loop()
+    columns, stores = chunk_stores(table, columns, chunk_rows)
+    csvfile = await loop.run_in_executor(None, _open_output, file_path, compression)
+    pending = []
+
+    async def write(prev, text):
+        # записи идут строго по порядку
+        if prev is not None:
+            await prev
+        await loop.run_in_executor(None, csvfile.write, text)
+
+    try:
+        header = io.StringIO()
+        csv.writer(header).writerow(columns)
+        last = asyncio.ensure_future(write(None, header.getvalue()))
+        pending.append(last)
+        end = object()
+        while True:
+            store = await loop.run_in_executor(None, next, stores, end)
+            if store is end:
+                break
+            text = await loop.run_in_executor(None, _format_block, store)
+            last = asyncio.ensure_future(write(last, text))
+            pending.append(last)
+            if len(pending) > prefetch:
+                await pending.pop(0)
+    finally:
+        # дождаться уже начатых записей (и при ошибке), затем закрыть файл
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        await loop.run_in_executor(None, csvfile.close)
+    for r in results:
+        if isinstance(r, BaseException):
+            raise r
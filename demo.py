@@ -53,3 +53,12 @@ print(t6.gr(200, "value"))
 t7 = Table(columns=["id", "extra"], data=[[1, "A"], [2, "B"]], types={"id": int, "extra": str})
 merged = Table.merge_tables(t6, t7, by_number=False)
 merged.print_table()
+
+# Поколоночное хранение: int/float в array, bool в bytearray, str в общем пуле байтов
+tc = Table(columns=["id", "value"], data=[["1", "100"], ["2", "200"]], storage="columns")
+tc.detect_column_types()
+tc.filter_rows(tc.gr(100, "value")).print_table()
+
+# Группировка и агрегация
+sales = Table(columns=["city", "amount"], data=[["A", 10], ["B", 5], ["A", 7]], types={"city": str, "amount": int})
+sales.group_by("city").agg({"amount": ["sum", "mean"]}).print_table()
@@ -16,7 +16,10 @@ class InvalidRowError(TableException):
 
 class TypeConversionError(TableException):
     """Исключение, вызываемое при ошибке преобразования типа."""
-    pass
+    def __init__(self, message, failures=None):
+        super().__init__(message)
+        # Все неудачные значения: список (номер строки, значение)
+        self.failures = failures if failures is not None else []
 
 class MergeConflictError(TableException):
     """Исключение при конфликтном слиянии таблиц."""
@@ -25,3 +28,12 @@ class MergeConflictError(TableException):
 class BoolListLengthError(TableException):
     """Исключение, если булевский список фильтрации не совпадает с количеством строк."""
     pass
+
+class SchemaError(TableException):
+    """Исключение, если данные не соответствуют схеме таблицы (сразу со всеми ошибками)."""
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        # Все ошибки: список (номер строки, столбец, значение); для строк неверной
+        # длины столбец - None, значение - сама строка; для отсутствующего или
+        # лишнего ключа записи значение - schema.MISSING или schema.EXTRA
+        self.errors = errors if errors is not None else []
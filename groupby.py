@@ -0,0 +1,284 @@
+from operator import add
+from columns import ArrayColumn, BoolColumn
+from exceptions import InvalidColumnError, TableException
+from join import build_store
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Хеш-агрегация по группам.
+# За один проход по ключевым столбцам каждой строке назначается номер группы,
+# затем каждый агрегируемый столбец обновляет состояния своих групп.
+# Состояния живут между вызовами update(), поэтому таблицу можно
+# агрегировать по кускам (например, из csv_module.iter_table_chunks).
+# Пустые значения (None) пропускаются всеми функциями, кроме size.
+# Типизированные столбцы (IntColumn, FloatColumn, BoolColumn) не содержат None:
+# sum, count и size по ним считаются без проверки каждого значения, а если
+# установлен numpy - сразу по всему столбцу (bincount по номерам групп).
+
+_NUMPY_DTYPES = {'q': "int64", 'd': "float64"}
+
+
+def _dense(values):
+    # Столбец в типизированном буфере (без None)
+    return isinstance(values, (ArrayColumn, BoolColumn))
+
+
+def _group_counts(gids, ngroups):
+    # Число строк в каждой группе (numpy)
+    return np.bincount(np.asarray(gids, dtype=np.intp), minlength=ngroups).tolist()
+
+
+def _group_sums(gids, values, ngroups):
+    # Суммы типизированного столбца по группам (numpy) или None, если сумма
+    # целых может выйти за int64 (тогда - обычным проходом на python int)
+    g = np.asarray(gids, dtype=np.intp)
+    if isinstance(values, BoolColumn):
+        flags = np.frombuffer(values.values, dtype=np.uint8).astype(np.bool_)
+        return np.bincount(g[flags], minlength=ngroups).tolist()
+    arr = np.frombuffer(values.values, dtype=_NUMPY_DTYPES[values.typecode])
+    if values.typecode == 'd':
+        return np.bincount(g, weights=arr, minlength=ngroups).tolist()
+    if max(-int(arr.min()), int(arr.max())) * len(arr) >= 2 ** 63:
+        return None
+    sums = np.zeros(ngroups, dtype=np.int64)
+    np.add.at(sums, g, arr)
+    return sums.tolist()
+
+
+class Accumulator:
+    # Состояние одной агрегатной функции по всем группам
+    def __init__(self, t):
+        self.state = []
+
+    def initial(self):
+        return None
+
+    def grow(self, ngroups):
+        missing = ngroups - len(self.state)
+        if missing > 0:
+            self.state.extend([self.initial()] * missing)
+
+    def update(self, gids, values):
+        raise NotImplementedError
+
+    def result(self):
+        return self.state
+
+
+class Sum(Accumulator):
+    def __init__(self, t):
+        super().__init__(t)
+        if t not in (int, float, bool):
+            raise TableException(f"Сумма не определена для столбца типа {getattr(t, '__name__', t)}")
+        self.zero = 0.0 if t is float else 0
+        self.type = int if t is bool else t
+
+    def initial(self):
+        return self.zero
+
+    def update(self, gids, values):
+        s = self.state
+        if _dense(values):
+            sums = _group_sums(gids, values, len(s)) if np is not None and len(values) else None
+            if sums is not None:
+                self.state = list(map(add, s, sums))
+                return
+            for g, v in zip(gids, values):
+                s[g] += v
+            return
+        for g, v in zip(gids, values):
+            if v is not None:
+                s[g] += v
+
+
+class Count(Accumulator):
+    type = int
+
+    def initial(self):
+        return 0
+
+    def update(self, gids, values):
+        if _dense(values):
+            self._count_rows(gids)
+            return
+        s = self.state
+        for g, v in zip(gids, values):
+            if v is not None:
+                s[g] += 1
+
+    def _count_rows(self, gids):
+        # Каждая строка - в счет своей группы
+        s = self.state
+        if np is not None and gids:
+            self.state = list(map(add, s, _group_counts(gids, len(s))))
+            return
+        for g in gids:
+            s[g] += 1
+
+
+class Size(Count):
+    def update(self, gids, values):
+        self._count_rows(gids)
+
+
+class Min(Accumulator):
+    def __init__(self, t):
+        super().__init__(t)
+        self.type = t
+
+    def update(self, gids, values):
+        s = self.state
+        for g, v in zip(gids, values):
+            if v is not None:
+                cur = s[g]
+                if cur is None or v < cur:
+                    s[g] = v
+
+
+class Max(Min):
+    def update(self, gids, values):
+        s = self.state
+        for g, v in zip(gids, values):
+            if v is not None:
+                cur = s[g]
+                if cur is None or v > cur:
+                    s[g] = v
+
+
+class Mean(Accumulator):
+    type = float
+
+    def __init__(self, t):
+        super().__init__(t)
+        self.sum = Sum(t)
+        self.count = Count(t)
+
+    def grow(self, ngroups):
+        self.sum.grow(ngroups)
+        self.count.grow(ngroups)
+
+    def update(self, gids, values):
+        self.sum.update(gids, values)
+        self.count.update(gids, values)
+
+    def result(self):
+        return [s / c if c else None for s, c in zip(self.sum.state, self.count.state)]
+
+
+ACCUMULATORS = {
+    "sum": Sum,
+    "count": Count,
+    "size": Size,
+    "min": Min,
+    "max": Max,
+    "mean": Mean,
+}
+
+
+def _normalize_spec(spec):
+    # {"столбец": "функция" или [функции]} -> [(столбец, функция)]
+    items = []
+    for col, funcs in spec.items():
+        if isinstance(funcs, str):
+            funcs = [funcs]
+        for func in funcs:
+            if func not in ACCUMULATORS:
+                raise TableException(f"Неизвестная агрегатная функция {func}")
+            items.append((col, func))
+    return items
+
+
+class Aggregator:
+    # Агрегация по ключевым столбцам by; spec - {"столбец": "sum" | ["min", "max"], ...}.
+    # Столбцы результата: ключи, затем "<столбец>_<функция>" для каждой функции.
+
+    def __init__(self, by, spec):
+        if isinstance(by, str):
+            by = [by]
+        self.by = list(by)
+        if not self.by:
+            raise TableException("Не заданы столбцы группировки")
+        self.spec = _normalize_spec(spec)
+        self.groups = {}
+        self.keys = []
+        self.accs = None
+        self.key_types = None
+        self._table_cls = None
+        self._storage = "rows"
+
+    def update(self, table):
+        # Добавить строки таблицы (или очередного куска) к агрегатам
+        for c in self.by + [c for c, _ in self.spec]:
+            if c not in table.columns:
+                raise InvalidColumnError(f"Столбец {c} не найден")
+        if self.accs is None:
+            self._table_cls = type(table)
+            self._storage = table.storage
+            self.key_types = [table.types[c] for c in self.by]
+            self.accs = [ACCUMULATORS[func](table.types[col]) for col, func in self.spec]
+
+        store = table._store
+        key_cols = [store.column(table.columns.index(c)) for c in self.by]
+        keys = key_cols[0] if len(key_cols) == 1 else zip(*key_cols)
+
+        groups, group_keys = self.groups, self.keys
+        gids = []
+        for k in keys:
+            g = groups.get(k)
+            if g is None:
+                g = groups[k] = len(group_keys)
+                group_keys.append(k)
+            gids.append(g)
+
+        ngroups = len(group_keys)
+        for (col, _), acc in zip(self.spec, self.accs):
+            acc.grow(ngroups)
+            acc.update(gids, store.column(table.columns.index(col)))
+        return self
+
+    def result(self):
+        # Итоговая таблица (группы в порядке первого появления)
+        if self.accs is None:
+            raise TableException("Нет данных для агрегации")
+        if len(self.by) == 1:
+            cols = [list(self.keys)]
+        else:
+            cols = [list(c) for c in zip(*self.keys)] or [[] for _ in self.by]
+        columns = list(self.by)
+        types = list(self.key_types)
+        for (col, func), acc in zip(self.spec, self.accs):
+            columns.append(f"{col}_{func}")
+            types.append(acc.type)
+            cols.append(acc.result())
+        store = build_store(cols, types, self._storage, len(self.keys))
+        return self._table_cls._from_store(columns, store, dict(zip(columns, types)))
+
+
+class GroupBy:
+    # Результат Table.group_by(...): группировка, которую вычисляет agg()
+    def __init__(self, table, by):
+        self.table = table
+        self.by = list(by)
+
+    def agg(self, spec, chunk_rows=None):
+        # chunk_rows - обрабатывать таблицу кусками по chunk_rows строк
+        # (временные столбцы занимают память только на один кусок)
+        aggregator = Aggregator(self.by, spec)
+        n = self.table.num_rows
+        if chunk_rows and n > chunk_rows:
+            for start in range(0, n, chunk_rows):
+                aggregator.update(self.table.get_rows_by_number(start, min(start + chunk_rows, n)))
+        else:
+            aggregator.update(self.table)
+        return aggregator.result()
+
+
+def aggregate_chunks(chunks, by, spec):
+    # Агрегация потока таблиц-кусков (например, csv_module.iter_table_chunks)
+    aggregator = Aggregator(by, spec)
+    for chunk in chunks:
+        aggregator.update(chunk)
+    return aggregator.result()
@@ -0,0 +1,143 @@
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from itertools import chain
+from columns import DictColumn
+
+
+class HashIndex:
+    # Хеш-индекс по столбцу: словарь {значение: [номера строк]}.
+    # Строится один раз и хранится в таблице, пока столбец не изменится.
+
+    def __init__(self, values):
+        self._unique = None
+        if isinstance(values, DictColumn):
+            # группировка по номерам значений, затем номера -> сами значения
+            dictionary = values.dictionary
+            by_code = HashIndex(values.codes).positions
+            self.positions = {dictionary[c]: p for c, p in by_code.items()}
+            return
+        positions = {}
+        for i, v in enumerate(values):
+            p = positions.get(v)
+            if p is None:
+                positions[v] = [i]
+            else:
+                p.append(i)
+        self.positions = positions
+
+    @property
+    def unique(self):
+        # Все ли значения столбца различны
+        if self._unique is None:
+            self._unique = all(len(p) == 1 for p in self.positions.values())
+        return self._unique
+
+    def append(self, values, start):
+        # Дописать в индекс значения новых строк start, start + 1, ...
+        positions = self.positions
+        unique = self._unique
+        for i, v in enumerate(values, start):
+            p = positions.get(v)
+            if p is None:
+                positions[v] = [i]
+            else:
+                p.append(i)
+                unique = False
+        if unique is False:
+            self._unique = False
+
+    def get(self, key):
+        # Номера строк с данным значением (пустой список, если таких нет)
+        return self.positions.get(key, [])
+
+    def lookup(self, keys):
+        # Отсортированные номера строк, значение которых входит в keys
+        found = [self.positions[k] for k in set(keys) if k in self.positions]
+        if len(found) == 1:
+            return list(found[0])
+        return sorted(chain.from_iterable(found))
+
+
+class SortedIndex:
+    # Упорядоченный индекс по столбцу: номера строк в порядке возрастания
+    # значений (order) и сами значения в том же порядке (keys).
+    # Диапазонные условия сводятся к двоичному поиску по keys: O(log n + k).
+    # Пустые значения (None) и NaN в индекс не входят и ни одному условию не
+    # удовлетворяют (NaN несравним ни с чем, и двоичный поиск по нему невозможен);
+    # nulls - число строк с None.
+    # Для уже отсортированного столбца без None и NaN order - это range, и выборка
+    # диапазона тоже range (без списка номеров).
+
+    def __init__(self, values):
+        values = values if isinstance(values, list) else list(values)
+        self.nulls = values.count(None)
+        order = [i for i, v in enumerate(values) if v is not None and v == v]
+        if len(order) < len(values):
+            keys = [values[i] for i in order]
+        else:
+            order = range(len(values))
+            keys = values
+        if any(a > b for a, b in zip(keys, keys[1:])):
+            # сортировка устойчивая: равные значения - в порядке строк
+            order = sorted(order, key=values.__getitem__)
+            keys = [values[i] for i in order]
+        self.order = order
+        self.keys = keys
+
+    def append(self, values, start):
+        # Дописать в индекс значения новых строк start, start + 1, ...
+        # Новые значения не меньше последнего (например, время в журнале событий) -
+        # дописываются в конец; иначе - слияние за O(n + k)
+        new = []
+        for i, v in enumerate(values, start):
+            if v is None:
+                self.nulls += 1
+            elif v == v:
+                new.append((v, i))
+        new.sort()
+        if not new:
+            return
+        new_keys = [v for v, _ in new]
+        new_order = [i for _, i in new]
+        if not self.keys or self.keys[-1] <= new_keys[0]:
+            if isinstance(self.order, range) and self.order.stop == start \
+                    and new_order == list(range(start, start + len(new_order))):
+                self.order = range(self.order.start, start + len(new_order))
+            else:
+                self.order = list(self.order)
+                self.order.extend(new_order)
+            self.keys.extend(new_keys)
+            return
+        # heapq.merge устойчив: при равных значениях старые строки идут раньше новых
+        merged = list(merge(zip(self.keys, self.order), zip(new_keys, new_order), key=lambda p: p[0]))
+        self.keys = [v for v, _ in merged]
+        self.order = [i for _, i in merged]
+
+    def _bounds(self, low, high, include_low, include_high):
+        keys = self.keys
+        lo = 0
+        hi = len(keys)
+        if low is not None:
+            lo = bisect_left(keys, low) if include_low else bisect_right(keys, low)
+        if high is not None:
+            hi = bisect_right(keys, high) if include_high else bisect_left(keys, high)
+        return lo, max(lo, hi)
+
+    def range(self, low=None, high=None, include_low=True, include_high=True):
+        # Номера строк со значениями между low и high (None - без границы)
+        # в порядке возрастания номеров (range или список)
+        lo, hi = self._bounds(low, high, include_low, include_high)
+        found = self.order[lo:hi]
+        if isinstance(found, range):
+            return found
+        return sorted(found)
+
+    def compare(self, op, value):
+        # Номера строк для сравнения со значением (op - eq, gr, ls, ge, le)
+        if op == "eq":
+            return self.range(value, value)
+        if op in ("gr", "ge"):
+            return self.range(low=value, include_low=op == "ge")
+        if op in ("ls", "le"):
+            return self.range(high=value, include_high=op == "le")
+        raise ValueError(f"Сравнение {op} не поддерживается упорядоченным индексом")
@@ -0,0 +1,124 @@
+import datetime
+import decimal
+
+
+class TypeDetector:
+    # Детектор типа для detect_column_types.
+    # parse(s) - разбор строки s в значение типа type; бросает ValueError,
+    # если строка не является значением этого типа.
+    type = None
+
+    def parse(self, s):
+        raise NotImplementedError
+
+    def check(self, s):
+        try:
+            self.parse(s)
+        except ValueError:
+            return False
+        return True
+
+    def convert(self, value):
+        # Преобразование произвольного значения (используется в Table._convert_value)
+        if isinstance(value, self.type):
+            return value
+        return self.parse(value if isinstance(value, str) else str(value))
+
+
+class IntDetector(TypeDetector):
+    type = int
+
+    def parse(self, s):
+        return int(s)
+
+
+class FloatDetector(TypeDetector):
+    type = float
+
+    def parse(self, s):
+        return float(s)
+
+
+class BoolDetector(TypeDetector):
+    type = bool
+    VALUES = {"true": True, "1": True, "yes": True, "false": False, "0": False, "no": False}
+
+    def parse(self, s):
+        try:
+            return self.VALUES[s.lower()]
+        except KeyError:
+            raise ValueError(f"Не логическое значение: {s}")
+
+
+class DateDetector(TypeDetector):
+    # Даты в формате ISO 8601 (ГГГГ-ММ-ДД)
+    type = datetime.date
+
+    def parse(self, s):
+        return datetime.date.fromisoformat(s)
+
+
+class DecimalDetector(TypeDetector):
+    # Десятичные числа без потери точности
+    type = decimal.Decimal
+
+    def parse(self, s):
+        try:
+            value = decimal.Decimal(s)
+        except decimal.InvalidOperation:
+            raise ValueError(f"Не десятичное число: {s}")
+        if not value.is_finite():
+            raise ValueError(f"Не десятичное число: {s}")
+        return value
+
+
+# Порядок проверки по умолчанию: int -> float -> bool -> str
+DEFAULT_DETECTORS = [IntDetector(), FloatDetector(), BoolDetector()]
+
+# Детекторы по типам: по ним же Table преобразует значения нестандартных типов
+_DETECTORS_BY_TYPE = {}
+
+
+def register_detector(detector, default=False):
+    # Зарегистрировать детектор пользовательского типа.
+    # default=True - использовать его в detect_column_types без явного detectors=
+    # (проверяется после встроенных).
+    _DETECTORS_BY_TYPE[detector.type] = detector
+    if default:
+        DEFAULT_DETECTORS.append(detector)
+
+
+def detector_for(t):
+    return _DETECTORS_BY_TYPE.get(t)
+
+
+for _d in DEFAULT_DETECTORS + [DateDetector(), DecimalDetector()]:
+    register_detector(_d)
+
+
+def infer_detector(values, detectors, null_values=()):
+    # Однопроходное определение типа: по мере просмотра значений
+    # отбрасываются детекторы, которым значение не подходит.
+    # Возвращает первый (по приоритету) оставшийся детектор или None (тип str).
+    candidates = list(detectors)
+    for s in values:
+        if s in null_values:
+            continue
+        candidates = [d for d in candidates if d.check(s)]
+        if not candidates:
+            return None
+    return candidates[0] if candidates else None
+
+
+def parse_column(values, detector, null_values=()):
+    # Разбор всех значений столбца; ValueError, если какое-то не подходит
+    parse = detector.parse
+    if not null_values:
+        return list(map(parse, values))
+    return [None if s in null_values else parse(s) for s in values]
+
+
+def sample_values(values, sample):
+    # Равномерная выборка не более sample значений
+    step = max(1, len(values) // sample)
+    return values[::step][:sample]
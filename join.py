@@ -0,0 +1,229 @@
+from itertools import islice
+from operator import itemgetter, le
+from columns import Column, make_column
+from storage import ColumnStore, RowStore
+from index import HashIndex
+from exceptions import InvalidColumnError, MergeConflictError, TableException
+
+# Движок соединения таблиц.
+# Соединение считается в два шага: сначала по ключевым столбцам находятся
+# пары номеров строк (left_pos, right_pos), затем выходные столбцы собираются
+# целиком выборкой по этим номерам - без словарей на каждую строку.
+# None в списке номеров означает отсутствующую строку (для left/outer).
+
+JOIN_TYPES = ("inner", "left", "outer", "semi", "anti")
+
+
+def _keys(table, col_indexes):
+    # Ключи строк: значения столбца или кортежи значений нескольких столбцов
+    store = table._store
+    if len(col_indexes) == 1:
+        return store.column(col_indexes[0])
+    return list(zip(*[store.column(j) for j in col_indexes]))
+
+
+def _key_map(table, col_indexes, keys):
+    # Словарь {ключ: [номера строк]}; для одного столбца - постоянный индекс таблицы
+    if len(col_indexes) == 1:
+        return table._get_index(col_indexes[0]).positions
+    return HashIndex(keys).positions
+
+
+def hash_join_positions(left, right, left_idx, right_idx, how):
+    # Хеш-соединение; хеш-таблица строится по меньшей из двух таблиц.
+    # Результат упорядочен по строкам левой таблицы, для outer несопоставленные
+    # строки правой таблицы идут в конце.
+    lkeys = _keys(left, left_idx)
+    rkeys = _keys(right, right_idx)
+    nl, nr = len(lkeys), len(rkeys)
+
+    if how in ("semi", "anti"):
+        rmap = _key_map(right, right_idx, rkeys)
+        keep = how == "semi"
+        return [i for i, k in enumerate(lkeys) if (k in rmap) == keep], None
+
+    left_pos, right_pos = [], []
+    right_matched = bytearray(nr) if how == "outer" else None
+    if nr <= nl:
+        # строим по правой таблице, проходим по левой
+        rmap = _key_map(right, right_idx, rkeys)
+        keep_unmatched = how in ("left", "outer")
+        for i, k in enumerate(lkeys):
+            ps = rmap.get(k)
+            if ps:
+                for p in ps:
+                    left_pos.append(i)
+                    right_pos.append(p)
+                    if right_matched is not None:
+                        right_matched[p] = 1
+            elif keep_unmatched:
+                left_pos.append(i)
+                right_pos.append(None)
+    else:
+        # строим по левой таблице, проходим по правой
+        lmap = _key_map(left, left_idx, lkeys)
+        left_matched = bytearray(nl)
+        pairs = []
+        for p, k in enumerate(rkeys):
+            ps = lmap.get(k)
+            if ps:
+                for i in ps:
+                    pairs.append((i, p))
+                    left_matched[i] = 1
+                if right_matched is not None:
+                    right_matched[p] = 1
+        if how in ("left", "outer"):
+            pairs.extend((i, None) for i in range(nl) if not left_matched[i])
+        pairs.sort(key=itemgetter(0))
+        left_pos = [i for i, _ in pairs]
+        right_pos = [p for _, p in pairs]
+
+    if right_matched is not None:
+        for p in range(nr):
+            if not right_matched[p]:
+                left_pos.append(None)
+                right_pos.append(p)
+    return left_pos, right_pos
+
+
+def _is_sorted(keys):
+    # Ключи по возрастанию и сравнимы между собой (None - несравним)
+    try:
+        return all(map(le, keys, islice(keys, 1, None)))
+    except TypeError:
+        return False
+
+
+def merge_join_positions(left, right, left_idx, right_idx, how):
+    # Соединение слиянием для таблиц, уже отсортированных по ключу по возрастанию.
+    # Если ключи не отсортированы или несравнимы (например, None), соединение
+    # идет через хеш-таблицу - с тем же результатом (None соединяется с None)
+    lkeys = _keys(left, left_idx)
+    rkeys = _keys(right, right_idx)
+    if not (_is_sorted(lkeys) and _is_sorted(rkeys)):
+        return hash_join_positions(left, right, left_idx, right_idx, how)
+    try:
+        return _merge_positions(lkeys, rkeys, how)
+    except TypeError:
+        # ключи левой таблицы несравнимы с ключами правой
+        return hash_join_positions(left, right, left_idx, right_idx, how)
+
+
+def _merge_positions(lkeys, rkeys, how):
+    nl, nr = len(lkeys), len(rkeys)
+    left_pos, right_pos = [], []
+    keep_left = how in ("left", "outer")
+    i = j = 0
+    while i < nl and j < nr:
+        a, b = lkeys[i], rkeys[j]
+        if a < b:
+            if keep_left or how == "anti":
+                left_pos.append(i)
+                right_pos.append(None)
+            i += 1
+        elif b < a:
+            if how == "outer":
+                left_pos.append(None)
+                right_pos.append(j)
+            j += 1
+        else:
+            i2 = i + 1
+            while i2 < nl and lkeys[i2] == a:
+                i2 += 1
+            j2 = j + 1
+            while j2 < nr and rkeys[j2] == a:
+                j2 += 1
+            if how == "semi":
+                left_pos.extend(range(i, i2))
+                right_pos.extend([None] * (i2 - i))
+            elif how != "anti":
+                for x in range(i, i2):
+                    left_pos.extend([x] * (j2 - j))
+                    right_pos.extend(range(j, j2))
+            i, j = i2, j2
+    if keep_left or how == "anti":
+        left_pos.extend(range(i, nl))
+        right_pos.extend([None] * (nl - i))
+    if how == "outer":
+        left_pos.extend([None] * (nr - j))
+        right_pos.extend(range(j, nr))
+    if how in ("semi", "anti"):
+        return left_pos, None
+    return left_pos, right_pos
+
+
+def gather(store, j, positions):
+    # Значения столбца j по номерам строк; None в positions дает None
+    if None not in positions:
+        return store.take_column(j, positions)
+    col = store.column(j)
+    return [None if p is None else col[p] for p in positions]
+
+
+def build_store(cols, types, storage, nrows):
+    # Хранилище из готовых столбцов (Column или списков)
+    if storage == "columns":
+        return ColumnStore([c if isinstance(c, Column) else make_column(t, c)
+                            for c, t in zip(cols, types)], nrows)
+    if not cols:
+        return RowStore([[] for _ in range(nrows)])
+    return RowStore(list(map(list, zip(*cols))))
+
+
+def _resolve(table, names):
+    idx = []
+    for c in names:
+        if c not in table.columns:
+            raise InvalidColumnError(f"Столбец {c} не найден")
+        idx.append(table.columns.index(c))
+    return idx
+
+
+def join_tables(left, right, on, how="inner", right_on=None, suffix="_right", sort_merge=False):
+    # Возвращает (columns, store, types) результата соединения.
+    # on - имя ключевого столбца или список имен; right_on - ключи правой
+    # таблицы, если называются иначе. Ключевые столбцы берутся из левой
+    # таблицы (для outer - из той, где строка есть), остальные столбцы правой
+    # таблицы добавляются справа; совпадающие имена получают suffix.
+    if how not in JOIN_TYPES:
+        raise TableException(f"Неизвестный тип соединения {how}")
+    on = [on] if isinstance(on, str) else list(on)
+    right_on = on if right_on is None else ([right_on] if isinstance(right_on, str) else list(right_on))
+    if not on or len(on) != len(right_on):
+        raise TableException("Ключевые столбцы заданы неверно")
+    left_idx = _resolve(left, on)
+    right_idx = _resolve(right, right_on)
+    for a, b in zip(on, right_on):
+        if left.types[a] != right.types[b]:
+            raise MergeConflictError(f"Различающиеся типы ключевого столбца {a}")
+
+    positions = merge_join_positions if sort_merge else hash_join_positions
+    left_pos, right_pos = positions(left, right, left_idx, right_idx, how)
+    n = len(left_pos)
+    storage = left.storage
+
+    columns = list(left.columns)
+    types = [left.types[c] for c in left.columns]
+    if right_pos is None:
+        cols = [gather(left._store, j, left_pos) for j in range(len(columns))]
+        return columns, build_store(cols, types, storage, n), dict(zip(columns, types))
+
+    cols = []
+    for j in range(len(left.columns)):
+        values = gather(left._store, j, left_pos)
+        if how == "outer" and j in left_idx and None in left_pos:
+            # ключ строк, которых нет в левой таблице, - из правой
+            rcol = right._store.column(right_idx[left_idx.index(j)])
+            values = list(values)
+            for k, (lp, rp) in enumerate(zip(left_pos, right_pos)):
+                if lp is None:
+                    values[k] = rcol[rp]
+        cols.append(values)
+    for j, c in enumerate(right.columns):
+        if j in right_idx:
+            continue
+        name = c + suffix if c in columns else c
+        columns.append(name)
+        types.append(right.types[c])
+        cols.append(gather(right._store, j, right_pos))
+    return columns, build_store(cols, types, storage, n), dict(zip(columns, types))
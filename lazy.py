@@ -0,0 +1,387 @@
+import binary_module
+import csv_module
+from table import Table
+from mask import Mask
+
+# Ленивые запросы к таблицам.
+#
+# LazyFrame только записывает шаги (filter, select, cast, slice, join),
+# а выполняет их в collect() после оптимизации плана:
+#   - slice, идущий до фильтров и соединений, передается источнику
+#     (для файла читается только нужный диапазон строк);
+#   - фильтры переносятся как можно раньше: через select, через cast
+#     не своих столбцов и в левую часть соединения;
+#   - соседние фильтры сливаются в одну маску и одну выборку строк;
+#   - из select и cast убираются и источник не читает столбцы, которые дальше
+#     по плану не нужны.
+#
+#   frame = scan_csv("sales.csv").cast({"amount": int}).filter(col("amount") > 100).select("city", "amount")
+#   result = frame.collect()
+
+_OPS = {"eq": "==", "ne": "!=", "gr": ">", "ls": "<", "ge": ">=", "le": "<="}
+
+
+class Predicate:
+    # Условие на строки; вычисляется в маску (mask.Mask)
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+    def columns(self):
+        raise NotImplementedError
+
+    def evaluate(self, table):
+        raise NotImplementedError
+
+
+class Compare(Predicate):
+    def __init__(self, column, op, value):
+        self.column = column
+        self.op = op
+        self.value = value
+
+    def columns(self):
+        return {self.column}
+
+    def evaluate(self, table):
+        return getattr(table, self.op)(self.value, self.column)
+
+    def __repr__(self):
+        return f"{self.column} {_OPS[self.op]} {self.value!r}"
+
+
+class And(Predicate):
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def columns(self):
+        return set().union(*(p.columns() for p in self.parts))
+
+    def evaluate(self, table):
+        result = self.parts[0].evaluate(table)
+        for p in self.parts[1:]:
+            result = result & p.evaluate(table)
+        return result
+
+    def __repr__(self):
+        return "(" + " & ".join(map(repr, self.parts)) + ")"
+
+
+class Or(And):
+    def evaluate(self, table):
+        result = self.parts[0].evaluate(table)
+        for p in self.parts[1:]:
+            result = result | p.evaluate(table)
+        return result
+
+    def __repr__(self):
+        return "(" + " | ".join(map(repr, self.parts)) + ")"
+
+
+class Not(Predicate):
+    def __init__(self, part):
+        self.part = part
+
+    def columns(self):
+        return self.part.columns()
+
+    def evaluate(self, table):
+        return ~Mask.from_bools(self.part.evaluate(table))
+
+    def __repr__(self):
+        return f"~({self.part!r})"
+
+
+class Col:
+    # Ссылка на столбец для построения условий: col("x") > 5, col("x").eq("a")
+    def __init__(self, name):
+        self.name = name
+
+    def eq(self, value):
+        return Compare(self.name, "eq", value)
+
+    def ne(self, value):
+        return Compare(self.name, "ne", value)
+
+    def gr(self, value):
+        return Compare(self.name, "gr", value)
+
+    def ls(self, value):
+        return Compare(self.name, "ls", value)
+
+    def ge(self, value):
+        return Compare(self.name, "ge", value)
+
+    def le(self, value):
+        return Compare(self.name, "le", value)
+
+    __eq__ = eq
+    __ne__ = ne
+    __gt__ = gr
+    __lt__ = ls
+    __ge__ = ge
+    __le__ = le
+    __hash__ = None
+
+
+def col(name):
+    return Col(name)
+
+
+class TableSource:
+    def __init__(self, table):
+        self.table = table
+
+    def schema(self):
+        return list(self.table.columns)
+
+    def supports_rows(self):
+        return True
+
+    def read(self, columns=None, rows=None):
+        # Всегда представление: шаги плана не меняют исходную таблицу (copy-on-write)
+        t = self.table
+        n = t.num_rows
+        start, stop = (0, n) if rows is None else rows
+        start = max(0, min(start, n))
+        t = t._view(range(start, max(start, min(stop, n))))
+        if columns is not None:
+            t = t.select(*columns)
+        return t
+
+    def __repr__(self):
+        return f"Table({self.table.num_rows} строк)"
+
+
+class FileSource:
+    # Источник из файлов; columns и rows передаются в load_table модуля
+    def __init__(self, module, files, kwargs):
+        self.module = module
+        self.files = files
+        self.kwargs = kwargs
+
+    def schema(self):
+        if self.module is csv_module:
+            return csv_module.read_header(self.files[0])
+        return binary_module.read_header(self.files[0])["columns"]
+
+    def supports_rows(self):
+        # диапазон строк у загрузчиков задается внутри каждого файла
+        return len(self.files) == 1
+
+    def read(self, columns=None, rows=None):
+        return self.module.load_table(*self.files, columns=columns, rows=rows, **self.kwargs)
+
+    def __repr__(self):
+        return f"{self.module.__name__}({', '.join(map(str, self.files))})"
+
+
+class LazyFrame:
+    def __init__(self, source, steps=()):
+        if isinstance(source, Table):
+            source = TableSource(source)
+        self.source = source
+        self.steps = list(steps)
+
+    def __repr__(self):
+        return f"LazyFrame({self.source!r}, шагов: {len(self.steps)})"
+
+    def _add(self, *step):
+        return LazyFrame(self.source, self.steps + [step])
+
+    def filter(self, predicate):
+        return self._add("filter", predicate)
+
+    def select(self, *columns):
+        return self._add("select", list(columns))
+
+    def cast(self, types):
+        # types - {имя_столбца: тип}
+        return self._add("cast", dict(types))
+
+    def slice(self, start, stop):
+        return self._add("slice", start, stop)
+
+    def join(self, other, on, how="inner", **kwargs):
+        if isinstance(other, Table):
+            other = LazyFrame(other)
+        return self._add("join", other, dict(kwargs, on=on, how=how))
+
+    def schema(self):
+        # Имена столбцов результата (без выполнения плана)
+        columns = list(self.source.schema())
+        for step in self.steps:
+            if step[0] == "select":
+                columns = list(step[1])
+            elif step[0] == "join" and step[2]["how"] not in ("semi", "anti"):
+                right_on = step[2].get("right_on", step[2]["on"])
+                right_on = {right_on} if isinstance(right_on, str) else set(right_on)
+                suffix = step[2].get("suffix", "_right")
+                columns += [c + suffix if c in columns else c for c in step[1].schema() if c not in right_on]
+        return columns
+
+    def optimize(self):
+        # -> (столбцы источника или None, диапазон строк источника или None, шаги)
+        steps = _push_slices(self.steps)
+        rows = None
+        if self.source.supports_rows():
+            while steps and steps[0][0] == "slice":
+                _, start, stop = steps.pop(0)
+                if rows is None:
+                    rows = (start, stop)
+                else:
+                    base = rows[0]
+                    rows = (base + start, min(rows[1], base + stop))
+        steps = _prune_selects(_fuse_filters(_push_filters(steps)))
+        columns = _required_columns(steps, self.source.schema())
+        return columns, rows, steps
+
+    def explain(self):
+        columns, rows, steps = self.optimize()
+        lines = [f"source {self.source!r} columns={columns} rows={rows}"]
+        for step in steps:
+            lines.append(" ".join([step[0]] + [repr(a) for a in step[1:]]))
+        return "\n".join(lines)
+
+    def collect(self):
+        columns, rows, steps = self.optimize()
+        table = self.source.read(columns=columns, rows=rows)
+        for step in steps:
+            kind = step[0]
+            if kind == "filter":
+                table = table.filter_rows(step[1].evaluate(table))
+            elif kind == "select":
+                table = table.select(*step[1])
+            elif kind == "cast":
+                table.set_column_types(step[1], by_number=False)
+            elif kind == "slice":
+                n = table.num_rows
+                start = max(0, min(step[1], n))
+                table = table._view(range(start, max(start, min(step[2], n))))
+            elif kind == "join":
+                table = table.join(step[1].collect(), **step[2])
+        return table
+
+
+def _columns_of(step):
+    # Столбцы, от которых зависит шаг
+    kind = step[0]
+    if kind == "filter":
+        return step[1].columns()
+    if kind in ("select", "cast"):
+        return set(step[1])
+    if kind == "join":
+        needed = _join_keys(step)
+        if step[2]["how"] not in ("semi", "anti"):
+            # столбцы левой таблицы с именами из правой определяют суффиксы в результате
+            needed |= set(step[1].schema())
+        return needed
+    return set()
+
+
+def _join_keys(step):
+    on = step[2]["on"]
+    return {on} if isinstance(on, str) else set(on)
+
+
+def _push_slices(steps):
+    # slice можно выполнить раньше select и cast: они не меняют число строк
+    steps = list(steps)
+    moved = True
+    while moved:
+        moved = False
+        for i in range(1, len(steps)):
+            if steps[i][0] == "slice" and steps[i - 1][0] in ("select", "cast"):
+                steps[i - 1], steps[i] = steps[i], steps[i - 1]
+                moved = True
+    return steps
+
+
+def _can_pass(filter_step, step):
+    # Можно ли выполнить фильтр до шага step
+    kind = step[0]
+    cols = filter_step[1].columns()
+    if kind == "select":
+        return True
+    if kind == "cast":
+        return not (cols & set(step[1]))
+    if kind == "filter":
+        return False
+    if kind == "join":
+        # только условия на ключи: остальные имена могут прийти из правой таблицы
+        return step[2]["how"] in ("inner", "left", "semi", "anti") and cols <= _join_keys(step) \
+            and "right_on" not in step[2]
+    return False
+
+
+def _push_filters(steps):
+    steps = list(steps)
+    moved = True
+    while moved:
+        moved = False
+        for i in range(1, len(steps)):
+            if steps[i][0] == "filter" and _can_pass(steps[i], steps[i - 1]):
+                steps[i - 1], steps[i] = steps[i], steps[i - 1]
+                moved = True
+    return steps
+
+
+def _fuse_filters(steps):
+    # Соседние фильтры - одна маска и одна выборка строк
+    fused = []
+    for step in steps:
+        if step[0] == "filter" and fused and fused[-1][0] == "filter":
+            fused[-1] = ("filter", And(fused[-1][1], step[1]))
+        else:
+            fused.append(step)
+    return fused
+
+
+def _prune_selects(steps):
+    # Из select и cast убираются столбцы, которые дальше по плану не используются
+    pruned = []
+    needed = None
+    for step in reversed(steps):
+        if step[0] == "select":
+            if needed is not None:
+                step = ("select", [c for c in step[1] if c in needed])
+            needed = set(step[1])
+        elif step[0] == "cast" and needed is not None:
+            step = ("cast", {c: t for c, t in step[1].items() if c in needed})
+            if not step[1]:
+                continue
+        elif needed is not None:
+            needed |= _columns_of(step)
+        pruned.append(step)
+    pruned.reverse()
+    return pruned
+
+
+def _required_columns(steps, schema):
+    # Столбцы источника, нужные плану (None - все)
+    needed = None
+    for step in reversed(steps):
+        if step[0] == "select":
+            needed = set(step[1])
+        elif needed is not None:
+            needed |= _columns_of(step)
+    if needed is None:
+        return None
+    # имен, которых нет в источнике (например, из правой таблицы соединения), не читаем;
+    # если таких столбцов нет вовсе, ошибку даст соответствующий шаг
+    return [c for c in schema if c in needed]
+
+
+def scan_csv(*files, **kwargs):
+    # Ленивое чтение CSV (параметры - как у csv_module.load_table)
+    return LazyFrame(FileSource(csv_module, files, kwargs))
+
+
+def scan_binary(*files, **kwargs):
+    # Ленивое чтение бинарного формата (параметры - как у binary_module.load_table)
+    return LazyFrame(FileSource(binary_module, files, kwargs))
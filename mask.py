@@ -0,0 +1,183 @@
+import operator
+from itertools import compress, repeat
+from columns import ArrayColumn, BoolColumn, DictColumn
+from exceptions import BoolListLengthError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Операции сравнения по именам методов Table
+OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gr": operator.gt,
+    "ls": operator.lt,
+    "ge": operator.ge,
+    "le": operator.le,
+}
+
+_NUMPY_DTYPES = {'q': "int64", 'd': "float64"}
+
+
+class Mask:
+    # Булева маска строк таблицы.
+    # Хранится как массив numpy.bool_, если numpy установлен, иначе - как bytearray из 0/1.
+    # Поддерживает &, |, ~, подсчет истинных значений (count) и
+    # ведет себя как список bool (len, индексация, итерация, сравнение со списком).
+
+    def __init__(self, bits):
+        self.bits = bits
+
+    @classmethod
+    def from_bools(cls, values):
+        if isinstance(values, Mask):
+            return values
+        bits = bytearray(map(bool, values))
+        if np is not None:
+            return cls(np.frombuffer(bits, dtype=np.bool_).copy())
+        return cls(bits)
+
+    @classmethod
+    def from_bytes(cls, bits):
+        # Маска из bytearray значений 0/1 (без проверки)
+        if np is not None:
+            return cls(np.frombuffer(bits, dtype=np.bool_).copy())
+        return cls(bits)
+
+    @classmethod
+    def from_positions(cls, n, positions):
+        # Маска длины n, истинная в указанных позициях
+        if isinstance(positions, range) and positions.step == 1:
+            bits = bytearray(n)
+            bits[positions.start:positions.stop] = b"\x01" * len(positions)
+        elif np is not None:
+            bits = np.zeros(n, dtype=np.bool_)
+            bits[np.asarray(positions, dtype=np.intp)] = True
+            return cls(bits)
+        else:
+            bits = bytearray(n)
+            for i in positions:
+                bits[i] = 1
+        if np is not None:
+            return cls(np.frombuffer(bits, dtype=np.bool_).copy())
+        return cls(bits)
+
+    @classmethod
+    def full(cls, n, value):
+        # Маска длины n из одинаковых значений value
+        if np is not None:
+            return cls(np.full(n, bool(value)))
+        return cls(bytearray(b"\x01" * n if value else n))
+
+    def __len__(self):
+        return len(self.bits)
+
+    def __iter__(self):
+        return map(bool, self.bits)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.tolist()[i]
+        return bool(self.bits[i])
+
+    def tolist(self):
+        return list(map(bool, self.bits))
+
+    def count(self):
+        # Число истинных значений
+        if np is not None and not isinstance(self.bits, bytearray):
+            return int(np.count_nonzero(self.bits))
+        return self.bits.count(1)
+
+    def any(self):
+        return self.count() > 0
+
+    def all(self):
+        return self.count() == len(self)
+
+    def positions(self):
+        # Номера строк, для которых маска истинна
+        if np is not None and not isinstance(self.bits, bytearray):
+            return np.flatnonzero(self.bits).tolist()
+        return list(compress(range(len(self.bits)), self.bits))
+
+    def _other_bits(self, other):
+        if not isinstance(other, Mask):
+            other = Mask.from_bools(other)
+        if len(other) != len(self):
+            raise BoolListLengthError("Длины масок не совпадают")
+        bits = other.bits
+        if isinstance(self.bits, bytearray) != isinstance(bits, bytearray):
+            bits = bytearray(map(bool, bits)) if isinstance(self.bits, bytearray) else np.frombuffer(bytes(bits), dtype=np.bool_)
+        return bits
+
+    def _bitwise(self, other, op):
+        bits = self._other_bits(other)
+        if not isinstance(self.bits, bytearray):
+            return Mask(op(self.bits, bits))
+        # Побайтовая операция над 0/1 через длинные целые: один проход на C
+        n = len(bits)
+        a = int.from_bytes(self.bits, "little")
+        b = int.from_bytes(bits, "little")
+        return Mask(bytearray(op(a, b).to_bytes(n, "little")))
+
+    def __and__(self, other):
+        return self._bitwise(other, operator.and_)
+
+    def __or__(self, other):
+        return self._bitwise(other, operator.or_)
+
+    def __xor__(self, other):
+        return self._bitwise(other, operator.xor)
+
+    __rand__ = __and__
+    __ror__ = __or__
+    __rxor__ = __xor__
+
+    def __invert__(self):
+        if not isinstance(self.bits, bytearray):
+            return Mask(~self.bits)
+        return self._bitwise(Mask.full(len(self), True), operator.xor)
+
+    def __eq__(self, other):
+        if isinstance(other, (Mask, list)):
+            return self.tolist() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Mask({self.tolist()})"
+
+
+def compare_column(values, other, name):
+    # Сравнение всего столбца со значением или со списком значений.
+    # values - столбец хранилища (Column или список), name - ключ OPERATORS
+    op = OPERATORS[name]
+    if isinstance(other, list):
+        return Mask.from_bools(map(op, values, other))
+    if isinstance(values, DictColumn):
+        # сравнение один раз на каждое различное значение, затем выборка по номерам
+        dictionary = values.dictionary
+        try:
+            flags = bytes(map(op, dictionary, repeat(other)))
+        except TypeError:
+            # dictionary общий со столбцами, из которых взят этот (take/slice):
+            # несравнимое значение может в этом столбце не встречаться -
+            # сравниваются только значения с номерами из codes
+            flags = bytearray(len(dictionary))
+            for c in set(values.codes):
+                flags[c] = op(dictionary[c], other)
+            flags = bytes(flags)
+        if np is not None:
+            codes = np.frombuffer(values.codes, dtype=np.intc)
+            return Mask(np.frombuffer(flags, dtype=np.bool_)[codes])
+        return Mask(bytearray(map(flags.__getitem__, values.codes)))
+    if np is not None and type(other) in (int, float) and isinstance(values, (ArrayColumn, BoolColumn)):
+        dtype = "bool" if isinstance(values, BoolColumn) else _NUMPY_DTYPES[values.typecode]
+        try:
+            arr = np.frombuffer(values.values, dtype=dtype)
+            return Mask(np.asarray(op(arr, other), dtype=np.bool_))
+        except (OverflowError, TypeError):
+            pass
+    return Mask.from_bytes(bytearray(map(op, values, repeat(other))))
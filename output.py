@@ -0,0 +1,13 @@
+import gzip
+from exceptions import TableException
+
+# Открытие файлов для записи таблиц (csv_module, text_module)
+
+
+def open_output(file_path, compression=None, newline=None, buffering=-1):
+    # Текстовый файл utf-8 для записи; compression - None или "gzip"
+    if compression == "gzip":
+        return gzip.open(file_path, 'wt', newline=newline, encoding='utf-8', compresslevel=6)
+    if compression is not None:
+        raise TableException(f"Неизвестное сжатие {compression}")
+    return open(file_path, 'w', newline=newline, encoding='utf-8', buffering=buffering)
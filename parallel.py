@@ -0,0 +1,170 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
+from convert import _bulk, convert_values as _convert_values, describe_failures
+from exceptions import TableException, TypeConversionError
+from inference import parse_column
+from mask import Mask, compare_column
+
+# Параллельное выполнение операций над большими столбцами.
+#
+# По умолчанию выключено. Включается глобально или на время блока кода:
+#
+#   parallel.enable(workers=8)
+#   with parallel.parallel(workers=8):
+#       t.detect_column_types()
+#
+# Столбец из не менее чем MIN_ROWS значений делится на части по числу
+# процессов, части обрабатываются пулом процессов (ProcessPoolExecutor,
+# создается при первом использовании и живет до disable()), результаты
+# склеиваются в исходном порядке. Так выполняются сравнения со значением
+# (Table.eq/gr/... и, значит, маски для filter_rows), определение типов
+# (detect_column_types) и преобразование типов (set_column_types).
+# Значения передаются процессам через pickle, поэтому выигрыш есть только
+# для столбцов, обработка которых заметно дороже их пересылки
+# (разбор строк, пользовательские типы); пользовательские детекторы
+# (inference.register_detector) должны быть зарегистрированы до enable().
+
+MIN_ROWS = 200000
+
+_lock = threading.Lock()
+_workers = None
+_executor = None
+
+
+def enable(workers=None, min_rows=None):
+    # workers - число процессов (по умолчанию - число процессоров)
+    global _workers, MIN_ROWS
+    with _lock:
+        _shutdown()
+        _workers = workers or os.cpu_count() or 1
+        if min_rows is not None:
+            MIN_ROWS = min_rows
+
+
+def disable():
+    global _workers
+    with _lock:
+        _workers = None
+        _shutdown()
+
+
+def is_enabled():
+    return _workers is not None
+
+
+@contextmanager
+def parallel(workers=None, min_rows=None):
+    # Параллельный режим на время блока кода (глобальный, для всех потоков)
+    global MIN_ROWS
+    old_workers, old_min_rows = _workers, MIN_ROWS
+    enable(workers, min_rows)
+    try:
+        yield
+    finally:
+        # прежние настройки восстанавливаются независимо друг от друга
+        disable()
+        if old_workers is not None:
+            enable(old_workers)
+        MIN_ROWS = old_min_rows
+
+
+def _shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+atexit.register(disable)
+
+
+def active(n):
+    # Выполнять ли операцию над столбцом из n значений параллельно
+    return _workers is not None and _workers > 1 and n >= MIN_ROWS
+
+
+def _map(func, values, *args):
+    # func(часть, *args) по частям values -> список результатов по порядку
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=_workers)
+        executor, parts = _executor, _workers
+    n = len(values)
+    if not n:
+        return []
+    step = -(-n // parts)
+    chunks = [values[lo:lo + step] for lo in range(0, n, step)]
+    return list(executor.map(func, chunks, *(repeat(a) for a in args)))
+
+
+def _compare_part(values, other, op):
+    return bytes(compare_column(values, other, op).bits)
+
+
+def compare(values, other, op):
+    # То же, что mask.compare_column для значения other (не списка)
+    return Mask.from_bytes(bytearray(b"".join(_map(_compare_part, values, other, op))))
+
+
+def _detect_part(values, detectors, null_values):
+    # Номера детекторов, которым подходят все значения части
+    candidates = list(range(len(detectors)))
+    for s in values:
+        if s in null_values:
+            continue
+        candidates = [i for i in candidates if detectors[i].check(s)]
+        if not candidates:
+            break
+    return candidates
+
+
+def infer_detector(values, detectors, null_values=()):
+    # То же, что inference.infer_detector: первый по приоритету детектор,
+    # которому подходят значения всех частей
+    detectors = list(detectors)
+    common = set(range(len(detectors)))
+    for candidates in _map(_detect_part, values, detectors, null_values):
+        common.intersection_update(candidates)
+    return detectors[min(common)] if common else None
+
+
+def _parse_part(values, detector, null_values):
+    return parse_column(values, detector, null_values)
+
+
+def parse(values, detector, null_values=()):
+    # То же, что inference.parse_column
+    result = []
+    for part in _map(_parse_part, values, detector, null_values):
+        result.extend(part)
+    return result
+
+
+def _convert_part(values, t, errors, default):
+    return _convert_values(values, t, errors, default)
+
+
+def convert_values(values, t, errors="raise", default=None):
+    # То же, что convert.convert_values; неудачи собираются со всех частей
+    bulk = _bulk(values, t)
+    if bulk is not None:
+        return bulk, []
+    # части не бросают исключение, чтобы собрать неудачи целиком
+    part_errors = "null" if errors == "raise" else errors
+    if part_errors not in ("null", "default", "skip"):
+        raise TableException(f"Неизвестный режим обработки ошибок {errors}")
+    result = []
+    failures = []
+    for part, part_failures in _map(_convert_part, values, t, part_errors, default):
+        start = len(result)
+        failures.extend((start + i, v) for i, v in part_failures)
+        result.extend(part)
+    if failures and errors == "raise":
+        raise TypeConversionError(
+            f"Не удалось преобразовать {len(failures)} значений к типу {t} ({describe_failures(failures)})", failures)
+    return result, failures
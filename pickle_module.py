@@ -1,24 +1,57 @@
+import asyncio
 import pickle
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from table import Table
+from storage import ColumnStore, ViewStore
+from profiling import instrumented
 from exceptions import StructureMismatchError
 
-def load_table(*files, detect_types=False):
-    tables = []
-    for f in files:
-        with open(f, 'rb') as pf:
-            obj = pickle.load(pf)
-            # Предполагаем, что pickle содержит данные в формате:
-            # {
-            #   "columns": [...],
-            #   "data": [...],
-            #   "types": {col_name: type}
-            # }
-            columns = obj["columns"]
-            data = obj["data"]
-            types = obj["types"]
-            t = Table(columns=columns, data=data, types=types)
-            tables.append(t)
 
+# Асинхронные загрузка и сохранение: размер блока чтения/записи и сколько
+# прочитанных файлов может ждать разбора
+READ_BYTES = 4 << 20
+PREFETCH = 2
+
+
+def _load_one(file_path, storage):
+    with open(file_path, 'rb') as pf:
+        return _from_obj(pickle.load(pf), storage)
+
+
+def _from_obj(obj, storage):
+    # Предполагаем, что pickle содержит данные в формате:
+    # {
+    #   "columns": [...],
+    #   "data": [...],            - строки (построчная таблица)
+    #   или "cols": [...], "nrows": n - столбцы (поколоночная таблица)
+    #   "types": {col_name: type}
+    # }
+    columns = obj["columns"]
+    types = obj["types"]
+    if "cols" in obj:
+        t = Table._from_store(columns, ColumnStore(obj["cols"], obj["nrows"]), types)
+        if storage != "columns":
+            t.set_storage(storage)
+        return t
+    data = obj["data"]
+    return Table(columns=columns, data=data, types=types, storage=storage)
+
+
+@instrumented("pickle_module.load_table", io="read")
+def load_table(*files, detect_types=False, workers=None, storage="rows"):
+    # workers - читать файлы в пуле из workers процессов.
+    # Процессы возвращают таблицы в поколоночном виде: компактные столбцы
+    # передаются между процессами намного дешевле списков строк.
+    if workers is not None and workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tables = list(executor.map(_load_one, files, repeat("columns")))
+    else:
+        tables = [_load_one(f, storage) for f in files]
+    return _combine(tables, storage, detect_types)
+
+
+def _combine(tables, storage, detect_types):
     if not tables:
         raise StructureMismatchError("Не удалось загрузить ни одной таблицы")
 
@@ -32,21 +65,111 @@ def load_table(*files, detect_types=False):
             if t.types[c] != tables[0].types[c]:
                 raise StructureMismatchError("Типы столбцов не совпадают в разных файлах")
 
-    # Объединим
+    # Объединим в первую таблицу без промежуточных копий
     res = tables[0]
     for t in tables[1:]:
-        res = Table.concat(res, t)
+        res._writable_store().extend(t._store)
+
+    if res.storage != storage:
+        res.set_storage(storage)
 
     if detect_types:
         res.detect_column_types()
 
     return res
 
-def save_table(table, file_path):
+
+async def _produce_files(files, read_bytes, queue):
+    # Чтение файлов блоками в фоне: в очередь идут содержимое файлов
+    # по порядку, при ошибке - исключение
+    loop = asyncio.get_running_loop()
+    try:
+        for path in files:
+            f = await loop.run_in_executor(None, open, path, 'rb')
+            try:
+                parts = []
+                while True:
+                    data = await loop.run_in_executor(None, f.read, read_bytes)
+                    if not data:
+                        break
+                    parts.append(data)
+            finally:
+                await loop.run_in_executor(None, f.close)
+            await queue.put(b"".join(parts))
+    except Exception as e:
+        await queue.put(e)
+
+
+async def load_table_async(*files, detect_types=False, storage="rows", read_bytes=READ_BYTES,
+                           prefetch=PREFETCH):
+    # То же, что load_table, для asyncio: событийный цикл не блокируется.
+    # Следующий файл читается в фоне (блоками по read_bytes), пока предыдущий
+    # разбирается в потоке пула цикла; прочитанных, но не разобранных
+    # файлов не больше prefetch.
+    if not files:
+        raise StructureMismatchError("Не удалось загрузить ни одной таблицы")
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=prefetch)
+    producer = asyncio.ensure_future(_produce_files(files, read_bytes, queue))
+    tables = []
+    try:
+        for _ in files:
+            data = await queue.get()
+            if isinstance(data, Exception):
+                raise data
+            tables.append(await loop.run_in_executor(None, _loads, data, storage))
+    finally:
+        producer.cancel()
+    return await loop.run_in_executor(None, _combine, tables, storage, detect_types)
+
+
+def _loads(data, storage):
+    return _from_obj(pickle.loads(data), storage)
+
+
+def _to_obj(table):
+    # Поколоночная таблица сохраняется столбцами как есть: компактные буферы
+    # и словарные столбцы (Category) переживают сохранение и загрузку.
+    # В построчной таблице одинаковые объекты значений (например,
+    # интернированные строки Category) pickle сохраняет один раз.
     obj = {
         "columns": table.columns,
-        "data": table.data,
         "types": table.types
     }
+    store = table._store
+    if isinstance(store, ViewStore) and store.kind == "columns":
+        store = store.materialize()
+    if isinstance(store, ColumnStore):
+        obj["cols"] = store.cols
+        obj["nrows"] = store.nrows()
+    elif store.kind == "spill":
+        # таблица на диске (spill.py) сохраняется тоже столбцами
+        obj["cols"] = [store.column(j) for j in range(len(table.columns))]
+        obj["nrows"] = store.nrows()
+    else:
+        obj["data"] = table.data
+    return obj
+
+
+@instrumented("pickle_module.save_table", io="write")
+def save_table(table, file_path):
     with open(file_path, 'wb') as pf:
-        pickle.dump(obj, pf)
+        pickle.dump(_to_obj(table), pf)
+
+
+async def save_table_async(table, file_path, write_bytes=READ_BYTES):
+    # То же, что save_table, для asyncio: сериализация и запись блоками
+    # по write_bytes идут в потоках пула событийного цикла
+    loop = asyncio.get_running_loop()
+    data = await loop.run_in_executor(None, _dumps, table)
+    f = await loop.run_in_executor(None, open, file_path, 'wb')
+    try:
+        view = memoryview(data)
+        for start in range(0, len(view), write_bytes):
+            await loop.run_in_executor(None, f.write, view[start:start + write_bytes])
+    finally:
+        await loop.run_in_executor(None, f.close)
+
+
+def _dumps(table):
+    return pickle.dumps(_to_obj(table), pickle.HIGHEST_PROTOCOL)
@@ -0,0 +1,180 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from mask import Mask
+
+# Счетчики и таймеры операций Table и загрузчиков/сохранения.
+#
+# По умолчанию выключены: обернутая функция только проверяет один флаг.
+# Включаются глобально (enable/disable) или на время блока кода:
+#
+#   with profiling.profile() as prof:
+#       t = csv_module.load_table("big.csv", detect_types=True)
+#       t.filter_rows(t.gr(0, "amount"))
+#   print(prof.report())
+#
+# По каждой операции копятся: число вызовов, время (включая вложенные операции),
+# строк на входе (сумма num_rows таблиц среди аргументов), строк на выходе
+# (num_rows результата, для масок сравнений - число выбранных строк, или, если
+# операция ничего не возвращает, - num_rows первого аргумента),
+# байт прочитано/записано (размеры файлов загрузчиков и сохранения).
+# Для своей системы метрик: snapshot() - словарь со всеми счетчиками,
+# add_sink(func) - func(event) вызывается после каждой операции.
+
+_lock = threading.Lock()
+_enabled = False
+_global_enabled = False
+_profiles = []
+_sinks = []
+
+FIELDS = ("calls", "seconds", "rows_in", "rows_out", "bytes_read", "bytes_written")
+
+
+class Profile:
+    # Накопленные счетчики: {операция: {поле: значение}}
+    def __init__(self):
+        self.stats = {}
+
+    def add(self, event):
+        s = self.stats.get(event["op"])
+        if s is None:
+            s = self.stats[event["op"]] = dict.fromkeys(FIELDS, 0)
+        s["calls"] += 1
+        for f in FIELDS[1:]:
+            s[f] += event[f]
+
+    def snapshot(self):
+        return {op: dict(s) for op, s in self.stats.items()}
+
+    def report(self):
+        # Текстовая таблица, самые долгие операции сверху
+        lines = [f"{'операция':<32} {'вызовов':>8} {'секунд':>10} {'строк вх.':>10} {'строк вых.':>10} {'байт':>12}"]
+        for op, s in sorted(self.stats.items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"{op:<32} {s['calls']:>8} {s['seconds']:>10.4f} {s['rows_in']:>10} "
+                         f"{s['rows_out']:>10} {s['bytes_read'] + s['bytes_written']:>12}")
+        return "\n".join(lines)
+
+
+_global = Profile()
+
+
+def _update_flag():
+    global _enabled
+    _enabled = _global_enabled or bool(_profiles)
+
+
+def enable():
+    global _global_enabled
+    with _lock:
+        _global_enabled = True
+        _update_flag()
+
+
+def disable():
+    global _global_enabled
+    with _lock:
+        _global_enabled = False
+        _update_flag()
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _global.stats.clear()
+
+
+def snapshot():
+    # Счетчики, накопленные при глобально включенном профилировании
+    with _lock:
+        return _global.snapshot()
+
+
+def report():
+    with _lock:
+        return _global.report()
+
+
+def add_sink(func):
+    with _lock:
+        _sinks.append(func)
+
+
+def remove_sink(func):
+    with _lock:
+        _sinks.remove(func)
+
+
+@contextmanager
+def profile():
+    # Профиль блока кода (независимо от глобального enable)
+    prof = Profile()
+    with _lock:
+        _profiles.append(prof)
+        _update_flag()
+    try:
+        yield prof
+    finally:
+        with _lock:
+            _profiles.remove(prof)
+            _update_flag()
+
+
+def _rows(obj):
+    if isinstance(obj, Mask):
+        return obj.count()
+    n = getattr(obj, "num_rows", None)
+    if isinstance(n, int):
+        return n
+    if isinstance(obj, tuple):
+        return sum(_rows(o) for o in obj)
+    return 0
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError, ValueError):
+        return 0
+
+
+def _record(event):
+    with _lock:
+        if _global_enabled:
+            _global.add(event)
+        for prof in _profiles:
+            prof.add(event)
+        sinks = list(_sinks)
+    for sink in sinks:
+        sink(event)
+
+
+def instrumented(op, io=None):
+    # Декоратор операции op.
+    # io="read" - позиционные аргументы-пути считаются прочитанными файлами,
+    # io="write" - второй аргумент (file_path) - записанный файл
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            rows_in = sum(_rows(a) for a in args)
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            seconds = time.perf_counter() - start
+            bytes_read = bytes_written = 0
+            if io == "read":
+                bytes_read = sum(_file_size(a) for a in args if isinstance(a, (str, os.PathLike)))
+            elif io == "write":
+                bytes_written = _file_size(args[1] if len(args) > 1 else kwargs.get("file_path"))
+            # операции, меняющие таблицу на месте, и сохранение: строки первого аргумента
+            rows_out = _rows(result) if result is not None or not args else _rows(args[0])
+            _record({"op": op, "seconds": seconds, "rows_in": rows_in, "rows_out": rows_out,
+                     "bytes_read": bytes_read, "bytes_written": bytes_written})
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,248 @@
+from array import array
+from itertools import chain
+from columns import BoolColumn, FloatColumn, IntColumn, make_column
+from convert import ERROR_POLICIES, convert_values, describe_failures
+from exceptions import InvalidColumnError, SchemaError, TableException
+from storage import ColumnStore
+
+# Проверка данных по схеме и сборка поколоночного хранилища
+# для Table.from_columns / from_records / from_arrays.
+#
+# Схема - словарь {имя_столбца: тип} или {номер_столбца: тип}. Для столбцов без
+# типа в схеме тип берется по самим значениям (int, float, bool, str; смесь
+# int и float - float, другая смесь - object), без отдельного прохода
+# detect_column_types. None допустим в столбце любого типа.
+# Каждый столбец проверяется одним проходом: если все значения уже нужного
+# типа, столбец собирается сразу, иначе значения преобразуются (convert.convert_values).
+# Все ошибки (строки неверной длины, значения, которые не преобразуются)
+# собираются вместе и по errors:
+#   "raise" - SchemaError со списком всех ошибок (errors)
+#   "null"  - неудачные значения заменяются на None
+#   "skip"  - строки с неудачными значениями не попадают в таблицу
+# Строки неверной длины и записи-словари с отсутствующими или лишними ключами
+# (from_records) при "skip" пропускаются, при "raise" - ошибки SchemaError;
+# при "null" отсутствующие ключи дают None, лишние не читаются.
+
+_NONE = type(None)
+
+
+class _Marker:
+    # Значение в SchemaError.errors для ошибок ключей записи
+    def __init__(self, text):
+        self.text = text
+
+    def __repr__(self):
+        return self.text
+
+
+MISSING = _Marker("нет ключа")
+EXTRA = _Marker("лишний ключ")
+
+# Коды array, которые без преобразования значений переводятся в столбцы
+_INT_CODES = "bBhHiIlLqQ"
+_FLOAT_CODES = "fd"
+
+
+def normalize_types(columns, types):
+    # Схема по именам столбцов: номера заменяются на имена, неизвестные
+    # имена и номера - ошибка; столбцов без типа в результате нет
+    if not types:
+        return {}
+    if all(isinstance(k, int) for k in types):
+        bad = [k for k in types if not 0 <= k < len(columns)]
+        if bad:
+            raise InvalidColumnError(f"Неверные номера столбцов в схеме: {bad}")
+        return {columns[k]: t for k, t in types.items()}
+    bad = [k for k in types if k not in columns]
+    if bad:
+        raise InvalidColumnError(f"Столбцы {bad} из схемы не найдены")
+    return dict(types)
+
+
+def infer_type(values):
+    # Тип столбца по типам python-значений
+    kinds = set(map(type, values))
+    kinds.discard(_NONE)
+    if not kinds:
+        return str
+    if len(kinds) == 1:
+        return kinds.pop()
+    if kinds == {int, float}:
+        return float
+    return object
+
+
+def coerce(values, t):
+    # -> (значения типа t, список (номер, значение) неудач); неудачные - None.
+    # Значения типа t и None не меняются, остальные преобразуются
+    # convert.convert_values одним вызовом
+    keep = (t, _NONE)
+    if set(map(type, values)) <= set(keep):
+        return values, []
+    positions = [i for i, v in enumerate(values) if type(v) not in keep]
+    if len(positions) == len(values):
+        return convert_values(values, t, errors="null")
+    converted, failures = convert_values([values[i] for i in positions], t, errors="null")
+    result = list(values)
+    for i, v in zip(positions, converted):
+        result[i] = v
+    return result, [(positions[k], v) for k, v in failures]
+
+
+def check_widths(rows, width):
+    # Ошибки для строк, длина которых не равна width (быстро, если ошибок нет)
+    if set(map(len, rows)) <= {width}:
+        return []
+    return [(i, None, row) for i, row in enumerate(rows) if len(row) != width]
+
+
+def record_columns(records):
+    # Имена столбцов по записям-словарям: все ключи в порядке появления
+    # (records[0] - словарь)
+    first = records[0].keys()
+    if all(isinstance(r, dict) and r.keys() == first for r in records):
+        return list(first)
+    return list(dict.fromkeys(chain.from_iterable(r for r in records if isinstance(r, dict))))
+
+
+def check_keys(records, columns):
+    # Ошибки для записей-словарей, ключи которых не совпадают с columns
+    keys = set(columns)
+    if all(r.keys() == keys for r in records):
+        return []
+    bad = []
+    for i, r in enumerate(records):
+        if r.keys() != keys:
+            bad.extend((i, c, MISSING) for c in columns if c not in r)
+            bad.extend((i, k, EXTRA) for k in r if k not in keys)
+    return bad
+
+
+def split_records(records, columns, errors="raise"):
+    # Записи (словари или последовательности) -> значения по столбцам
+    if not records:
+        return [[] for _ in columns]
+    if set(map(type, records)) <= {dict}:
+        bad = check_keys(records, columns)
+        if bad and errors != "null":
+            if errors != "skip":
+                raise_errors(bad)
+            skip = {i for i, _, _ in bad}
+            records = [r for i, r in enumerate(records) if i not in skip]
+        return [[r.get(c) for r in records] for c in columns]
+    if any(isinstance(r, dict) for r in records):
+        raise SchemaError("Записи - вперемешку словари и последовательности")
+    bad = check_widths(records, len(columns))
+    if bad:
+        if errors != "skip":
+            raise_errors(bad)
+        skip = {i for i, _, _ in bad}
+        records = [r for i, r in enumerate(records) if i not in skip]
+    if not columns:
+        return []
+    return [list(values) for values in zip(*records)] if records else [[] for _ in columns]
+
+
+def _describe_error(error):
+    i, col, v = error
+    if col is None:
+        return f"строка {i}: {len(v)} значений"
+    return f"строка {i}, столбец {col}: {v!r}"
+
+
+def describe_errors(errors):
+    return describe_failures(errors, _describe_error)
+
+
+def raise_errors(errors):
+    raise SchemaError(f"Данные не соответствуют схеме (ошибок: {len(errors)}): {describe_errors(errors)}",
+                      errors)
+
+
+def _typed_array(values, t):
+    # Столбец прямо из типизированного буфера (array, memoryview, numpy) или None
+    dtype = getattr(values, "dtype", None)
+    if dtype is not None:
+        # numpy: значения копируются одним вызовом, без python-объектов
+        if t is int and dtype.kind in "iu":
+            if dtype.kind == "u" and dtype.itemsize == 8 and values.size and values.max() >= 2 ** 63:
+                # не помещается в int64 - обычным путем (значения - python int)
+                return None
+            return IntColumn(array('q', values.astype("int64").tobytes()))
+        if t is float and dtype.kind in "iuf":
+            return FloatColumn(array('d', values.astype("float64").tobytes()))
+        if t is bool and dtype.kind == "b":
+            return BoolColumn(bytearray(values.astype("uint8").tobytes()))
+        return None
+    code = getattr(values, "typecode", None) or getattr(values, "format", None)
+    if code is None or not isinstance(values, (array, memoryview)):
+        return None
+    try:
+        if t is int and code in _INT_CODES:
+            return IntColumn(values if code == IntColumn.typecode else array('q', values))
+        if t is float and code in _INT_CODES + _FLOAT_CODES:
+            return FloatColumn(values if code == FloatColumn.typecode else array('d', values))
+    except OverflowError:
+        # беззнаковые числа вне int64 - обычным путем
+        pass
+    return None
+
+
+def array_type(values):
+    # Тип столбца по типизированному буферу или None
+    dtype = getattr(values, "dtype", None)
+    if dtype is not None:
+        return {"i": int, "u": int, "f": float, "b": bool}.get(dtype.kind)
+    code = getattr(values, "typecode", None) or getattr(values, "format", None)
+    if isinstance(values, (array, memoryview)) and code is not None:
+        return int if code in _INT_CODES else float if code in _FLOAT_CODES else None
+    return None
+
+
+def build_store(columns, values_list, types=None, errors="raise"):
+    # Поколоночное хранилище из значений по столбцам.
+    # -> (ColumnStore, типы {имя_столбца: тип})
+    if errors not in ERROR_POLICIES or errors == "default":
+        raise TableException(f"Неизвестный режим обработки ошибок {errors}")
+    if len(columns) != len(values_list):
+        raise SchemaError("Число столбцов не совпадает с числом имен")
+    if len(set(columns)) != len(columns):
+        raise SchemaError("Имена столбцов повторяются")
+    lengths = set(map(len, values_list))
+    if len(lengths) > 1:
+        sizes = {c: len(v) for c, v in zip(columns, values_list)}
+        raise SchemaError(f"Столбцы разной длины: {sizes}")
+    n = lengths.pop() if lengths else 0
+    schema = normalize_types(columns, types)
+
+    errors_found = []
+    result_types = {}
+    cols = []
+    # столбцы над буферами вызывающего кода - копируются перед изменением на месте
+    borrowed = set()
+    for j, (name, values) in enumerate(zip(columns, values_list)):
+        t = schema.get(name)
+        if t is None:
+            t = array_type(values) or infer_type(values)
+        result_types[name] = t
+        col = _typed_array(values, t)
+        if col is not None and col.values is values:
+            borrowed.add(j)
+        if col is None:
+            if not isinstance(values, list):
+                values = values.tolist() if hasattr(values, "tolist") else list(values)
+            values, failures = coerce(values, t)
+            errors_found.extend((i, name, v) for i, v in failures)
+            col = make_column(t, values)
+        cols.append(col)
+
+    store = ColumnStore(cols, n)
+    store._borrowed = borrowed
+    if errors_found:
+        if errors == "raise":
+            errors_found.sort(key=lambda e: e[0])
+            raise_errors(errors_found)
+        if errors == "skip":
+            bad = {i for i, _, _ in errors_found}
+            store = store.take([i for i in range(n) if i not in bad])
+    return store, result_types
@@ -0,0 +1,416 @@
+import heapq
+import itertools
+import pickle
+import sys
+import tempfile
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import islice
+from columns import Column, concat_columns, make_column
+from exceptions import MergeConflictError
+from join import _resolve, build_store, gather, join_tables
+from storage import RowStore, RowsView
+
+# Хранилище таблицы на диске (storage="spill") для данных больше памяти.
+#
+# Строки разбиты на куски по chunk_rows строк, каждый столбец куска хранится
+# отдельным блоком (pickle столбца из columns.py) во временном файле.
+# В памяти - только оглавление (куски и смещения блоков) и общий для всех
+# хранилищ кеш последних прочитанных блоков (не больше CACHE_CHUNKS,
+# вытесняются давно не использованные).
+#
+# Файл только дописывается: изменение столбца записывает новые блоки, а старые
+# остаются на месте. Поэтому хранилища, полученные срезом (split, concat,
+# get_rows_by_number), выбором столбцов или дописыванием другого такого
+# хранилища, разделяют блоки без копирования, а копирование при записи не нужно.
+# Файл удаляется, когда на его блоки больше не ссылается ни одно хранилище.
+#
+# Выборка строк (filter_rows, sort_by) записывает новые куски, сравнения
+# проходят столбец по кускам. Сортировка (sort_store) - внешняя: отсортированные
+# серии по MEMORY_BUDGET байт пишутся на диск и сливаются. Соединение
+# (join_spilled) делит обе таблицы по хешу ключа на части, каждая пара частей
+# соединяется в памяти; строки результата идут по частям, а не в порядке левой таблицы.
+
+CHUNK_ROWS = 65536
+CACHE_CHUNKS = 64
+MEMORY_BUDGET = 256 * 2 ** 20
+
+# Каталог временных файлов (None - системный)
+SPILL_DIR = None
+
+_serials = itertools.count()
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class SpillFile:
+    # Временный файл, в который только дописываются блоки
+    def __init__(self, directory=None):
+        self.serial = next(_serials)
+        self._f = tempfile.TemporaryFile(dir=directory or SPILL_DIR)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        # -> блок (файл, смещение, размер)
+        with self._lock:
+            offset = self._size
+            self._f.seek(offset)
+            self._f.write(data)
+            self._size += len(data)
+        return self, offset, len(data)
+
+    def read(self, offset, size):
+        with self._lock:
+            self._f.seek(offset)
+            return self._f.read(size)
+
+    @property
+    def size(self):
+        return self._size
+
+
+def set_cache_size(chunks):
+    # Сколько блоков держать в памяти
+    global CACHE_CHUNKS
+    with _cache_lock:
+        CACHE_CHUNKS = chunks
+        while len(_cache) > CACHE_CHUNKS:
+            _cache.popitem(last=False)
+
+
+def _load(block):
+    f, offset, size = block
+    key = (f.serial, offset)
+    with _cache_lock:
+        col = _cache.get(key)
+        if col is not None:
+            _cache.move_to_end(key)
+            return col
+    col = pickle.loads(f.read(offset, size))
+    with _cache_lock:
+        _cache[key] = col
+        while len(_cache) > CACHE_CHUNKS:
+            _cache.popitem(last=False)
+    return col
+
+
+class SpillStore:
+    kind = "spill"
+
+    def __init__(self, types, chunk_rows=CHUNK_ROWS, file=None):
+        # types - список типов столбцов по порядку
+        # file - SpillFile для новых блоков (по умолчанию - свой временный файл)
+        self.types = list(types)
+        self.chunk_rows = chunk_rows
+        self._file = file if file is not None else SpillFile()
+        # [(число строк, [блок каждого столбца])]
+        self._chunks = []
+        # номера первых строк кусков; последний элемент - число строк
+        self._starts = [0]
+        # блоки не меняются на месте, поэтому разделять их можно без copy-on-write
+        self.shared = False
+
+    @classmethod
+    def from_rows(cls, rows, types):
+        store = cls(types)
+        store.extend(RowStore(rows))
+        return store
+
+    def _new(self, types=None):
+        return SpillStore(self.types if types is None else types, self.chunk_rows, self._file)
+
+    def _add_chunk(self, nrows, blocks):
+        self._chunks.append((nrows, blocks))
+        self._starts.append(self._starts[-1] + nrows)
+
+    def _write_chunk(self, cols, nrows):
+        blocks = [self._file.write(pickle.dumps(col, pickle.HIGHEST_PROTOCOL)) for col in cols]
+        self._add_chunk(nrows, blocks)
+
+    def _chunk_column(self, k, j):
+        # Столбец j куска k (объект из кеша - не изменять)
+        return _load(self._chunks[k][1][j])
+
+    def _locate(self, i):
+        return bisect_right(self._starts, i) - 1
+
+    def as_data(self):
+        return RowsView(self)
+
+    def nrows(self):
+        return self._starts[-1]
+
+    def disk_bytes(self):
+        # Размер блоков этого хранилища на диске
+        return sum(size for _, blocks in self._chunks for _, _, size in blocks)
+
+    def row(self, i):
+        k = self._locate(i)
+        lo = self._starts[k]
+        return [self._chunk_column(k, j)[i - lo] for j in range(len(self.types))]
+
+    def iter_rows(self):
+        for k, (nrows, _) in enumerate(self._chunks):
+            if not self.types:
+                yield from ([] for _ in range(nrows))
+                continue
+            cols = [self._chunk_column(k, j) for j in range(len(self.types))]
+            yield from map(list, zip(*cols))
+
+    def iter_column(self, j):
+        # Столбец j по кускам (объекты из кеша - не изменять)
+        for k in range(len(self._chunks)):
+            yield self._chunk_column(k, j)
+
+    def column(self, j):
+        # части - срезы, а не объекты из кеша: результат можно изменять
+        return concat_columns(self._pieces(j, 0, self.nrows()), self.types[j])
+
+    def column_list(self, j):
+        values = []
+        for col in self.iter_column(j):
+            values.extend(col.tolist())
+        return values
+
+    def _pieces(self, j, start, stop):
+        # Части столбца j, покрывающие строки [start, stop)
+        k = self._locate(start) if start < self.nrows() else len(self._chunks)
+        parts = []
+        while k < len(self._chunks) and self._starts[k] < stop:
+            lo = self._starts[k]
+            a, b = max(start, lo) - lo, min(stop, self._starts[k + 1]) - lo
+            parts.append(self._chunk_column(k, j).slice(a, b))
+            k += 1
+        return parts
+
+    def take_column(self, j, positions):
+        if isinstance(positions, range) and positions.step == 1:
+            return concat_columns(self._pieces(j, positions.start, positions.stop), self.types[j])
+        starts = self._starts
+        values = []
+        lo = hi = 0
+        col = None
+        for i in positions:
+            if not lo <= i < hi:
+                k = bisect_right(starts, i) - 1
+                lo, hi = starts[k], starts[k + 1]
+                col = self._chunk_column(k, j)
+            values.append(col[i - lo])
+        return make_column(self.types[j], values)
+
+    def take(self, positions):
+        # Новое хранилище (в том же файле) из строк positions.
+        # Целые куски внутри непрерывного диапазона не копируются.
+        if isinstance(positions, range) and positions.step == 1:
+            return self._take_range(positions.start, positions.stop)
+        out = self._new()
+        it = iter(positions)
+        while True:
+            batch = list(islice(it, self.chunk_rows))
+            if not batch:
+                break
+            out._write_chunk([self.take_column(j, batch) for j in range(len(self.types))], len(batch))
+        return out
+
+    def _take_range(self, start, stop):
+        out = self._new()
+        stop = min(stop, self.nrows())
+        if start >= stop:
+            return out
+        for k in range(self._locate(start), len(self._chunks)):
+            lo, hi = self._starts[k], self._starts[k + 1]
+            if lo >= stop:
+                break
+            if start <= lo and hi <= stop:
+                out._add_chunk(*self._chunks[k])
+            else:
+                a, b = max(start, lo) - lo, min(stop, hi) - lo
+                out._write_chunk([self._chunk_column(k, j).slice(a, b) for j in range(len(self.types))], b - a)
+        return out
+
+    def slice(self, start, stop):
+        return self._take_range(start, stop)
+
+    def copy(self):
+        return self._take_range(0, self.nrows())
+
+    def view(self, sel):
+        return self.take(sel)
+
+    def detach(self):
+        return self
+
+    def project(self, col_indexes):
+        out = self._new([self.types[j] for j in col_indexes])
+        for nrows, blocks in self._chunks:
+            out._add_chunk(nrows, [blocks[j] for j in col_indexes])
+        return out
+
+    def extend(self, other):
+        if isinstance(other, SpillStore):
+            for chunk in other._chunks:
+                self._add_chunk(*chunk)
+            return
+        m = other.nrows()
+        pos = 0
+        if self._chunks and self._chunks[-1][0] < self.chunk_rows and m:
+            # неполный последний кусок дополняется, а не остается мелким
+            last, blocks = self._chunks.pop()
+            self._starts.pop()
+            pos = min(self.chunk_rows - last, m)
+            cols = [concat_columns([_load(blocks[j]), make_column(t, other.take_column(j, range(0, pos)))], t)
+                    for j, t in enumerate(self.types)]
+            self._write_chunk(cols, last + pos)
+        for start in range(pos, m, self.chunk_rows):
+            stop = min(start + self.chunk_rows, m)
+            cols = [make_column(t, other.take_column(j, range(start, stop))) for j, t in enumerate(self.types)]
+            self._write_chunk(cols, stop - start)
+
+    def set_column(self, j, values, t=None):
+        if t is not None:
+            self.types[j] = t
+        t = self.types[j]
+        for k, (nrows, blocks) in enumerate(self._chunks):
+            lo = self._starts[k]
+            part = values.slice(lo, lo + nrows) if isinstance(values, Column) else values[lo:lo + nrows]
+            blocks = list(blocks)
+            blocks[j] = self._file.write(pickle.dumps(make_column(t, part), pickle.HIGHEST_PROTOCOL))
+            self._chunks[k] = (nrows, blocks)
+
+
+def _row_bytes(store, sample=100):
+    # Оценка памяти под одну строку в виде python-объектов (по первым строкам)
+    rows = list(islice(store.iter_rows(), sample))
+    if not rows:
+        return 1
+    total = sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in rows)
+    return max(1, total // len(rows))
+
+
+class _SortKey:
+    # Ключ сортировки по нескольким столбцам с направлением для каждого
+    __slots__ = ("k", "rev")
+
+    def __init__(self, k, rev):
+        self.k = k
+        self.rev = rev
+
+    def __lt__(self, other):
+        for a, b, r in zip(self.k, other.k, self.rev):
+            if a != b:
+                return b < a if r else a < b
+        return False
+
+    def __eq__(self, other):
+        return self.k == other.k
+
+
+def _sort_key(col_indexes, reverse):
+    # Порядок - как у Table.argsort: None после остальных значений (при reverse - перед ними)
+    if not any(reverse):
+        return lambda row: tuple((row[j] is None, row[j]) for j in col_indexes)
+    return lambda row: _SortKey(tuple((row[j] is None, row[j]) for j in col_indexes), reverse)
+
+
+def sort_store(store, col_indexes, reverse, budget=None):
+    # Внешняя сортировка (устойчивая): серии, помещающиеся в budget байт,
+    # сортируются в памяти и пишутся во временные файлы, затем сливаются
+    key = _sort_key(col_indexes, reverse)
+    run_rows = max(store.chunk_rows, (budget or MEMORY_BUDGET) // _row_bytes(store))
+    runs = []
+    it = store.iter_rows()
+    while True:
+        rows = list(islice(it, run_rows))
+        if not rows:
+            break
+        rows.sort(key=key)
+        run = SpillStore(store.types, store.chunk_rows)
+        run.extend(RowStore(rows))
+        runs.append(run)
+    if len(runs) == 1:
+        return runs[0]
+    out = SpillStore(store.types, store.chunk_rows)
+    merged = heapq.merge(*(run.iter_rows() for run in runs), key=key)
+    while True:
+        rows = list(islice(merged, store.chunk_rows))
+        if not rows:
+            break
+        out.extend(RowStore(rows))
+    return out
+
+
+def partition(store, types, col_indexes, parts, chunk_rows=CHUNK_ROWS):
+    # Разбить строки хранилища на parts хранилищ по хешу ключа (столбцы col_indexes)
+    f = SpillFile()
+    outs = [SpillStore(types, chunk_rows, f) for _ in range(parts)]
+    bufs = [[] for _ in range(parts)]
+    if len(col_indexes) == 1:
+        j = col_indexes[0]
+        part_of = lambda row: hash(row[j]) % parts
+    else:
+        part_of = lambda row: hash(tuple(row[j] for j in col_indexes)) % parts
+    for row in store.iter_rows():
+        p = part_of(row)
+        buf = bufs[p]
+        buf.append(row)
+        if len(buf) >= chunk_rows:
+            outs[p].extend(RowStore(buf))
+            bufs[p] = []
+    for out, buf in zip(outs, bufs):
+        if buf:
+            out.extend(RowStore(buf))
+    return outs
+
+
+def join_spilled(left, right, on, how="inner", right_on=None, suffix="_right", sort_merge=False,
+                 budget=None):
+    # Соединение таблиц (join.join_tables), из которых хотя бы одна хранится на диске:
+    # обе таблицы делятся по хешу ключа на части размером примерно в budget байт,
+    # и каждая пара частей соединяется в памяти. -> (columns, SpillStore, types)
+    from table import Table
+    on_list = [on] if isinstance(on, str) else list(on)
+    right_list = on_list if right_on is None else ([right_on] if isinstance(right_on, str) else list(right_on))
+    left_idx = _resolve(left, on_list)
+    right_idx = _resolve(right, right_list)
+    size = max(_row_bytes(left._store) * left.num_rows, _row_bytes(right._store) * right.num_rows)
+    parts = max(2, -(-size // (budget or MEMORY_BUDGET)))
+
+    pairs = []
+    for table, idx in ((left, left_idx), (right, right_idx)):
+        types = [table.types[c] for c in table.columns]
+        pairs.append(partition(table._store, types, idx, parts))
+
+    result = None
+    for lp, rp in zip(*pairs):
+        lt = Table._from_store(left.columns, build_store(
+            [lp.column(j) for j in range(len(left.columns))], lp.types, "columns", lp.nrows()), dict(left.types))
+        rt = Table._from_store(right.columns, build_store(
+            [rp.column(j) for j in range(len(right.columns))], rp.types, "columns", rp.nrows()), dict(right.types))
+        columns, store, types = join_tables(lt, rt, on, how=how, right_on=right_on, suffix=suffix,
+                                            sort_merge=sort_merge)
+        if result is None:
+            result = SpillStore([types[c] for c in columns])
+        result.extend(store)
+    return columns, result, types
+
+
+def merge_store(table1, table2, right_pos, types):
+    # Столбцы Table.merge_tables для таблицы на диске: строки собираются по кускам.
+    # right_pos - номера строк table2 для каждой строки table1
+    out = SpillStore(types)
+    n = table1.num_rows
+    for start in range(0, n, out.chunk_rows):
+        sel = range(start, min(start + out.chunk_rows, n))
+        cols = [table1._store.take_column(j, sel) for j in range(len(table1.columns))]
+        pos = right_pos[start:sel.stop]
+        for j, c in enumerate(table2.columns):
+            values = gather(table2._store, j, pos)
+            if c in table1.columns:
+                if list(values) != list(cols[table1.columns.index(c)]):
+                    raise MergeConflictError(f"Конфликт значений в столбце {c}")
+            else:
+                cols.append(values)
+        out.extend(build_store(cols, types, "columns", len(sel)))
+    return out
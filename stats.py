@@ -0,0 +1,184 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from operator import ne
+from columns import DictColumn
+
+# Статистики столбцов: по всему столбцу и по блокам из BLOCK_ROWS строк.
+#
+#   count, nulls        - число значений и пустых (None) значений
+#   min, max            - по непустым значениям (None, если значения несравнимы
+#                         или непустых нет)
+#   distinct            - оценка числа различных значений (KMV: по K наименьшим
+#                         хешам; до K различных значений - точно)
+#   sorted              - отсортирован ли столбец по возрастанию (без None)
+#   blocks              - [(start, stop, min, max, nulls)] по блокам
+#
+# Статистики кешируются в таблице (Table.column_stats) и сбрасываются при
+# изменении столбца; дописывание строк их дополняет (append).
+# По ним сравнения со значением (compare) решают целые блоки без просмотра
+# значений, а для отсортированного столбца - двоичным поиском.
+
+BLOCK_ROWS = 65536
+
+# Размер выборки хешей для оценки числа различных значений
+KMV_SIZE = 256
+
+_HASH_MASK = (1 << 64) - 1
+_HASH_MUL = 0x9E3779B97F4A7C15
+
+
+def _mix(value):
+    # Хеш значения, равномерный в [0, 2**64) (hash(int) - само число)
+    h = (hash(value) * _HASH_MUL) & _HASH_MASK
+    return h ^ (h >> 29)
+
+
+def _min_max(values):
+    # -> (min, max, число None) для списка значений; min/max - None,
+    # если непустых значений нет или они несравнимы (в том числе NaN)
+    nulls = values.count(None)
+    present = [v for v in values if v is not None] if nulls else values
+    if not present or any(map(ne, present, present)):
+        return None, None, nulls
+    try:
+        return min(present), max(present), nulls
+    except TypeError:
+        return None, None, nulls
+
+
+def _is_sorted(values):
+    try:
+        return all(a <= b for a, b in zip(values, values[1:]))
+    except TypeError:
+        return False
+
+
+class ColumnStats:
+    def __init__(self, values, block_rows=BLOCK_ROWS):
+        self.block_rows = block_rows
+        self.count = 0
+        self.nulls = 0
+        self.min = self.max = None
+        self.comparable = True
+        self.sorted = True
+        self.blocks = []
+        self._sketch = []
+        self._exact = set()
+        self.append(values, 0)
+
+    def append(self, values, start):
+        # Дополнить статистики значениями строк start, start + 1, ...
+        n = len(values)
+        for lo in range(0, n, self.block_rows):
+            hi = min(lo + self.block_rows, n)
+            distinct = None
+            if isinstance(values, DictColumn):
+                # различные значения блока - по номерам, без разбора строк
+                codes = values.codes[lo:hi]
+                distinct = {values.dictionary[c] for c in set(codes)}
+                block = list(map(values.dictionary.__getitem__, codes))
+            else:
+                block = values[lo:hi]
+            bmin, bmax, bnulls = _min_max(block)
+            self.blocks.append((start + lo, start + hi, bmin, bmax, bnulls))
+            self._update(block, bmin, bmax, bnulls, distinct)
+        self.count += n
+
+    def _update(self, block, bmin, bmax, bnulls, distinct):
+        if bnulls:
+            self.sorted = False
+        if bmin is None and bnulls < len(block):
+            self.comparable = False
+        if self.comparable and bmin is not None:
+            try:
+                if self.sorted and self.max is not None and block[0] < self.max:
+                    self.sorted = False
+                if self.sorted and not _is_sorted(block):
+                    self.sorted = False
+                self.min = bmin if self.min is None else min(self.min, bmin)
+                self.max = bmax if self.max is None else max(self.max, bmax)
+            except TypeError:
+                self.comparable = False
+        if not self.comparable:
+            self.min = self.max = None
+            self.sorted = False
+        self.nulls += bnulls
+        self._add_distinct(block if distinct is None else distinct)
+
+    def _add_distinct(self, values):
+        try:
+            values = set(values)
+        except TypeError:
+            values = set()
+        values.discard(None)
+        if self._exact is not None:
+            self._exact |= values
+            if len(self._exact) <= KMV_SIZE:
+                return
+            values = self._exact
+            self._exact = None
+        self._sketch = heapq.nsmallest(KMV_SIZE, set(self._sketch) | set(map(_mix, values)))
+
+    @property
+    def distinct(self):
+        if self._exact is not None:
+            return len(self._exact)
+        # K-е наименьшее из равномерных хешей ~ K / (число различных)
+        kth = self._sketch[-1] + 1
+        return int((KMV_SIZE - 1) * (_HASH_MASK + 1) / kth)
+
+    def as_dict(self):
+        return {"count": self.count, "nulls": self.nulls, "min": self.min, "max": self.max,
+                "distinct": self.distinct, "sorted": self.sorted}
+
+    def __repr__(self):
+        return f"ColumnStats({self.as_dict()})"
+
+
+def decide(op, other, vmin, vmax, nulls):
+    # Результат сравнения для всех значений блока сразу: True/False
+    # или None, если блок нужно просматривать
+    if vmin is None:
+        return None
+    try:
+        if op == "eq":
+            if other < vmin or other > vmax:
+                return False
+            if nulls == 0 and vmin == vmax == other:
+                return True
+        elif op == "ne":
+            if other < vmin or other > vmax:
+                return True
+            if nulls == 0 and vmin == vmax == other:
+                return False
+        elif nulls:
+            # None несравним с other: такие блоки просматриваются как обычно
+            return None
+        elif op == "gr":
+            return True if vmin > other else False if vmax <= other else None
+        elif op == "ge":
+            return True if vmin >= other else False if vmax < other else None
+        elif op == "ls":
+            return True if vmax < other else False if vmin >= other else None
+        elif op == "le":
+            return True if vmax <= other else False if vmin > other else None
+    except TypeError:
+        return None
+    return None
+
+
+def sorted_range(values, op, other):
+    # Для отсортированного столбца без None - диапазон строк (range),
+    # удовлетворяющих сравнению, двоичным поиском; None, если op не подходит
+    n = len(values)
+    if op == "eq":
+        return range(bisect_left(values, other), bisect_right(values, other))
+    if op == "gr":
+        return range(bisect_right(values, other), n)
+    if op == "ge":
+        return range(bisect_left(values, other), n)
+    if op == "ls":
+        return range(0, bisect_left(values, other))
+    if op == "le":
+        return range(0, bisect_right(values, other))
+    return None
@@ -0,0 +1,329 @@
+from collections.abc import Sequence
+from copy import deepcopy
+from itertools import chain
+from operator import itemgetter
+from columns import Column, make_column
+from exceptions import TableException
+
+
+class RowStore:
+    # Построчное хранилище: список списков значений (исходный формат Table.data)
+    kind = "rows"
+
+    def __init__(self, rows=None):
+        if rows is None:
+            rows = []
+        elif not isinstance(rows, list):
+            # последовательность строк (например, RowsView представления) -
+            # собственные списки, которые можно менять на месте
+            rows = [list(row) for row in rows]
+        self.rows = rows
+        # есть ли представления (ViewStore), ссылающиеся на это хранилище
+        self.shared = False
+
+    def as_data(self):
+        return self.rows
+
+    def nrows(self):
+        return len(self.rows)
+
+    def row(self, i):
+        return self.rows[i]
+
+    def iter_rows(self):
+        return iter(self.rows)
+
+    def column(self, j):
+        return [row[j] for row in self.rows]
+
+    def column_list(self, j):
+        return self.column(j)
+
+    def take_column(self, j, positions):
+        rows = self.rows
+        return [rows[i][j] for i in positions]
+
+    def set_column(self, j, values, t=None):
+        for row, v in zip(self.rows, values):
+            row[j] = v
+
+    def take(self, positions):
+        rows = self.rows
+        return RowStore([rows[i] for i in positions])
+
+    def slice(self, start, stop):
+        return RowStore(self.rows[start:stop])
+
+    def copy(self):
+        return RowStore(deepcopy(self.rows))
+
+    def view(self, sel):
+        self.shared = True
+        return ViewStore(self, sel)
+
+    def detach(self):
+        # Собственная копия для записи: списки строк копируются, значения - нет
+        return RowStore([list(row) for row in self.rows])
+
+    def project(self, col_indexes):
+        # Хранилище только с указанными столбцами
+        return RowStore(project_rows(self.rows, col_indexes))
+
+    def extend(self, other):
+        self.rows.extend(other.iter_rows())
+
+
+class ColumnStore:
+    # Поколоночное хранилище: по одному компактному столбцу на каждый
+    # столбец таблицы (см. columns.py)
+    kind = "columns"
+
+    def __init__(self, cols, nrows=None, borrowed=False):
+        self.cols = cols
+        self._n = len(cols[0]) if cols else (nrows or 0)
+        self.shared = False
+        # номера столбцов, объекты которых общие с другим хранилищем:
+        # перед изменением на месте такой столбец копируется
+        self._borrowed = set(range(len(cols))) if borrowed else set()
+
+    @classmethod
+    def from_rows(cls, rows, types):
+        if not types:
+            return cls([], len(rows))
+        if rows:
+            cols = [make_column(t, values) for t, values in zip(types, zip(*rows))]
+        else:
+            cols = [make_column(t, []) for t in types]
+        return cls(cols, len(rows))
+
+    def as_data(self):
+        return RowsView(self)
+
+    def nrows(self):
+        return self._n
+
+    def row(self, i):
+        return [col[i] for col in self.cols]
+
+    def iter_rows(self):
+        if not self.cols:
+            return iter([[] for _ in range(self._n)])
+        return map(list, zip(*self.cols))
+
+    def column(self, j):
+        return self.cols[j]
+
+    def column_list(self, j):
+        return self.cols[j].tolist()
+
+    def take_column(self, j, positions):
+        col = self.cols[j]
+        if isinstance(positions, range) and positions.step == 1:
+            if not positions:
+                return col.slice(0, 0)
+            return col.slice(positions.start, positions.stop)
+        return col.take(positions)
+
+    def _own(self, j):
+        if j in self._borrowed:
+            self.cols[j] = self.cols[j].copy()
+            self._borrowed.discard(j)
+
+    def set_column(self, j, values, t=None):
+        self.cols[j] = make_column(t, values)
+        self._borrowed.discard(j)
+
+    def take(self, positions):
+        if not isinstance(positions, (list, range)):
+            positions = list(positions)
+        return ColumnStore([col.take(positions) for col in self.cols], len(positions))
+
+    def slice(self, start, stop):
+        return ColumnStore([col.slice(start, stop) for col in self.cols], stop - start)
+
+    def copy(self):
+        return ColumnStore([col.copy() for col in self.cols], self._n)
+
+    def view(self, sel):
+        self.shared = True
+        return ViewStore(self, sel)
+
+    def detach(self):
+        # Собственная копия для записи: сами столбцы копируются только при изменении на месте
+        return ColumnStore(list(self.cols), self._n, borrowed=True)
+
+    def project(self, col_indexes):
+        # Столбцы не копируются: оба хранилища копируют их перед изменением на месте
+        self.shared = True
+        self._borrowed.update(col_indexes)
+        return ColumnStore([self.cols[j] for j in col_indexes], self._n, borrowed=True)
+
+    def extend(self, other):
+        for j in range(len(self.cols)):
+            self._own(j)
+        if isinstance(other, ColumnStore):
+            new_cols = other.cols
+        else:
+            new_cols = list(zip(*other.iter_rows())) or [[] for _ in self.cols]
+        for j, values in enumerate(new_cols):
+            col = self.cols[j]
+            try:
+                col.extend(values)
+            except TypeError:
+                self.cols[j] = Column(col.tolist() + list(values))
+        self._n += other.nrows()
+
+
+class ViewStore:
+    # Представление части другого хранилища без копирования данных.
+    # sel - range (срез, в том числе с шагом) или список номеров строк базового хранилища.
+    # Представление доступно только для чтения: перед записью Table
+    # материализует его (materialize), а базовое хранилище, на которое
+    # ссылаются представления, копирует перед своей записью (detach);
+    # дописывание строк в конец базового хранилища представлений не касается.
+
+    def __init__(self, base, sel):
+        self.base = base
+        self.sel = sel
+        self.kind = base.kind
+        self.shared = False
+
+    def as_data(self):
+        return RowsView(self)
+
+    def nrows(self):
+        return len(self.sel)
+
+    def row(self, i):
+        return list(self.base.row(self.sel[i]))
+
+    def iter_rows(self):
+        return map(list, map(self.base.row, self.sel))
+
+    def column(self, j):
+        return self.base.take_column(j, self.sel)
+
+    def column_list(self, j):
+        col = self.column(j)
+        return col if isinstance(col, list) else col.tolist()
+
+    def take_column(self, j, positions):
+        return self.base.take_column(j, self._compose(positions))
+
+    def _compose(self, positions):
+        if isinstance(positions, range):
+            return self.sel[positions.start:positions.stop:positions.step]
+        return list(map(self.sel.__getitem__, positions))
+
+    def take(self, positions):
+        return self.base.take(self._compose(positions))
+
+    def slice(self, start, stop):
+        return self.base.take(self.sel[start:stop])
+
+    def view(self, sel):
+        return ViewStore(self.base, self._compose(sel))
+
+    def project(self, col_indexes):
+        if isinstance(self.base, ColumnStore):
+            return ViewStore(self.base.project(col_indexes), self.sel)
+        return RowStore(project_rows(self.iter_rows(), col_indexes))
+
+    def materialize(self):
+        # Собственное хранилище с выбранными строками
+        store = self.base.take(self.sel)
+        if isinstance(store, RowStore):
+            store.rows = [list(row) for row in store.rows]
+        return store
+
+    def copy(self):
+        return self.base.take(self.sel).copy()
+
+
+class RowsView(Sequence):
+    # Построчное представление поколоночного хранилища или ViewStore.
+    # Строки собираются заново при каждом обращении, поэтому изменение
+    # полученной строки не меняет таблицу - для записи есть set_values/set_value.
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return self._store.nrows()
+
+    def __getitem__(self, i):
+        n = self._store.nrows()
+        if isinstance(i, slice):
+            return [self._store.row(k) for k in range(*i.indices(n))]
+        if i < 0:
+            i += n
+        if not (0 <= i < n):
+            raise IndexError("Индекс строки вне диапазона")
+        return self._store.row(i)
+
+    def __iter__(self):
+        return self._store.iter_rows()
+
+    def __eq__(self, other):
+        if isinstance(other, (list, RowsView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+def project_rows(rows, col_indexes):
+    # Новые списки строк только со столбцами col_indexes
+    if not col_indexes:
+        return [[] for _ in rows]
+    if len(col_indexes) == 1:
+        j = col_indexes[0]
+        return [[row[j]] for row in rows]
+    return list(map(list, map(itemgetter(*col_indexes), rows)))
+
+
+def make_store(storage, rows, types):
+    # types - список типов столбцов по порядку
+    if storage == "rows":
+        return RowStore(rows)
+    if storage == "columns":
+        return ColumnStore.from_rows(rows, types)
+    if storage == "spill":
+        from spill import SpillStore
+        return SpillStore.from_rows(rows, types)
+    raise TableException(f"Неизвестный тип хранилища {storage}")
+
+
+def chunk_stores(source, columns=None, chunk_rows=65536):
+    # Данные для потоковой записи: (имена столбцов, итератор хранилищ-кусков).
+    # source - таблица (режется на куски по chunk_rows строк) или итерируемое
+    # кусков, каждый из которых - таблица или список строк. Куски читаются
+    # по мере записи, поэтому их можно производить одновременно с ней.
+    # columns - имена столбцов, если первый кусок - не таблица.
+    store = getattr(source, "_store", None)
+    if store is not None:
+        n = store.nrows()
+        chunks = (store.slice(start, min(start + chunk_rows, n)) for start in range(0, n, chunk_rows))
+        return list(source.columns if columns is None else columns), chunks
+
+    it = iter(source)
+    first = next(it, None)
+    if columns is None:
+        if first is None or not hasattr(first, "_store"):
+            raise TableException("Не заданы имена столбцов")
+        columns = first.columns
+
+    def stores():
+        if first is None:
+            return
+        for chunk in chain([first], it):
+            s = getattr(chunk, "_store", None)
+            yield s if s is not None else RowStore(chunk if isinstance(chunk, list) else list(chunk))
+
+    return list(columns), stores()
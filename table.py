@@ -1,20 +1,37 @@
 from copy import deepcopy
-from exceptions import (StructureMismatchError, InvalidColumnError, 
+from exceptions import (TableException, StructureMismatchError, InvalidColumnError, 
                          InvalidRowError, TypeConversionError, BoolListLengthError,
                          MergeConflictError)
+import schema
+from storage import RowStore, ViewStore, make_store
+from columns import DictColumn
+from mask import Mask, compare_column
+from index import HashIndex, SortedIndex
+from join import build_store, gather, join_tables
+from groupby import GroupBy
+from inference import DEFAULT_DETECTORS, infer_detector, parse_column, sample_values
+from convert import check_values, converter_for, convert_values, describe_failures
+from profiling import instrumented
+from text_module import write_text
+from stats import ColumnStats, decide, sorted_range
+from concurrency import RWLock, read_locked, reading, writing
+import parallel
+from spill import SpillStore, join_spilled, merge_store, sort_store
 import math
+import sys
 
 class Table:
-    def __init__(self, columns=None, data=None, types=None):
+    def __init__(self, columns=None, data=None, types=None, storage="rows"):
         # columns - список названий столбцов
         # data - список списков значений
         # types - словарь {имя_столбца: тип_значений} или {номер_столбца: тип_значений}
+        # storage - "rows" (список строк), "columns" (компактные столбцы, см. storage.py)
+        #   или "spill" (столбцы кусками во временном файле, для данных больше памяти, см. spill.py)
         if columns is None:
             columns = []
         if data is None:
             data = []
         self.columns = columns
-        self.data = data
         # Типы столбцов хранятся в виде словаря по именам столбцов
         # По умолчанию все типы строковые
         if types is None:
@@ -24,15 +41,156 @@ class Table:
             # либо сразу по именам, нужно привести к виду имен
             if all(isinstance(k, int) for k in types.keys()):
                 # сопоставим номера с именами
-                new_types = {}
-                for i, col in enumerate(self.columns):
-                    if i in types:
-                        new_types[col] = types[i]
-                    else:
-                        new_types[col] = str
-                self.types = new_types
+                self.types = {col: types.get(i, str) for i, col in enumerate(self.columns)}
             else:
                 self.types = types
+        # Все строки должны быть длины len(columns) (ошибки - сразу по всем строкам)
+        bad = schema.check_widths(data, len(self.columns))
+        if bad:
+            schema.raise_errors(bad)
+        self._store = make_store(storage, data, [self.types.get(c, str) for c in self.columns])
+        # Хеш-индексы по столбцам {имя_столбца: HashIndex}, строятся по требованию
+        self._indexes = {}
+        # Упорядоченные индексы {имя_столбца: SortedIndex}
+        self._sorted_indexes = {}
+        # Статистики столбцов {имя_столбца: stats.ColumnStats}
+        self._stats = {}
+        # Блокировка читатель/писатель (enable_locking) и номер версии (concurrency.py)
+        self._lock = None
+        self._version = 0
+
+    @classmethod
+    @instrumented("Table.from_columns")
+    def from_columns(cls, data, columns=None, types=None, storage="columns", errors="raise"):
+        # Таблица из значений по столбцам: data - словарь {имя: значения}
+        # или список последовательностей значений (тогда имена - columns).
+        # types - схема {имя или номер столбца: тип}; для столбцов без типа в схеме
+        # тип берется по значениям. Значения проверяются и преобразуются
+        # по столбцам целиком, столбцы собираются сразу в поколоночном виде
+        # (без списков строк). errors - "raise" (SchemaError со всеми ошибками),
+        # "null" или "skip" (см. schema.py)
+        if isinstance(data, dict):
+            if columns is None:
+                columns = list(data)
+            missing = [c for c in columns if c not in data]
+            if missing:
+                raise InvalidColumnError(f"Столбцы {missing} не найдены")
+            values_list = [data[c] for c in columns]
+        else:
+            if columns is None:
+                raise TableException("Не заданы имена столбцов")
+            values_list = list(data)
+        return cls._from_schema(list(columns), values_list, types, storage, errors)
+
+    @classmethod
+    @instrumented("Table.from_records")
+    def from_records(cls, records, columns=None, types=None, storage="columns", errors="raise"):
+        # Таблица из записей: словарей {имя: значение} (например, из JSON)
+        # или последовательностей значений по порядку columns.
+        # Имена столбцов - columns, иначе для словарей - все их ключи (и столбцы
+        # схемы types, которых нет в записях), для последовательностей - ключи схемы.
+        # Строки неверной длины, отсутствующие и лишние ключи, значения не того
+        # типа - SchemaError со всеми ошибками.
+        if not isinstance(records, list):
+            records = list(records)
+        named_types = types and not all(isinstance(k, int) for k in types)
+        if columns is None:
+            if records and isinstance(records[0], dict):
+                columns = schema.record_columns(records)
+                if named_types:
+                    columns += [c for c in types if c not in columns]
+            elif named_types:
+                columns = list(types)
+            else:
+                raise TableException("Не заданы имена столбцов")
+        columns = list(columns)
+        values_list = schema.split_records(records, columns, errors)
+        return cls._from_schema(columns, values_list, types, storage, errors)
+
+    @classmethod
+    @instrumented("Table.from_arrays")
+    def from_arrays(cls, arrays, columns=None, types=None, storage="columns", errors="raise"):
+        # Таблица из типизированных буферов: array.array, memoryview или массивов
+        # numpy (в том числе двумерного - по столбцам). Числовые буферы
+        # становятся столбцами без python-объектов на каждое значение;
+        # array и memoryview с кодом 'q' (int) и 'd' (float) не копируются
+        # (копируются при первой записи в таблицу).
+        if getattr(arrays, "ndim", 1) == 2:
+            arrays = [arrays[:, j] for j in range(arrays.shape[1])]
+        return cls.from_columns(arrays, columns, types, storage, errors)
+
+    @classmethod
+    def _from_schema(cls, columns, values_list, types, storage, errors):
+        store, types = schema.build_store(columns, values_list, types, errors)
+        t = cls._from_store(columns, store, types)
+        if storage != "columns":
+            t.set_storage(storage)
+        return t
+
+    @classmethod
+    def _from_store(cls, columns, store, types):
+        # Таблица поверх уже готового хранилища
+        t = cls(columns=columns, types=types)
+        t._store = store
+        return t
+
+    @property
+    def data(self):
+        # Для построчного хранилища - сам список строк,
+        # для поколоночного - представление в виде последовательности строк
+        return self._store.as_data()
+
+    @data.setter
+    @writing
+    def data(self, rows):
+        self._store = make_store(self._store.kind, rows, [self.types.get(c, str) for c in self.columns])
+        self._touch()
+
+    @property
+    def storage(self):
+        return self._store.kind
+
+    @property
+    def num_rows(self):
+        return self._store.nrows()
+
+    @property
+    def version(self):
+        # Номер версии: растет при каждом изменении таблицы ее методами
+        return self._version
+
+    def enable_locking(self):
+        # Разрешить одновременную работу с таблицей из нескольких потоков:
+        # чтение - параллельно, изменения - по одному (см. concurrency.py)
+        if self._lock is None:
+            self._lock = RWLock()
+
+    def disable_locking(self):
+        self._lock = None
+
+    @reading
+    def snapshot(self):
+        # Снимок таблицы для чтения из других потоков: данные общие, пока одна
+        # из таблиц не изменится (copy-on-write); версия - как у таблицы
+        snap = Table._from_store(list(self.columns), self._store.view(range(self._store.nrows())),
+                                 dict(self.types))
+        snap._version = self._version
+        return snap
+
+    @writing
+    def set_storage(self, storage):
+        # Перевести таблицу в другой формат хранения ("rows", "columns" или "spill" - на диске)
+        if storage == self._store.kind:
+            return
+        types = [self.types[c] for c in self.columns]
+        if storage == "spill":
+            # по кускам, без промежуточного списка строк
+            store = SpillStore(types)
+            store.extend(self._store)
+            self._store = store
+            return
+        rows = [list(row) for row in self._store.iter_rows()]
+        self._store = make_store(storage, rows, types)
 
     def _check_column(self, column, by_number=False):
         if by_number:
@@ -45,79 +203,180 @@ class Table:
             col_name = column
         return col_name
 
-    def _convert_value(self, value, t):
-        # Преобразуем значение к типу t
-        if t == int:
-            return int(value)
-        elif t == float:
-            return float(value)
-        elif t == bool:
-            # Считаем истиной непустую строку "True" и ненулевые числа
-            if isinstance(value, str):
-                return value.lower() in ("true", "1", "yes")
-            return bool(value)
-        elif t == str:
-            return str(value)
+    def _touch(self, col_name=None):
+        # Данные столбца col_name (или всей таблицы, если None) изменились:
+        # сбрасываем построенные по ним индексы и статистики.
+        # Прямые изменения self.data в обход методов Table сюда не попадают -
+        # после них нужно вызвать drop_index().
+        if col_name is None:
+            self._indexes.clear()
+            self._sorted_indexes.clear()
+            self._stats.clear()
+        else:
+            self._indexes.pop(col_name, None)
+            self._sorted_indexes.pop(col_name, None)
+            self._stats.pop(col_name, None)
+
+    def _writable_store(self):
+        # Копирование при записи: представление превращается в собственное
+        # хранилище, а хранилище, на которое ссылаются представления,
+        # перед записью отделяется от них
+        store = self._store
+        if isinstance(store, ViewStore):
+            store = self._store = store.materialize()
+        elif store.shared:
+            store = self._store = store.detach()
+        return store
+
+    def _appendable_store(self):
+        # Хранилище для дописывания строк в конец. Существующие строки при этом
+        # не меняются, а представления и снимки видят только свои номера строк,
+        # поэтому хранилище, на которое они ссылаются, не копируется.
+        # Поколоночное хранилище копирует перед дописыванием только столбцы,
+        # общие с другим хранилищем (ColumnStore.extend).
+        store = self._store
+        if isinstance(store, ViewStore):
+            return self._writable_store()
+        return store
+
+    def _view(self, sel, copy_table=False):
+        # Подтаблица из строк sel (range или список номеров строк).
+        # Без copy_table - представление без копирования данных (copy-on-write),
+        # с copy_table - независимая копия (представление не создается, и хранилище
+        # этой таблицы не помечается как общее).
+        if copy_table:
+            return Table._from_store(deepcopy(self.columns), self._store.take(sel).copy(), deepcopy(self.types))
+        return Table._from_store(self.columns, self._store.view(sel), dict(self.types))
+
+    def _get_index(self, col_index):
+        # Хеш-индекс по столбцу; строится при первом обращении
+        col_name = self.columns[col_index]
+        index = self._indexes.get(col_name)
+        if index is None:
+            index = self._indexes[col_name] = HashIndex(self._store.column(col_index))
+        return index
+
+    @reading
+    def create_index(self, column=0):
+        # Построить (или вернуть уже построенный) хеш-индекс по столбцу
+        return self._get_index(self._column_index(column))
+
+    def _get_sorted_index(self, col_index):
+        # Упорядоченный индекс по столбцу; строится при первом обращении
+        col_name = self.columns[col_index]
+        index = self._sorted_indexes.get(col_name)
+        if index is None:
+            index = self._sorted_indexes[col_name] = SortedIndex(self._store.column(col_index))
+        return index
+
+    @reading
+    def create_sorted_index(self, column=0):
+        # Построить (или вернуть уже построенный) упорядоченный индекс по столбцу.
+        # Пока он есть, gr/ls/ge/le/eq и between по этому столбцу
+        # считаются двоичным поиском, а не просмотром столбца.
+        return self._get_sorted_index(self._column_index(column))
+
+    @writing
+    def drop_index(self, column=None):
+        # Удалить индексы (хеш- и упорядоченный) и статистики по столбцу или по всей таблице
+        if column is None:
+            self._touch()
         else:
-            return value
+            self._touch(self.columns[self._column_index(column)])
+
+    def _column_index(self, column):
+        # Номер столбца по номеру или имени (с проверкой)
+        if isinstance(column, int):
+            col_name = self._check_column(column, by_number=True)
+        else:
+            col_name = self._check_column(column, by_number=False)
+        return self.columns.index(col_name)
+
+    def _convert_value(self, value, t):
+        # Преобразуем значение к типу t (функции преобразования - в convert.py)
+        convert = converter_for(t)
+        return value if convert is None else convert(value)
 
-    def _convert_column(self, column_name, to_type):
-        # Преобразовать столбец к указанному типу
+    def _convert_column(self, column_name, to_type, errors="raise", default=None):
+        # Преобразовать столбец к указанному типу целиком (convert.convert_values).
+        # Возвращает номера строк, значения в которых преобразовать не удалось.
         col_index = self.columns.index(column_name)
-        for i in range(len(self.data)):
-            try:
-                self.data[i][col_index] = self._convert_value(self.data[i][col_index], to_type)
-            except ValueError:
-                raise TypeConversionError(f"Не удалось преобразовать значение {self.data[i][col_index]} к типу {to_type}")
+        values = self._store.column(col_index)
+        convert = parallel.convert_values if parallel.active(len(values)) else convert_values
+        new_values, failures = convert(values, to_type, errors, default)
+        if new_values is not values:
+            self._writable_store().set_column(col_index, new_values, to_type)
         self.types[column_name] = to_type
+        self._touch(column_name)
+        return [i for i, _ in failures]
 
-    def print_table(self):
-        # Печать таблицы
-        print(" | ".join(self.columns))
-        print("-" * (3 * len(self.columns)))
-        for row in self.data:
-            print(" | ".join(str(x) for x in row))
+    @reading
+    def print_table(self, align=False):
+        # Печать таблицы (кусками, см. text_module.write_text)
+        # align - выровнять столбцы по ширине
+        write_text(self, sys.stdout, align=align)
 
+    @instrumented("Table.get_rows_by_number")
+    @reading
     def get_rows_by_number(self, start, stop=None, copy_table=False):
         # Возвращает подтаблицу по номерам строк [start:stop] или [start] если stop=None
+        n = self._store.nrows()
         if stop is None:
             # одна строка
-            if not (0 <= start < len(self.data)):
+            if not (0 <= start < n):
                 raise InvalidRowError("Индекс строки вне диапазона")
-            new_data = [self.data[start]]
+            sel = range(start, start + 1)
         else:
-            if not (0 <= start < len(self.data)):
+            if not (0 <= start < n):
                 raise InvalidRowError("Начальный индекс строки вне диапазона")
-            if not (0 <= stop <= len(self.data)):
+            if not (0 <= stop <= n):
                 raise InvalidRowError("Конечный индекс строки вне диапазона")
-            new_data = self.data[start:stop]
+            sel = range(start, max(start, stop))
 
-        if copy_table:
-            new_table = Table(columns=deepcopy(self.columns), data=deepcopy(new_data), types=deepcopy(self.types))
-        else:
-            # Не копируем, а представляем ту же память
-            # Можно просто создать новый объект Table с теми же данными, но
-            # тогда изменения будут видны в исходной. Для этого передадим не deepcopy
-            # а прямую ссылку. Но чтобы не испортить self.columns/self.types,
-            # их можно оставить теми же (они неизменны)
-            new_table = Table(columns=self.columns, data=new_data, types=self.types)
-        return new_table
-
-    def get_rows_by_index(self, *vals, copy_table=False):
+        # Без copy_table не копируем, а представляем ту же память (ViewStore).
+        # Запись в любую из таблиц сначала отделяет ее данные (copy-on-write),
+        # поэтому изменения не видны в другой таблице.
+        return self._view(sel, copy_table)
+
+    @instrumented("Table.get_rows_by_index")
+    @reading
+    def get_rows_by_index(self, *vals, copy_table=False, column=0):
         # Возвращает строки, у которых в первом столбце значения совпадают с переданными.
-        # Первый столбец - self.columns[0].
+        # Первый столбец - self.columns[0] (другой ключевой столбец можно задать через column).
+        # Поиск идет по хеш-индексу столбца, который строится при первом вызове
+        # и переиспользуется, пока столбец не изменится.
         if not self.columns:
             raise InvalidColumnError("Нет столбцов в таблице")
-        first_col_index = 0
-        selected = []
-        for row in self.data:
-            if row[first_col_index] in vals:
-                selected.append(row)
-        if copy_table:
-            return Table(columns=deepcopy(self.columns), data=deepcopy(selected), types=deepcopy(self.types))
-        else:
-            return Table(columns=self.columns, data=selected, types=self.types)
-
+        col_index = self._column_index(column)
+        try:
+            selected = self._get_index(col_index).lookup(vals)
+        except TypeError:
+            # нехешируемые значения - обычный просмотр столбца
+            selected = [i for i, v in enumerate(self._store.column(col_index)) if v in vals]
+        return self._view(selected, copy_table)
+
+    @instrumented("Table.get_rows_by_range")
+    @reading
+    def get_rows_by_range(self, low=None, high=None, column=0, include_low=True, include_high=True,
+                          copy_table=False):
+        # Строки, у которых значение столбца между low и high (None - без границы),
+        # в исходном порядке. Ищутся двоичным поиском по упорядоченному индексу
+        # столбца, который строится при первом вызове; для отсортированного
+        # столбца результат - непрерывный диапазон строк.
+        col_index = self._column_index(column)
+        selected = self._get_sorted_index(col_index).range(low, high, include_low, include_high)
+        return self._view(selected, copy_table)
+
+    @instrumented("Table.select")
+    @reading
+    def select(self, *columns):
+        # Подтаблица из указанных столбцов (по номерам или именам) в заданном порядке.
+        # Поколоночные данные не копируются (copy-on-write), построчные - копируются по строкам.
+        col_indexes = [self._column_index(c) for c in columns]
+        names = [self.columns[j] for j in col_indexes]
+        return Table._from_store(names, self._store.project(col_indexes), {c: self.types[c] for c in names})
+
+    @reading
     def get_column_types(self, by_number=True):
         # Возвращает словарь {номер_столбца: тип} или {имя_столбца: тип}
         if by_number:
@@ -125,22 +384,35 @@ class Table:
         else:
             return dict(self.types)
 
-    def set_column_types(self, types_dict, by_number=True):
+    @instrumented("Table.set_column_types")
+    @writing
+    def set_column_types(self, types_dict, by_number=True, errors="raise", default=None):
         # Задает типы столбцов и конвертирует данные
+        # errors - что делать со значениями, которые не преобразуются (convert.py):
+        #   "raise" - TypeConversionError со списком всех таких значений (failures),
+        #   "null" - заменить на None, "default" - заменить на default,
+        #   "skip" - удалить такие строки
         if by_number:
             # types_dict - ключи индексы столбцов
-            for i, t in types_dict.items():
+            for i in types_dict:
                 if not (0 <= i < len(self.columns)):
                     raise InvalidColumnError("Неверный индекс столбца в types_dict")
-                col_name = self.columns[i]
-                self._convert_column(col_name, t)
+            items = [(self.columns[i], t) for i, t in types_dict.items()]
         else:
             # types_dict - ключи имена столбцов
-            for col_name, t in types_dict.items():
+            for col_name in types_dict:
                 if col_name not in self.columns:
                     raise InvalidColumnError(f"Столбец {col_name} не найден")
-                self._convert_column(col_name, t)
-
+            items = list(types_dict.items())
+        failed = set()
+        for col_name, t in items:
+            failed.update(self._convert_column(col_name, t, errors, default))
+        if errors == "skip" and failed:
+            keep = [i for i in range(self._store.nrows()) if i not in failed]
+            self._store = self._writable_store().take(keep)
+            self._touch()
+
+    @reading
     def get_values(self, column=0):
         # Получить список значений для столбца
         if isinstance(column, int):
@@ -148,17 +420,19 @@ class Table:
         else:
             col_name = self._check_column(column, by_number=False)
         col_index = self.columns.index(col_name)
-        return [self.data[i][col_index] for i in range(len(self.data))]
+        return self._store.column_list(col_index)
 
     def get_value(self, column=0):
         # Для таблицы из одной строки возвращает одно значение
-        if len(self.data) != 1:
+        if self._store.nrows() != 1:
             raise InvalidRowError("Таблица содержит не одну строку")
         return self.get_values(column=column)[0]
 
+    @instrumented("Table.set_values")
+    @writing
     def set_values(self, values, column=0):
         # Установить список значений в столбец
-        if len(values) != len(self.data):
+        if len(values) != self._store.nrows():
             raise InvalidRowError("Длина списка значений не совпадает с количеством строк")
         if isinstance(column, int):
             col_name = self._check_column(column, by_number=True)
@@ -166,64 +440,81 @@ class Table:
             col_name = self._check_column(column, by_number=False)
         col_index = self.columns.index(col_name)
         t = self.types[col_name]
-        for i, v in enumerate(values):
-            self.data[i][col_index] = self._convert_value(v, t)
+        new_values, _ = convert_values(values, t)
+        self._writable_store().set_column(col_index, new_values, t)
+        self._touch(col_name)
 
     def set_value(self, value, column=0):
         # Для таблицы с одной строкой установить одно значение
-        if len(self.data) != 1:
+        if self._store.nrows() != 1:
             raise InvalidRowError("Таблица содержит не одну строку")
         self.set_values([value], column=column)
 
-    def detect_column_types(self):
+    @instrumented("Table.detect_column_types")
+    @writing
+    def detect_column_types(self, sample=None, detectors=None, null_values=None):
         # Автоматическое определение типа столбцов по их значениям
-        # Алгоритм: попробуем привести все значения столбца к int, если нельзя, к float, 
-        # если нельзя, к bool, если нельзя, оставим str
-        # bool здесь tricky, предполагаем, что bool - это True/False/1/0/yes/no?
-        # Или оставим логику проще: если все значения либо "True"/"False"/"0"/"1" - bool
-        new_types = {}
-        for col_name in self.columns:
-            col_index = self.columns.index(col_name)
-            col_values = [str(row[col_index]) for row in self.data]
-
-            # Порядок проверки: int -> float -> bool -> str
-            def can_convert_to_int(vals):
-                try:
-                    for v in vals:
-                        int(v)
-                    return True
-                except:
-                    return False
-
-            def can_convert_to_float(vals):
-                try:
-                    for v in vals:
-                        float(v)
-                    return True
-                except:
-                    return False
-
-            def can_convert_to_bool(vals):
-                for v in vals:
-                    lv = v.lower()
-                    if lv not in ["true", "false", "0", "1", "yes", "no"]:
-                        return False
-                return True
-
-            if can_convert_to_int(col_values):
-                new_types[col_name] = int
-            elif can_convert_to_float(col_values):
-                new_types[col_name] = float
-            elif can_convert_to_bool(col_values):
-                new_types[col_name] = bool
+        # За один проход по столбцу отбрасываются типы, которым значения не подходят;
+        # из оставшихся берется первый по порядку: int -> float -> bool, иначе str
+        # (детекторы типов - в inference.py).
+        # bool - это True/False/1/0/yes/no в любом регистре.
+        # sample - определять тип по равномерной выборке из sample значений; если потом
+        #   какое-то значение столбца не подойдет, тип определяется по всему столбцу
+        # detectors - свой список детекторов по приоритету (например, с DateDetector)
+        # null_values - строки, которые считаются пустыми (None) в столбце любого типа
+        # Большие столбцы при включенном parallel разбираются пулом процессов.
+        if detectors is None:
+            detectors = DEFAULT_DETECTORS
+        null_values = frozenset(null_values or ())
+        if parallel.active(self._store.nrows()):
+            infer, parse = parallel.infer_detector, parallel.parse
+        else:
+            infer, parse = infer_detector, parse_column
+        for col_index, col_name in enumerate(self.columns):
+            if null_values:
+                col_values = [None if v is None or str(v) in null_values else str(v)
+                              for v in self._store.column(col_index)]
+                nulls = frozenset([None])
             else:
-                new_types[col_name] = str
+                col_values = [str(v) for v in self._store.column(col_index)]
+                nulls = frozenset()
+
+            new_values = None
+            if sample:
+                detector = infer_detector(sample_values(col_values, sample), detectors, nulls)
+                if detector is not None:
+                    try:
+                        new_values = parse(col_values, detector, nulls)
+                    except ValueError:
+                        # выборка оказалась нерепрезентативной
+                        detector = infer(col_values, detectors, nulls)
+                        new_values = None
+            else:
+                detector = infer(col_values, detectors, nulls)
 
-        # Применим новые типы
-        for col_name, t in new_types.items():
-            self._convert_column(col_name, t)
+            if detector is None:
+                t, new_values = str, col_values
+            else:
+                t = detector.type
+                if new_values is None:
+                    new_values = parse(col_values, detector, nulls)
+            self._writable_store().set_column(col_index, new_values, t)
+            self.types[col_name] = t
+            self._touch(col_name)
+
+    def lazy(self):
+        # Ленивый запрос к таблице (lazy.LazyFrame): шаги выполняются в collect()
+        from lazy import LazyFrame
+        return LazyFrame(self)
+
+    def group_by(self, *columns):
+        # Группировка по одному или нескольким столбцам:
+        # t.group_by("city").agg({"amount": ["sum", "mean"], "id": "count"})
+        # Функции: sum, count, size, min, max, mean (см. groupby.py)
+        return GroupBy(self, columns)
 
     @staticmethod
+    @instrumented("Table.concat")
     def concat(table1, table2):
         # Склеивает две таблицы по вертикали, при совпадении столбцов
         if table1.columns != table2.columns:
@@ -234,65 +525,274 @@ class Table:
             if table1.types[col] != table2.types[col]:
                 raise StructureMismatchError("Типы столбцов не совпадают")
 
-        new_data = table1.data + table2.data
-        # Не копируем сверх меры, предположим, что concat создает новую таблицу
-        return Table(columns=table1.columns[:], data=deepcopy(new_data), types=deepcopy(table1.types))
+        # Новая таблица: представление table1, которое при дописывании
+        # получает собственные данные (без deepcopy значений)
+        with read_locked(table1):
+            res = Table._from_store(table1.columns[:], table1._store.view(range(table1.num_rows)),
+                                    dict(table1.types))
+        res.extend(table2)
+        return res
+
+    @instrumented("Table.append_rows")
+    @writing
+    def append_rows(self, rows):
+        # Дописать строки (список списков значений) в конец таблицы на месте.
+        # Значения проверяются по типам столбцов целиком по каждому столбцу
+        # (convert.check_values; None допускается), при ошибке таблица не меняется.
+        # Хранилище растет с запасом (list/array), индексы дополняются, а не перестраиваются.
+        rows = [list(row) for row in rows]
+        if not rows:
+            return
+        width = len(self.columns)
+        for i, row in enumerate(rows):
+            if len(row) != width:
+                raise InvalidRowError(f"Строка {i} содержит {len(row)} значений вместо {width}")
+        n = self._store.nrows()
+        for j, col_name in enumerate(self.columns):
+            failures = check_values([row[j] for row in rows], self.types[col_name], n)
+            if failures:
+                raise TypeConversionError(
+                    f"Значения не соответствуют типу {self.types[col_name]} столбца {col_name} "
+                    f"({describe_failures(failures)})", failures)
+        self._appendable_store().extend(RowStore(rows))
+        self._appended(n)
+
+    @instrumented("Table.extend")
+    @writing
+    def extend(self, other):
+        # Дописать строки другой таблицы с теми же столбцами и типами на месте
+        if self.columns != other.columns:
+            raise StructureMismatchError("Структура столбцов не совпадает")
+        for col in self.columns:
+            if self.types[col] != other.types[col]:
+                raise StructureMismatchError("Типы столбцов не совпадают")
+        n = self._store.nrows()
+        with read_locked(other):
+            store = other._store
+            if store.kind == "rows":
+                # списки строк другой таблицы не разделяем
+                store = RowStore([list(row) for row in store.iter_rows()])
+            self._appendable_store().extend(store)
+        self._appended(n)
+
+    def _appended(self, start):
+        # Дополнить построенные индексы и статистики строками start, start + 1, ...
+        n = self._store.nrows()
+        if n == start:
+            return
+        new_rows = range(start, n)
+        for indexes in (self._indexes, self._sorted_indexes, self._stats):
+            for col_name in list(indexes):
+                values = self._store.take_column(self.columns.index(col_name), new_rows)
+                try:
+                    indexes[col_name].append(values, start)
+                except TypeError:
+                    # несравнимые значения - индекс (статистики) построится заново при обращении
+                    del indexes[col_name]
 
+    @instrumented("Table.split")
+    @reading
     def split(self, row_number):
         # Разбивает таблицу на две по номеру строки
-        if not (0 <= row_number <= len(self.data)):
+        # Обе части - представления без копирования (copy-on-write)
+        n = self._store.nrows()
+        if not (0 <= row_number <= n):
             raise InvalidRowError("Индекс строки вне диапазона")
-        data1 = self.data[:row_number]
-        data2 = self.data[row_number:]
-        t1 = Table(columns=self.columns[:], data=deepcopy(data1), types=deepcopy(self.types))
-        t2 = Table(columns=self.columns[:], data=deepcopy(data2), types=deepcopy(self.types))
+        t1 = Table._from_store(self.columns[:], self._store.view(range(0, row_number)), deepcopy(self.types))
+        t2 = Table._from_store(self.columns[:], self._store.view(range(row_number, n)), deepcopy(self.types))
         return t1, t2
 
     # Сравнительные операции:
     # eq, gr, ls, ge, le, ne
-    # Возвращают список булевых значений по указанному столбцу
+    # Возвращают маску (mask.Mask) по указанному столбцу: ее можно
+    # комбинировать через &, |, ~ и передавать в filter_rows
 
     def eq(self, other, column=0):
-        return self._compare(other, column, lambda x, y: x == y)
+        return self._compare(other, column, "eq")
 
     def gr(self, other, column=0):
-        return self._compare(other, column, lambda x, y: x > y)
+        return self._compare(other, column, "gr")
 
     def ls(self, other, column=0):
-        return self._compare(other, column, lambda x, y: x < y)
+        return self._compare(other, column, "ls")
 
     def ge(self, other, column=0):
-        return self._compare(other, column, lambda x, y: x >= y)
+        return self._compare(other, column, "ge")
 
     def le(self, other, column=0):
-        return self._compare(other, column, lambda x, y: x <= y)
+        return self._compare(other, column, "le")
 
     def ne(self, other, column=0):
-        return self._compare(other, column, lambda x, y: x != y)
+        return self._compare(other, column, "ne")
 
+    @instrumented("Table.compare")
+    @reading
     def _compare(self, other, column, op):
         # other - либо значение, либо список значений
         # если значение - сравниваем все строки со значением
         # если список - длина списка должна совпадать с числом строк
-        vals = self.get_values(column)
-        if isinstance(other, list):
-            if len(other) != len(vals):
-                raise TableException("Длина списка для сравнения не совпадает с количеством строк")
-            return [op(v, o) for v, o in zip(vals, other)]
-        else:
-            return [op(v, other) for v in vals]
-
+        # op - имя операции из mask.OPERATORS; сравнение идет сразу по всему столбцу
+        # При упорядоченном индексе по столбцу (create_sorted_index) сравнение
+        # со значением - двоичный поиск. Строк с None и NaN в индексе нет (NaN не
+        # удовлетворяет ни одному сравнению и без индекса), поэтому сравнение
+        # с None или NaN и сравнения на порядок по столбцу с None (TypeError,
+        # как и без индекса) идут обычным просмотром.
+        col_index = self._column_index(column)
+        index = self._sorted_indexes.get(self.columns[col_index])
+        if index is not None and op != "ne" and other is not None and not isinstance(other, list) \
+                and other == other and (op == "eq" or not index.nulls):
+            try:
+                return Mask.from_positions(self._store.nrows(), index.compare(op, other))
+            except TypeError:
+                pass
+        if self._store.kind == "spill" and not isinstance(other, list):
+            # таблица на диске: столбец сравнивается по кускам
+            return Mask.from_bytes(bytearray(b"".join(
+                bytes(compare_column(col, other, op).bits) for col in self._store.iter_column(col_index))))
+        vals = self._store.column(col_index)
+        if isinstance(other, list) and len(other) != len(vals):
+            raise TableException("Длина списка для сравнения не совпадает с количеством строк")
+        stats = self._stats.get(self.columns[col_index])
+        if stats is not None and not isinstance(other, list):
+            return self._compare_by_stats(vals, stats, other, op)
+        if parallel.active(len(vals)) and not isinstance(other, list) and not isinstance(vals, DictColumn):
+            # словарный столбец сравнивается по различным значениям - делить его незачем
+            return parallel.compare(vals, other, op)
+        return compare_column(vals, other, op)
+
+    def _compare_by_stats(self, vals, stats, other, op):
+        # Сравнение с учетом статистик (column_stats): отсортированный столбец -
+        # двоичный поиск, иначе блоки, для которых ответ следует из min/max,
+        # не просматриваются
+        n = len(vals)
+        if stats.sorted and not stats.nulls and op != "ne":
+            try:
+                return Mask.from_positions(n, sorted_range(vals, op, other))
+            except TypeError:
+                pass
+        bits = bytearray(n)
+        for start, stop, bmin, bmax, bnulls in stats.blocks:
+            result = decide(op, other, bmin, bmax, bnulls)
+            if result is None:
+                bits[start:stop] = bytes(compare_column(vals[start:stop], other, op).bits)
+            elif result:
+                bits[start:stop] = b"\x01" * (stop - start)
+        return Mask.from_bytes(bits)
+
+    @reading
+    def column_stats(self, column=0):
+        # Статистики столбца (stats.ColumnStats: min, max, число None, оценка
+        # числа различных значений, отсортированность, те же данные по блокам).
+        # Считаются при первом вызове и хранятся, пока столбец не изменится;
+        # пока они есть, сравнения со значением по столбцу пропускают блоки,
+        # ответ для которых известен заранее.
+        col_index = self._column_index(column)
+        col_name = self.columns[col_index]
+        stats = self._stats.get(col_name)
+        if stats is None:
+            stats = self._stats[col_name] = ColumnStats(self._store.column(col_index))
+        return stats
+
+    @reading
+    def describe(self):
+        # Сводка по всем столбцам (таблица): тип, число значений, None,
+        # различных значений (оценка), min, max, отсортирован ли столбец
+        rows = []
+        for col_name in self.columns:
+            s = self.column_stats(col_name)
+            rows.append([col_name, self.types[col_name].__name__, s.count, s.nulls, s.distinct,
+                         s.min, s.max, s.sorted])
+        return Table(columns=["column", "type", "count", "nulls", "distinct", "min", "max", "sorted"],
+                     data=rows, types={"column": str, "type": str, "count": int, "nulls": int,
+                                       "distinct": int, "min": object, "max": object, "sorted": bool})
+
+    @reading
+    def between(self, low, high, column=0):
+        # Маска строк с low <= значение <= high; None - без границы
+        # (как в get_rows_by_range): строки с None и NaN без границ не выбираются
+        col_index = self._column_index(column)
+        if low is None and high is None:
+            return Mask.from_bools(v is not None and v == v for v in self._store.column(col_index))
+        index = self._sorted_indexes.get(self.columns[col_index])
+        # строки с None в индекс не входят (без индекса сравнение с ними - TypeError)
+        if index is not None and not index.nulls and low == low and high == high:
+            try:
+                return Mask.from_positions(self._store.nrows(), index.range(low, high))
+            except TypeError:
+                pass
+        if low is None:
+            return self.le(high, col_index)
+        if high is None:
+            return self.ge(low, col_index)
+        return self.ge(low, col_index) & self.le(high, col_index)
+
+    @reading
+    def argsort(self, *columns, reverse=False):
+        # Перестановка номеров строк, упорядочивающая таблицу по столбцам columns
+        # (по умолчанию - по первому). Сортировка устойчивая: строки с равными
+        # ключами остаются в исходном порядке. reverse - bool или список bool
+        # для каждого столбца. Пустые значения (None) идут после остальных
+        # (при reverse - перед ними).
+        if not columns:
+            columns = (0,)
+        col_indexes = [self._column_index(c) for c in columns]
+        if isinstance(reverse, bool):
+            reverse = [reverse] * len(col_indexes)
+        elif len(reverse) != len(col_indexes):
+            raise TableException("Длина reverse не совпадает с числом столбцов")
+        n = self._store.nrows()
+        if len(col_indexes) == 1 and not reverse[0]:
+            index = self._sorted_indexes.get(self.columns[col_indexes[0]])
+            if index is not None and len(index.order) == n:
+                return list(index.order)
+        order = list(range(n))
+        # устойчивые сортировки от последнего ключа к первому
+        for j, rev in reversed(list(zip(col_indexes, reverse))):
+            values = self._store.column_list(j)
+            if None in values:
+                key = lambda i: (values[i] is None, values[i])
+            else:
+                key = values.__getitem__
+            order.sort(key=key, reverse=rev)
+        return order
+
+    @instrumented("Table.sort_by")
+    @reading
+    def sort_by(self, *columns, reverse=False, copy_table=False):
+        # Таблица, упорядоченная по столбцам (см. argsort).
+        # Без copy_table - представление без копирования строк (copy-on-write).
+        # Таблица на диске сортируется внешней сортировкой (spill.sort_store).
+        if self._store.kind == "spill":
+            col_indexes = [self._column_index(c) for c in columns or (0,)]
+            if isinstance(reverse, bool):
+                reverse = [reverse] * len(col_indexes)
+            elif len(reverse) != len(col_indexes):
+                raise TableException("Длина reverse не совпадает с числом столбцов")
+            store = sort_store(self._store, col_indexes, list(reverse))
+            return Table._from_store(list(self.columns), store, dict(self.types))
+        return self._view(self.argsort(*columns, reverse=reverse), copy_table)
+
+    @instrumented("Table.filter_rows")
+    @reading
     def filter_rows(self, bool_list, copy_table=False):
-        # Фильтрация строк по булевому списку
-        if len(bool_list) != len(self.data):
+        # Фильтрация строк по булевому списку или маске
+        if len(bool_list) != self._store.nrows():
             raise BoolListLengthError("Длина булевского списка не совпадает с количеством строк")
-        filtered = [row for row, flag in zip(self.data, bool_list) if flag]
-        if copy_table:
-            return Table(columns=deepcopy(self.columns), data=deepcopy(filtered), types=deepcopy(self.types))
+        if isinstance(bool_list, Mask):
+            # маска из одних истин или одних ложных - диапазон строк без списка номеров
+            count = bool_list.count()
+            if count == len(bool_list):
+                positions = range(len(bool_list))
+            elif count == 0:
+                positions = range(0)
+            else:
+                positions = bool_list.positions()
         else:
-            return Table(columns=self.columns, data=filtered, types=self.types)
+            positions = [i for i, flag in enumerate(bool_list) if flag]
+        return self._view(positions, copy_table)
 
     @staticmethod
+    @instrumented("Table.merge_tables")
     def merge_tables(table1, table2, by_number=True):
         # Слияние двух таблиц по строчному индексу или по номеру строки
         # Предполагается, что строки соответствуют друг другу либо по индексу (by_number=True),
@@ -302,91 +802,92 @@ class Table:
         # Если длины различаются или индексы не совпадают - кидаем исключение MergeConflictError.
         # Если by_number=False - сопоставляем строки по значению первого столбца, объединяем те, что совпадают.
 
+        # Строки сопоставляются списками номеров, а столбцы результата
+        # собираются целиком (join.gather), без словарей на каждую строку.
+
+        with read_locked(table1, table2):
+            return Table._merge_tables(table1, table2, by_number)
+
+    @staticmethod
+    def _merge_tables(table1, table2, by_number):
         if by_number:
-            if len(table1.data) != len(table2.data):
+            if table1.num_rows != table2.num_rows:
                 raise MergeConflictError("Число строк в таблицах не совпадает")
-            # Объединяем колонки
-            merged_columns = list(table1.columns)
-            for c in table2.columns:
-                if c not in merged_columns:
-                    merged_columns.append(c)
-
-            # Определяем типы для merged_columns
-            merged_types = {}
-            for c in merged_columns:
-                if c in table1.types and c in table2.types:
-                    if table1.types[c] != table2.types[c]:
-                        raise MergeConflictError(f"Различающиеся типы столбца {c}")
-                    merged_types[c] = table1.types[c]
-                elif c in table1.types:
-                    merged_types[c] = table1.types[c]
-                else:
-                    merged_types[c] = table2.types[c]
-
-            # Строим данные
-            merged_data = []
-            for i in range(len(table1.data)):
-                row_dict = {col: val for col, val in zip(table1.columns, table1.data[i])}
-                row_dict2 = {col: val for col, val in zip(table2.columns, table2.data[i])}
-                for c in table2.columns:
-                    if c not in row_dict:
-                        row_dict[c] = row_dict2[c]
-                    else:
-                        # Конфликт? Если значения разные - это конфликт
-                        if row_dict[c] != row_dict2[c]:
-                            raise MergeConflictError(f"Конфликт значений в столбце {c}")
-                # Превратим row_dict в список по merged_columns
-                merged_row = [row_dict[c] for c in merged_columns]
-                merged_data.append(merged_row)
-
-            return Table(columns=merged_columns, data=merged_data, types=merged_types)
-
+            right_pos = range(table2.num_rows)
         else:
             # Сопоставление по значению первого столбца
             if len(table1.columns) == 0 or len(table2.columns) == 0:
                 raise MergeConflictError("Одна из таблиц не имеет столбцов для сопоставления")
 
-            idx_col_1 = table1.columns[0]
-            idx_col_2 = table2.columns[0]
-
-            # Словарь table2 по индексному столбцу
-            map2 = {}
-            for r in table2.data:
-                key = r[0]
-                if key in map2:
-                    raise MergeConflictError("Дублирующийся индекс в table2")
-                map2[key] = r
-
-            merged_columns = list(table1.columns)
-            for c in table2.columns:
-                if c not in merged_columns:
-                    merged_columns.append(c)
-
-            merged_types = {}
-            for c in merged_columns:
-                if c in table1.types and c in table2.types:
-                    if table1.types[c] != table2.types[c]:
-                        raise MergeConflictError(f"Различающиеся типы столбца {c}")
-                    merged_types[c] = table1.types[c]
-                elif c in table1.types:
-                    merged_types[c] = table1.types[c]
-                else:
-                    merged_types[c] = table2.types[c]
-
-            merged_data = []
-            for row in table1.data:
-                key = row[0]
-                if key not in map2:
-                    raise MergeConflictError(f"Строка с индексом {key} не найдена во второй таблице")
-                row_dict = {col: val for col, val in zip(table1.columns, row)}
-                row_dict2 = {col: val for col, val in zip(table2.columns, map2[key])}
-                for c in table2.columns:
-                    if c not in row_dict:
-                        row_dict[c] = row_dict2[c]
-                    else:
-                        if row_dict[c] != row_dict2[c]:
-                            raise MergeConflictError(f"Конфликт значений в столбце {c}")
-                merged_row = [row_dict[c] for c in merged_columns]
-                merged_data.append(merged_row)
-
-            return Table(columns=merged_columns, data=merged_data, types=merged_types)
+            # Индекс table2 по индексному столбцу (хранится в table2 между вызовами)
+            map2 = table2._get_index(0)
+            if not map2.unique:
+                raise MergeConflictError("Дублирующийся индекс в table2")
+            keys1 = table1._store.column(0)
+            if isinstance(keys1, DictColumn):
+                # словарный столбец: каждое различное значение ищется один раз,
+                # строки сопоставляются по номерам значений
+                found = [map2.get(v) for v in keys1.dictionary]
+                matches = map(found.__getitem__, keys1.codes)
+            else:
+                matches = map(map2.get, keys1)
+            right_pos = []
+            for i, pos in enumerate(matches):
+                if not pos:
+                    raise MergeConflictError(f"Строка с индексом {keys1[i]} не найдена во второй таблице")
+                right_pos.append(pos[0])
+
+        # Объединяем колонки
+        merged_columns = list(table1.columns)
+        for c in table2.columns:
+            if c not in merged_columns:
+                merged_columns.append(c)
+
+        # Определяем типы для merged_columns
+        merged_types = {}
+        for c in merged_columns:
+            if c in table1.types and c in table2.types:
+                if table1.types[c] != table2.types[c]:
+                    raise MergeConflictError(f"Различающиеся типы столбца {c}")
+                merged_types[c] = table1.types[c]
+            elif c in table1.types:
+                merged_types[c] = table1.types[c]
+            else:
+                merged_types[c] = table2.types[c]
+
+        if table1.storage == "spill":
+            # таблица на диске: столбцы собираются по кускам (spill.merge_store)
+            store = merge_store(table1, table2, right_pos, [merged_types[c] for c in merged_columns])
+            return Table._from_store(merged_columns, store, merged_types)
+
+        # Строим данные
+        n = table1.num_rows
+        cols = [table1._store.take_column(j, range(n)) for j in range(len(table1.columns))]
+        for j, c in enumerate(table2.columns):
+            values = gather(table2._store, j, right_pos)
+            if c in table1.columns:
+                # Конфликт? Если значения разные - это конфликт
+                if list(values) != list(cols[table1.columns.index(c)]):
+                    raise MergeConflictError(f"Конфликт значений в столбце {c}")
+            else:
+                cols.append(values)
+
+        types = [merged_types[c] for c in merged_columns]
+        store = build_store(cols, types, table1.storage, n)
+        return Table._from_store(merged_columns, store, merged_types)
+
+    @instrumented("Table.join")
+    def join(self, other, on, how="inner", right_on=None, suffix="_right", sort_merge=False):
+        # Соединение с другой таблицей по одному или нескольким ключевым столбцам.
+        # how - "inner", "left", "outer", "semi" (строки этой таблицы, у которых есть пара)
+        #   или "anti" (строки, у которых пары нет)
+        # on - имя или список имен ключевых столбцов; right_on - ключи other, если называются иначе
+        # suffix - добавляется к именам неключевых столбцов other, совпадающим с именами этой таблицы
+        # sort_merge - обе таблицы уже отсортированы по ключу: соединение слиянием без хеш-таблицы
+        #   (ключи проверяются; неотсортированные или с None соединяются через хеш-таблицу)
+        # Если одна из таблиц хранится на диске, соединение идет по частям (spill.join_spilled).
+        join = join_spilled if "spill" in (self.storage, other.storage) else join_tables
+        with read_locked(self, other):
+            columns, store, types = join(self, other, on, how=how, right_on=right_on,
+                                         suffix=suffix, sort_merge=sort_merge)
+        return Table._from_store(columns, store, types)
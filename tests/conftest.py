@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули пакета лежат в корне репозитория и импортируются по имени (from table import Table)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
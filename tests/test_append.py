@@ -0,0 +1,35 @@
+from table import Table
+
+
+def _table():
+    return Table(columns=["a", "b"], data=[[i, str(i)] for i in range(5)],
+                 types={"a": int, "b": str}, storage="columns")
+
+
+def test_append_keeps_views_and_snapshots():
+    t = _table()
+    view = t.get_rows_by_number(1, 3)
+    snap = t.snapshot()
+    projected = t.select("a")
+    t.append_rows([[5, "5"], [6, "6"]])
+    assert t.get_values("a") == list(range(7))
+    assert view.get_values("a") == [1, 2]
+    assert snap.num_rows == 5 and snap.get_values("b") == ["0", "1", "2", "3", "4"]
+    assert projected.num_rows == 5 and list(projected.data) == [[i] for i in range(5)]
+
+
+def test_append_after_view_does_not_copy_columns():
+    t = _table()
+    t.snapshot()
+    t.append_rows([[5, "5"]])
+    cols = list(t._store.cols)
+    t.append_rows([[6, "6"]])
+    assert all(a is b for a, b in zip(cols, t._store.cols))
+
+
+def test_write_after_append_keeps_snapshot():
+    t = _table()
+    snap = t.snapshot()
+    t.append_rows([[5, "5"]])
+    t.set_values([0] * 6, "a")
+    assert snap.get_values("a") == list(range(5))
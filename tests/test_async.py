@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+import csv_module
+import pickle_module
+from columns import Category
+from exceptions import StructureMismatchError
+from table import Table
+
+COLUMNS = ["id", "name", "score"]
+TYPES = {"id": int, "name": str, "score": float}
+
+
+def _table(n, start=0, storage="columns"):
+    rows = [[i, f'имя "{i}",\nвторая строка' if i % 4 == 0 else f"n{i}", i / 2] for i in range(start, start + n)]
+    return Table(columns=COLUMNS, data=rows, types=TYPES, storage=storage)
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_csv_async_round_trip(tmp_path, compression):
+    a, b = str(tmp_path / "a.csv"), str(tmp_path / "b.csv")
+    t1, t2 = _table(60), _table(25, start=60, storage="rows")
+    asyncio.run(csv_module.save_table_async(t1, a, compression=compression, chunk_rows=7, prefetch=1))
+    asyncio.run(csv_module.save_table_async(t2, b, compression=compression, chunk_rows=7))
+    # маленькие блоки: строки и значения в кавычках разрезаются между блоками
+    loaded = asyncio.run(csv_module.load_table_async(a, b, types=TYPES, read_bytes=13, prefetch=1))
+    assert list(loaded.data) == list(t1.data) + list(t2.data)
+    assert list(loaded.data) == list(csv_module.load_table(a, b, types=TYPES).data)
+
+
+def test_csv_async_columns_and_header_only(tmp_path):
+    path, empty = str(tmp_path / "t.csv"), str(tmp_path / "e.csv")
+    csv_module.save_table(_table(10), path)
+    csv_module.save_table(_table(0), empty)
+    loaded = asyncio.run(csv_module.load_table_async(path, empty, columns=["score", "id"],
+                                                     types={"id": int, "score": float}, read_bytes=32))
+    assert loaded.columns == ["score", "id"]
+    assert list(loaded.data) == [[i / 2, i] for i in range(10)]
+    only_header = asyncio.run(csv_module.load_table_async(empty, types=TYPES))
+    assert only_header.num_rows == 0 and only_header.columns == COLUMNS
+
+
+def test_csv_async_errors(tmp_path):
+    a, b = str(tmp_path / "a.csv"), str(tmp_path / "b.csv")
+    csv_module.save_table(_table(3), a)
+    with open(b, "w") as f:
+        f.write("x,y\n1,2\n")
+    with pytest.raises(StructureMismatchError):
+        asyncio.run(csv_module.load_table_async(a, b))
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(csv_module.load_table_async(a, str(tmp_path / "missing.csv")))
+
+
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+def test_pickle_async_round_trip(tmp_path, storage):
+    a, b = str(tmp_path / "a.pkl"), str(tmp_path / "b.pkl")
+    t1 = _table(40, storage=storage)
+    t2 = Table(columns=COLUMNS, data=[[100, "x", 1.5]], types=TYPES, storage=storage)
+    asyncio.run(pickle_module.save_table_async(t1, a, write_bytes=50))
+    asyncio.run(pickle_module.save_table_async(t2, b))
+    loaded = asyncio.run(pickle_module.load_table_async(a, b, storage=storage, read_bytes=64, prefetch=1))
+    assert loaded.storage == storage and loaded.types == TYPES
+    assert list(loaded.data) == list(t1.data) + list(t2.data)
+    assert list(pickle_module.load_table(a, b).data) == list(loaded.data)
+
+
+def test_pickle_async_keeps_category(tmp_path):
+    path = str(tmp_path / "c.pkl")
+    t = Table(columns=["c"], data=[["a"], ["b"], ["a"]], types={"c": Category}, storage="columns")
+    asyncio.run(pickle_module.save_table_async(t, path))
+    loaded = asyncio.run(pickle_module.load_table_async(path, storage="columns"))
+    assert loaded.types == {"c": Category}
+    assert loaded.get_values("c") == ["a", "b", "a"]
@@ -0,0 +1,79 @@
+import pytest
+import binary_module
+from columns import Category
+from exceptions import StructureMismatchError, TableException
+from table import Table
+
+COLUMNS = ["i", "f", "b", "s", "c", "n"]
+TYPES = {"i": int, "f": float, "b": bool, "s": str, "c": Category, "n": int}
+
+
+def _table(n=50, storage="columns"):
+    rows = [[i, i / 4, i % 3 == 0, f"строка {i}", ["x", "y", "z"][i % 3], None if i % 5 == 0 else i]
+            for i in range(n)]
+    return Table(columns=COLUMNS, data=rows, types=TYPES, storage=storage)
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+def test_round_trip(tmp_path, storage, use_mmap):
+    path = str(tmp_path / "t.bin")
+    t = _table(storage=storage)
+    binary_module.save_table(t, path)
+    loaded = binary_module.load_table(path, use_mmap=use_mmap)
+    assert loaded.columns == COLUMNS
+    assert loaded.types == TYPES
+    assert list(loaded.data) == list(t.data)
+
+
+@pytest.mark.parametrize("compression", sorted(binary_module.CODECS))
+def test_compression_codecs(tmp_path, compression):
+    path = str(tmp_path / "t.bin")
+    t = _table(200)
+    binary_module.save_table(t, path, compression=compression, block_rows=64)
+    header = binary_module.read_header(path)
+    assert {b["codec"] for g in header["groups"] for b in g["blocks"]} == {compression}
+    assert list(binary_module.load_table(path).data) == list(t.data)
+
+
+def test_unknown_codec(tmp_path):
+    with pytest.raises(TableException):
+        binary_module.save_table(_table(), str(tmp_path / "t.bin"), compression="zip")
+
+
+def test_columns_and_rows_selection(tmp_path):
+    path = str(tmp_path / "t.bin")
+    t = _table(100)
+    binary_module.save_table(t, path, block_rows=16)
+    assert len(binary_module.read_header(path)["groups"]) == 7
+    part = binary_module.load_table(path, columns=["s", "i"], rows=(10, 40))
+    assert part.columns == ["s", "i"]
+    assert list(part.data) == [[f"строка {i}", i] for i in range(10, 40)]
+    with pytest.raises(StructureMismatchError):
+        binary_module.load_table(path, columns=["missing"])
+
+
+def test_loaded_columns_are_writable(tmp_path):
+    path = str(tmp_path / "t.bin")
+    binary_module.save_table(_table(10), path)
+    t = binary_module.load_table(path)
+    t.set_values(list(range(100, 110)), "i")
+    assert t.get_values("i") == list(range(100, 110))
+    assert binary_module.load_table(path).get_values("i") == list(range(10))
+
+
+def test_several_files_and_empty_table(tmp_path):
+    a, b, empty = (str(tmp_path / name) for name in ("a.bin", "b.bin", "e.bin"))
+    binary_module.save_table(_table(10), a)
+    binary_module.save_table(_table(5), b)
+    binary_module.save_table(_table(0), empty)
+    t = binary_module.load_table(a, b, empty, storage="rows")
+    assert t.storage == "rows"
+    assert list(t.data) == list(_table(10).data) + list(_table(5).data)
+
+
+def test_not_a_binary_table(tmp_path):
+    path = tmp_path / "t.bin"
+    path.write_bytes(b"id,name\n1,a\n")
+    with pytest.raises(StructureMismatchError):
+        binary_module.load_table(str(path))
@@ -0,0 +1,22 @@
+import pytest
+from columns import Category, DictColumn
+from table import Table
+
+
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+def test_compare_view_of_category_column(storage):
+    t = Table(columns=["c"], data=[["b"], [None], ["a"]], types={"c": Category}, storage=storage)
+    view = t.filter_rows(t.ne(None, "c"))
+    assert list(view.gr("a", "c")) == [True, False]
+    assert list(view.eq("a", "c")) == [False, True]
+    with pytest.raises(TypeError):
+        t.gr("a", "c")
+
+
+def test_category_column_is_dictionary_encoded():
+    t = Table(columns=["c"], data=[["x"], ["y"], ["x"], [None]], types={"c": Category}, storage="columns")
+    col = t._store.cols[0]
+    assert isinstance(col, DictColumn)
+    assert col.dictionary == ["x", "y", None]
+    assert t.get_values("c") == ["x", "y", "x", None]
+    assert list(t.eq("x", "c")) == [True, False, True, False]
@@ -0,0 +1,26 @@
+from columns import Column, FloatColumn, IntColumn, make_column
+from table import Table
+
+
+def test_append_int_to_float_column_keeps_typed_buffer():
+    t = Table(columns=["x"], data=[[1.0], [2.0]], types={"x": float}, storage="columns")
+    t.append_rows([[3]])
+    col = t._store.cols[0]
+    assert isinstance(col, FloatColumn)
+    assert t.get_values("x") == [1.0, 2.0, 3.0]
+    assert all(type(v) is float for v in t.get_values("x"))
+
+
+def test_float_column_accepts_ints():
+    col = make_column(float, [1, 2.5])
+    assert isinstance(col, FloatColumn) and col.tolist() == [1.0, 2.5]
+    col[0] = 7
+    assert col[0] == 7.0 and type(col[0]) is float
+    assert not IntColumn.accepts([1.5])
+    assert not FloatColumn.accepts([True])
+
+
+def test_column_slice():
+    col = Column(list(range(10)))
+    assert col[2:5] == [2, 3, 4]
+    assert col[::3] == [0, 3, 6, 9]
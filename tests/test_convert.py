@@ -0,0 +1,66 @@
+import pytest
+from columns import Category, FloatColumn
+from convert import check_values, convert_values
+from exceptions import InvalidColumnError, TableException, TypeConversionError
+from table import Table
+
+
+def _table(storage):
+    return Table(columns=["a", "b"], data=[["1", "x"], ["bad", "y"], ["3", "z"], ["", "w"]], storage=storage)
+
+
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+def test_raise_collects_all_failures(storage):
+    t = _table(storage)
+    with pytest.raises(TypeConversionError) as info:
+        t.set_column_types({"a": int}, by_number=False)
+    assert info.value.failures == [(1, "bad"), (3, "")]
+    assert "строка 1: 'bad'" in str(info.value)
+    assert t.types["a"] is str and t.get_values("a") == ["1", "bad", "3", ""]
+
+
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+def test_null_default_and_skip(storage):
+    t = _table(storage)
+    t.set_column_types({0: int}, errors="null")
+    assert t.get_values("a") == [1, None, 3, None]
+    t = _table(storage)
+    t.set_column_types({0: int}, errors="default", default=-1)
+    assert t.get_values("a") == [1, -1, 3, -1]
+    t = _table(storage)
+    t.set_column_types({0: int}, errors="skip")
+    assert list(t.data) == [[1, "x"], [3, "z"]]
+
+
+def test_skip_removes_failures_of_all_columns():
+    t = Table(columns=["a", "b"], data=[["1", "1.5"], ["x", "2"], ["3", "y"], ["4", "4"]])
+    t.set_column_types({"a": int, "b": float}, by_number=False, errors="skip")
+    assert list(t.data) == [[1, 1.5], [4, 4.0]]
+    assert t.types == {"a": int, "b": float}
+
+
+def test_errors_and_unknown_columns():
+    t = _table("rows")
+    with pytest.raises(TableException):
+        t.set_column_types({0: int}, errors="ignore")
+    with pytest.raises(InvalidColumnError):
+        t.set_column_types({5: int})
+    with pytest.raises(InvalidColumnError):
+        t.set_column_types({"c": int}, by_number=False)
+
+
+def test_convert_values_fast_paths():
+    values, failures = convert_values(["True", "no", "1", 0], bool)
+    assert values == [True, False, True, False] and failures == []
+    ints = Table(columns=["a"], data=[[1], [2]], types={"a": int}, storage="columns")._store.cols[0]
+    assert convert_values(ints, int)[0] is ints
+    floats, _ = convert_values(ints, float)
+    assert isinstance(floats, FloatColumn) and list(floats) == [1.0, 2.0]
+    cats, _ = convert_values(["a", None, "a"], Category)
+    assert cats == ["a", None, "a"] and cats[0] is cats[2]
+
+
+def test_check_values():
+    assert check_values([1, 2, None], int) == []
+    assert check_values([1, 2.5, "3"], float, start=10) == [(12, "3")]
+    assert check_values(["a", 1], Category) == [(1, 1)]
@@ -0,0 +1,78 @@
+import gzip
+import pytest
+import csv_module
+from exceptions import StructureMismatchError, TableException
+
+
+def _write(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write("id,text\n")
+        for i, text in rows:
+            f.write(f'{i},"{text}"\n')
+
+
+def test_split_file_skips_quoted_newlines(tmp_path):
+    path = str(tmp_path / "q.csv")
+    _write(path, [(i, 'строка\nс переводом, и ""кавычкой""' if i % 3 else "x") for i in range(200)])
+    for start, end in csv_module._split_file(path, 64):
+        with open(path, "rb") as f:
+            f.seek(start)
+            assert f.read(end - start).count(b'"') % 2 == 0
+
+
+def test_parallel_load_with_quoted_newlines(tmp_path):
+    path = str(tmp_path / "q.csv")
+    _write(path, [(i, f"a{i}\nb\n" if i % 2 else f"c{i}") for i in range(300)])
+    serial = csv_module.load_table(path, types={"id": int, "text": str})
+    parallel = csv_module.load_table(path, types={"id": int, "text": str}, workers=2, chunk_bytes=100)
+    assert parallel.num_rows == 300
+    assert list(parallel.data) == list(serial.data)
+
+
+def _write_plain(path, start, n, opener=open):
+    with opener(path, "wt", newline="", encoding="utf-8") as f:
+        f.write("id,name,score\n")
+        for i in range(start, start + n):
+            f.write(f"{i},n{i},{i / 2}\n")
+
+
+def test_iter_table_chunks_streams_fixed_size_chunks(tmp_path):
+    a, b = str(tmp_path / "a.csv"), str(tmp_path / "b.csv.gz")
+    _write_plain(a, 0, 25)
+    _write_plain(b, 25, 10, opener=gzip.open)
+    chunks = list(csv_module.iter_table_chunks(a, b, chunk_rows=10, types={"id": int, "score": float}))
+    assert [c.num_rows for c in chunks] == [10, 10, 5, 10]
+    assert [v for c in chunks for v in c.get_values("id")] == list(range(35))
+    assert chunks[0].types == {"id": int, "name": str, "score": float}
+
+
+def test_iter_table_chunks_columns_rows_and_detect(tmp_path):
+    path = str(tmp_path / "a.csv")
+    _write_plain(path, 0, 30)
+    chunks = list(csv_module.iter_table_chunks(path, chunk_rows=8, columns=["score", "id"], rows=(5, 20),
+                                               detect_types=True))
+    assert [c.num_rows for c in chunks] == [8, 7]
+    assert all(c.columns == ["score", "id"] for c in chunks)
+    assert chunks[0].get_values("id") == list(range(5, 13))
+    assert chunks[0].types == {"score": float, "id": int}
+
+
+def test_iter_table_chunks_errors(tmp_path):
+    a, b = str(tmp_path / "a.csv"), str(tmp_path / "b.csv")
+    _write_plain(a, 0, 3)
+    with open(b, "w") as f:
+        f.write("x,y\n1,2\n")
+    with pytest.raises(TableException):
+        list(csv_module.iter_table_chunks(a, chunk_rows=0))
+    with pytest.raises(StructureMismatchError):
+        list(csv_module.iter_table_chunks(a, b))
+
+
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+def test_load_table_joins_chunks(tmp_path, storage):
+    a, b = str(tmp_path / "a.csv"), str(tmp_path / "b.csv")
+    _write_plain(a, 0, 23)
+    _write_plain(b, 23, 4)
+    t = csv_module.load_table(a, b, chunk_rows=5, types={"id": int, "score": float}, storage=storage)
+    assert t.storage == storage and t.num_rows == 27
+    assert list(t.data) == [[i, f"n{i}", i / 2] for i in range(27)]
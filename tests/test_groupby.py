@@ -0,0 +1,48 @@
+import pytest
+from columns import Category
+from exceptions import TableException
+from table import Table
+
+
+@pytest.mark.parametrize("t", [str, Category, object])
+def test_sum_rejects_non_numeric_columns(t):
+    table = Table(columns=["k", "v"], data=[["a", "x"], ["b", "y"]], types={"k": str, "v": t})
+    with pytest.raises(TableException):
+        table.group_by("k").agg({"v": "sum"})
+    with pytest.raises(TableException):
+        table.group_by("k").agg({"v": "mean"})
+
+
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+def test_typed_and_list_columns_give_same_aggregates(storage):
+    data = [[i % 3, i, i * 0.5, i % 2 == 0] for i in range(20)] + [[0, None, None, None]]
+    types = {"k": int, "i": int, "f": float, "b": bool}
+    table = Table(columns=["k", "i", "f", "b"], data=data, types=types, storage=storage)
+    spec = {"i": ["sum", "count", "mean", "min"], "f": ["sum", "count", "max"], "b": ["sum", "size"]}
+    result = table.group_by("k").agg(spec)
+    chunked = table.group_by("k").agg(spec, chunk_rows=7)
+    expected = [
+        [0, 63, 7, 9.0, 0, 31.5, 7, 9.0, 4, 8],
+        [1, 70, 7, 10.0, 1, 35.0, 7, 9.5, 3, 7],
+        [2, 57, 6, 9.5, 2, 28.5, 6, 8.5, 3, 6],
+    ]
+    assert list(result.data) == expected
+    assert list(chunked.data) == expected
+
+
+def test_sum_of_large_ints_is_exact():
+    big = 2 ** 62
+    table = Table(columns=["k", "v"], data=[[1, big], [1, big], [1, big]], types={"k": int, "v": int},
+                  storage="columns")
+    assert table.group_by("k").agg({"v": "sum"}).get_values("v_sum") == [3 * big]
+
+
+def test_dense_columns_match_python_lists():
+    data = [[i % 4, i * 3 - 20, i / 4, i % 3 == 0] for i in range(50)]
+    types = {"k": int, "i": int, "f": float, "b": bool}
+    spec = {"i": ["sum", "count", "mean"], "f": ["sum", "mean"], "b": ["sum", "count", "size"]}
+    rows = Table(columns=["k", "i", "f", "b"], data=data, types=types).group_by("k").agg(spec)
+    cols = Table(columns=["k", "i", "f", "b"], data=data, types=types, storage="columns")
+    assert list(cols.group_by("k").agg(spec).data) == list(rows.data)
+    assert list(cols.group_by("k").agg(spec, chunk_rows=9).data) == list(rows.data)
+
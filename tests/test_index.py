@@ -0,0 +1,91 @@
+import pytest
+from table import Table
+
+
+DATA = [
+    [3, None, 1, 2, None, 3],
+    [3, 1, 2, 3],
+    [1, 2, 2, 3],
+]
+
+
+def _table(values):
+    return Table(columns=["x"], data=[[v] for v in values], types={"x": int})
+
+
+@pytest.mark.parametrize("values", DATA)
+@pytest.mark.parametrize("op", ["eq", "gr", "ge", "ls", "le", "ne"])
+@pytest.mark.parametrize("value", [0, 1, 2, 3, 4, None])
+def test_sorted_index_does_not_change_compare(values, op, value):
+    plain = _table(values)
+    indexed = _table(values)
+    indexed.create_sorted_index("x")
+    try:
+        expected = list(getattr(plain, op)(value, "x"))
+    except TypeError:
+        with pytest.raises(TypeError):
+            getattr(indexed, op)(value, "x")
+        return
+    assert list(getattr(indexed, op)(value, "x")) == expected
+
+
+def test_eq_none_with_sorted_index():
+    t = Table(columns=["x"], data=[[1], [None], [2]], types={"x": int})
+    t.create_sorted_index("x")
+    assert list(t.eq(None, "x")) == [False, True, False]
+
+
+@pytest.mark.parametrize("values", DATA)
+@pytest.mark.parametrize("low, high", [(1, 2), (0, 5), (3, 3), (2, 1), (None, 2), (1, None)])
+def test_sorted_index_does_not_change_between(values, low, high):
+    plain = _table(values)
+    indexed = _table(values)
+    indexed.create_sorted_index("x")
+    try:
+        expected = list(plain.between(low, high, "x"))
+    except TypeError:
+        with pytest.raises(TypeError):
+            indexed.between(low, high, "x")
+        return
+    assert list(indexed.between(low, high, "x")) == expected
+
+
+NAN = float("nan")
+FLOAT_DATA = [
+    [1.0, NAN, 0.0],
+    [NAN, 0.5, 2.0, NAN, 1.5],
+    [0.0, 1.0, 2.0],
+]
+
+
+def _float_table(values):
+    return Table(columns=["x"], data=[[v] for v in values], types={"x": float})
+
+
+@pytest.mark.parametrize("values", FLOAT_DATA)
+@pytest.mark.parametrize("op", ["eq", "gr", "ge", "ls", "le", "ne"])
+@pytest.mark.parametrize("value", [0.5, 1.0, -1.0, 3.0, NAN])
+def test_sorted_index_with_nan(values, op, value):
+    plain = _float_table(values)
+    indexed = _float_table(values)
+    indexed.create_sorted_index("x")
+    assert list(getattr(indexed, op)(value, "x")) == list(getattr(plain, op)(value, "x"))
+
+
+def test_get_rows_by_range_skips_nan():
+    t = _float_table([1.0, NAN, 0.0])
+    assert t.get_rows_by_range(0.5, None).get_values("x") == [1.0]
+    assert t.get_rows_by_range(None, None).get_values("x") == [1.0, 0.0]
+    assert list(t.gr(0.5, "x")) == [True, False, False]
+
+
+@pytest.mark.parametrize("low, high", [(0.5, None), (None, 1.0), (None, None), (0.0, 1.0)])
+@pytest.mark.parametrize("with_index", [False, True])
+def test_between_matches_get_rows_by_range(low, high, with_index):
+    t = _float_table([1.0, NAN, 0.0, 2.0])
+    if with_index:
+        t.create_sorted_index("x")
+    expected = set(map(tuple, t.get_rows_by_range(low, high, "x").data))
+    mask = t.between(low, high, "x")
+    assert set(map(tuple, t.filter_rows(mask).data)) == expected
+
@@ -0,0 +1,92 @@
+import datetime
+import decimal
+import pytest
+import inference
+from inference import DateDetector, DecimalDetector, TypeDetector, infer_detector, register_detector
+from table import Table
+
+
+def _detect(columns, storage="rows", **kwargs):
+    names = [f"c{j}" for j in range(len(columns))]
+    t = Table(columns=names, data=[list(row) for row in zip(*columns)], storage=storage)
+    t.detect_column_types(**kwargs)
+    return t
+
+
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+def test_default_order(storage):
+    t = _detect([["1", "0", "12"], ["1", "2.5", "-3"], ["yes", "No", "TRUE"], ["1", "x", "2"]], storage)
+    assert t.get_column_types() == {0: int, 1: float, 2: bool, 3: str}
+    assert t.get_values("c0") == [1, 0, 12]
+    assert t.get_values("c1") == [1.0, 2.5, -3.0]
+    assert t.get_values("c2") == [True, False, True]
+    assert t.get_values("c3") == ["1", "x", "2"]
+
+
+def test_null_values():
+    t = _detect([["1", "NA", ""], ["NA", "NA", "NA"]], null_values=["NA", ""])
+    # столбец только из пустых значений получает первый по приоритету тип
+    assert t.types == {"c0": int, "c1": int}
+    assert t.get_values("c0") == [1, None, None]
+    assert t.get_values("c1") == [None, None, None]
+
+
+def test_sample_falls_back_to_whole_column():
+    values = [str(i) for i in range(100)]
+    values[51] = "2.5"
+    t = _detect([values], sample=10)
+    assert t.types == {"c0": float}
+    assert t.get_values("c0")[51] == 2.5
+
+
+def test_custom_detectors():
+    t = _detect([["2024-01-02", "2023-12-31"], ["1.10", "2.25"]],
+                detectors=[DateDetector(), DecimalDetector()])
+    assert t.get_values("c0") == [datetime.date(2024, 1, 2), datetime.date(2023, 12, 31)]
+    assert t.get_values("c1") == [decimal.Decimal("1.10"), decimal.Decimal("2.25")]
+
+
+def test_infer_detector_single_pass():
+    checked = []
+
+    class Recording(TypeDetector):
+        type = int
+
+        def parse(self, s):
+            checked.append(s)
+            return int(s)
+
+    assert infer_detector(["1", "a", "2", "3"], [Recording()]) is None
+    # после первого неподходящего значения детектор больше не вызывается
+    assert checked == ["1", "a"]
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+    def __eq__(self, other):
+        return (self.x, self.y) == (other.x, other.y)
+
+
+class PointDetector(TypeDetector):
+    type = Point
+
+    def parse(self, s):
+        x, sep, y = s.partition(";")
+        if not sep:
+            raise ValueError(f"Не точка: {s}")
+        return Point(int(x), int(y))
+
+
+def test_register_default_detector(monkeypatch):
+    monkeypatch.setattr(inference, "_DETECTORS_BY_TYPE", dict(inference._DETECTORS_BY_TYPE))
+    detector = PointDetector()
+    register_detector(detector, default=True)
+    try:
+        assert inference.detector_for(Point) is detector
+        t = _detect([["1;2", "3;4"], ["1", "2"]])
+        assert t.types == {"c0": Point, "c1": int}
+        assert t.get_values("c0") == [Point(1, 2), Point(3, 4)]
+    finally:
+        inference.DEFAULT_DETECTORS.remove(detector)
@@ -0,0 +1,56 @@
+import random
+import pytest
+from table import Table
+
+HOWS = ["inner", "left", "outer", "semi", "anti"]
+
+
+def _rows(table):
+    # outer при слиянии дает несопоставленные строки правой таблицы по порядку ключей
+    return sorted(map(tuple, table.data), key=repr)
+
+
+def _join_both(left, right, how, on="k"):
+    hashed = left.join(right, on, how=how)
+    merged = left.join(right, on, how=how, sort_merge=True)
+    assert merged.columns == hashed.columns
+    if how == "outer":
+        assert _rows(merged) == _rows(hashed)
+    else:
+        assert list(merged.data) == list(hashed.data)
+    return hashed
+
+
+@pytest.mark.parametrize("how", HOWS)
+def test_sort_merge_matches_hash_join_on_sorted_keys(how):
+    rnd = random.Random(how)
+    left = Table(columns=["k", "a"], data=sorted([[rnd.randint(0, 9), i] for i in range(40)]),
+                 types={"k": int, "a": int})
+    right = Table(columns=["k", "b"], data=sorted([[rnd.randint(0, 9), i] for i in range(30)]),
+                  types={"k": int, "b": int})
+    _join_both(left, right, how)
+
+
+@pytest.mark.parametrize("how", HOWS)
+def test_sort_merge_unsorted_keys(how):
+    left = Table(columns=["k", "a"], data=[[3, 0], [1, 1], [2, 2]], types={"k": int, "a": int})
+    right = Table(columns=["k", "b"], data=[[2, 0], [3, 1], [1, 2]], types={"k": int, "b": int})
+    result = _join_both(left, right, how)
+    if how == "inner":
+        assert result.num_rows == 3
+
+
+@pytest.mark.parametrize("how", HOWS)
+def test_sort_merge_none_keys(how):
+    left = Table(columns=["k", "a"], data=[[None, 0], [1, 1], [2, 2]], types={"k": int, "a": int})
+    right = Table(columns=["k", "b"], data=[[None, 0], [2, 1]], types={"k": int, "b": int})
+    result = _join_both(left, right, how)
+    if how == "inner":
+        assert list(result.data) == [[None, 0, 0], [2, 2, 1]]
+
+
+def test_sort_merge_multi_column_keys():
+    left = Table(columns=["k", "m", "a"], data=[[1, "x", 0], [1, "y", 1], [2, "x", 2]])
+    right = Table(columns=["k", "m", "b"], data=[[1, "y", 0], [2, "x", 1], [0, "z", 2]])
+    for how in HOWS:
+        _join_both(left, right, how, on=["k", "m"])
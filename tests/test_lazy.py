@@ -0,0 +1,57 @@
+import pytest
+import csv_module
+from lazy import col, scan_csv, LazyFrame
+from table import Table
+
+
+def _table():
+    return Table(columns=["id", "amount", "city"],
+                 data=[["1", "10", "a"], ["2", "200", "b"], ["3", "30", "a"]])
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = str(tmp_path / "sales.csv")
+    csv_module.save_table(_table(), path)
+    return path
+
+
+def test_cast_then_select_csv(csv_path):
+    result = scan_csv(csv_path).cast({"amount": int, "id": int}).select("amount").collect()
+    assert result.columns == ["amount"]
+    assert result.get_values("amount") == [10, 200, 30]
+
+
+def test_cast_then_select_table():
+    result = LazyFrame(_table()).cast({"amount": int, "id": int}).select("amount").collect()
+    assert result.columns == ["amount"]
+    assert result.get_values("amount") == [10, 200, 30]
+
+
+def test_cast_filter_select(csv_path):
+    frame = scan_csv(csv_path).cast({"amount": int, "id": int}).filter(col("id") > 1).select("amount")
+    assert frame.collect().get_values("amount") == [200, 30]
+
+
+def _pair():
+    left = Table(columns=["k", "x", "y"], data=[[1, "a", "p"], [2, "b", "q"]], types={"k": int, "x": str, "y": str})
+    right = Table(columns=["k", "x", "z"], data=[[1, "c", "r"], [2, "d", "s"]], types={"k": int, "x": str, "z": str})
+    return left, right
+
+
+def test_join_then_select_suffixed_column():
+    left, right = _pair()
+    result = LazyFrame(left).join(right, "k").select("k", "x_right").collect()
+    eager = left.join(right, "k").select("k", "x_right")
+    assert result.columns == ["k", "x_right"]
+    assert list(result.data) == list(eager.data) == [[1, "c"], [2, "d"]]
+
+
+def test_join_schema_and_pruning():
+    left, right = _pair()
+    frame = LazyFrame(left).join(right, "k").select("z", "x")
+    assert LazyFrame(left).join(right, "k").schema() == left.join(right, "k").columns
+    columns, _, _ = frame.optimize()
+    assert "y" not in columns
+    assert list(frame.collect().data) == [["r", "a"], ["s", "b"]]
+
@@ -0,0 +1,76 @@
+import pytest
+import mask
+from columns import make_column
+from exceptions import BoolListLengthError
+from mask import Mask, compare_column
+from table import Table
+
+A = [True, False, True, True, False]
+B = [False, False, True, False, True]
+
+
+@pytest.fixture(params=["numpy", "bytearray"])
+def backend(request, monkeypatch):
+    # обе реализации маски: без numpy - bytearray из 0/1
+    if request.param == "numpy":
+        if mask.np is None:
+            pytest.skip("numpy не установлен")
+    else:
+        monkeypatch.setattr(mask, "np", None)
+    return request.param
+
+
+def test_bitwise_operations(backend):
+    a, b = Mask.from_bools(A), Mask.from_bools(B)
+    assert (a & b) == [x and y for x, y in zip(A, B)]
+    assert (a | b) == [x or y for x, y in zip(A, B)]
+    assert (a ^ b) == [x != y for x, y in zip(A, B)]
+    assert ~a == [not x for x in A]
+    # со списком bool с любой стороны
+    assert (a & B) == (B & a) == (a & b)
+    assert (a | B).count() == 4
+
+
+def test_list_like_behaviour(backend):
+    a = Mask.from_bools(A)
+    assert len(a) == 5 and list(a) == A and a.tolist() == A
+    assert a[0] is True and a[1] is False and a[1:3] == A[1:3]
+    assert a.count() == 3 and a.positions() == [0, 2, 3]
+    assert a.any() and not a.all()
+    assert Mask.full(3, True).all() and not Mask.full(3, False).any()
+    assert repr(Mask.from_bools([True])) == "Mask([True])"
+
+
+def test_from_positions(backend):
+    assert Mask.from_positions(6, [1, 4]) == [False, True, False, False, True, False]
+    assert Mask.from_positions(6, range(2, 5)) == [False, False, True, True, True, False]
+    assert Mask.from_positions(3, []).count() == 0
+
+
+def test_length_mismatch(backend):
+    with pytest.raises(BoolListLengthError):
+        Mask.from_bools(A) & [True]
+
+
+@pytest.mark.parametrize("t, values, other", [
+    (int, [3, 1, 4, 1, 5], 3),
+    (float, [0.5, 2.5, -1.0], 0.5),
+    (str, ["b", "a", "c"], "b"),
+    (bool, [True, False, True], True),
+])
+def test_compare_column_matches_operators(backend, t, values, other):
+    col = make_column(t, values)
+    for name, op in mask.OPERATORS.items():
+        assert compare_column(col, other, name) == [op(v, other) for v in values]
+        assert compare_column(values, other, name) == [op(v, other) for v in values]
+
+
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+def test_table_comparisons_return_masks(backend, storage):
+    t = Table(columns=["a", "b"], data=[[i, str(i % 3)] for i in range(10)],
+              types={"a": int, "b": str}, storage=storage)
+    m = t.ge(4, "a") & ~t.eq("0", "b")
+    assert isinstance(m, Mask)
+    assert m.positions() == [4, 5, 7, 8]
+    assert t.filter_rows(m).get_values("a") == [4, 5, 7, 8]
+    assert t.eq([i % 2 for i in range(10)], "a").positions() == [0, 1]
@@ -0,0 +1,41 @@
+import parallel
+from table import Table
+
+
+def test_parallel_context_restores_settings():
+    min_rows = parallel.MIN_ROWS
+    with parallel.parallel(workers=2, min_rows=10):
+        assert parallel.is_enabled() and parallel.MIN_ROWS == 10
+    assert not parallel.is_enabled()
+    assert parallel.MIN_ROWS == min_rows
+
+
+def test_parallel_context_restores_enabled_mode():
+    min_rows = parallel.MIN_ROWS
+    parallel.enable(workers=3, min_rows=50)
+    try:
+        with parallel.parallel(workers=2, min_rows=10):
+            pass
+        assert parallel.is_enabled() and parallel._workers == 3
+        assert parallel.MIN_ROWS == 50
+    finally:
+        parallel.disable()
+        parallel.MIN_ROWS = min_rows
+
+
+def _empty():
+    return Table(columns=["a", "b"], data=[], types={"a": str, "b": str})
+
+
+def test_parallel_empty_column():
+    serial = _empty()
+    serial.detect_column_types()
+    expected_types = dict(serial.types)
+    with parallel.parallel(workers=2, min_rows=0):
+        t = _empty()
+        assert list(t.gr("x", "a")) == []
+        t.detect_column_types()
+        assert t.types == expected_types
+        t.set_column_types({"b": int}, by_number=False)
+        assert t.num_rows == 0 and t.types["b"] is int
+
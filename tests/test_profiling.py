@@ -0,0 +1,22 @@
+import profiling
+from table import Table
+
+
+def test_compare_records_selected_rows():
+    t = Table(columns=["a"], data=[[i] for i in range(10)], types={"a": int})
+    with profiling.profile() as prof:
+        t.gr(6, "a")
+        t.filter_rows(t.ls(3, "a"))
+    compare = prof.stats["Table.compare"]
+    assert compare["calls"] == 2
+    assert compare["rows_in"] == 20
+    assert compare["rows_out"] == 3 + 3
+    assert prof.stats["Table.filter_rows"]["rows_out"] == 3
+
+
+def test_profiling_disabled_by_default():
+    t = Table(columns=["a"], data=[[1]], types={"a": int})
+    with profiling.profile() as prof:
+        pass
+    t.gr(0, "a")
+    assert prof.stats == {}
@@ -0,0 +1,54 @@
+import pytest
+from exceptions import SchemaError
+from schema import EXTRA, MISSING
+from table import Table
+
+
+def test_from_records_partial_types_keeps_other_columns():
+    t = Table.from_records([{"a": "1", "b": "x"}, {"a": 2, "b": "y"}], types={"a": int})
+    assert t.columns == ["a", "b"]
+    assert t.types == {"a": int, "b": str}
+    assert list(t.data) == [[1, "x"], [2, "y"]]
+
+
+def test_from_records_columns_from_all_records():
+    t = Table.from_records([{"a": 1, "b": "x"}, {"a": 2, "b": "y", "c": 1.5}], errors="null")
+    assert t.columns == ["a", "b", "c"]
+    assert list(t.data) == [[1, "x", None], [2, "y", 1.5]]
+
+
+def test_from_records_reports_key_errors():
+    records = [{"a": 1}, {"a": 2, "b": "x"}, {"b": "y", "c": 3}]
+    with pytest.raises(SchemaError) as info:
+        Table.from_records(records, columns=["a", "b"])
+    assert info.value.errors == [(0, "b", MISSING), (2, "a", MISSING), (2, "c", EXTRA)]
+
+
+def test_from_records_skips_bad_records():
+    t = Table.from_records([{"a": 1}, {"a": 2, "b": "x"}], columns=["a", "b"], errors="skip")
+    assert list(t.data) == [[2, "x"]]
+
+
+def test_from_arrays_uint64_out_of_int64_range():
+    np = pytest.importorskip("numpy")
+    big = 2 ** 63 + 5
+    t = Table.from_arrays([np.array([1, big], dtype=np.uint64)], columns=["x"])
+    assert t.get_values("x") == [1, big]
+    t = Table.from_arrays([np.array([1, 2], dtype=np.uint64)], columns=["x"])
+    assert t.get_values("x") == [1, 2]
+
+
+def test_from_arrays_unsigned_array_out_of_int64_range():
+    from array import array
+    big = 2 ** 64 - 1
+    t = Table.from_arrays([array("Q", [1, big])], columns=["x"])
+    assert t.get_values("x") == [1, big]
+
+
+def test_from_columns_collects_conversion_errors():
+    with pytest.raises(SchemaError) as info:
+        Table.from_columns({"a": ["1", 2, "x", None, "y"]}, types={"a": int})
+    assert info.value.errors == [(2, "a", "x"), (4, "a", "y")]
+    t = Table.from_columns({"a": ["1", 2, "x", None]}, types={"a": int}, errors="null")
+    assert t.get_values("a") == [1, 2, None, None]
+
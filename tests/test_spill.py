@@ -0,0 +1,121 @@
+import random
+import pytest
+import csv_module
+import spill
+from spill import SpillStore, join_spilled, sort_store
+from storage import RowStore
+from table import Table
+
+COLUMNS = ["k", "a", "s"]
+TYPES = {"k": int, "a": int, "s": str}
+
+
+def _rows(n, seed=0, nulls=True):
+    rnd = random.Random(seed)
+    keys = [None] + list(range(20)) if nulls else list(range(20))
+    return [[rnd.choice(keys), i, f"s{i % 7}"] for i in range(n)]
+
+
+def _spill(rows, chunk_rows=100):
+    store = SpillStore([TYPES[c] for c in COLUMNS], chunk_rows)
+    store.extend(RowStore(rows))
+    return Table._from_store(list(COLUMNS), store, dict(TYPES))
+
+
+@pytest.fixture
+def small_budget(monkeypatch):
+    # несколько серий сортировки и частей соединения даже на небольших таблицах
+    monkeypatch.setattr(spill, "MEMORY_BUDGET", 2000)
+
+
+def test_multi_chunk_round_trip():
+    rows = _rows(1050)
+    t = _spill(rows)
+    assert len(t._store._chunks) == 11
+    assert t.num_rows == 1050
+    assert list(t.data) == rows
+    assert t.get_values("a") == list(range(1050))
+    part = t.get_rows_by_number(95, 305)
+    assert list(part.data) == rows[95:305]
+
+
+def test_append_fills_last_chunk():
+    t = _spill(_rows(150))
+    extra = _rows(130, seed=1)
+    t.append_rows(extra[:30])
+    t.append_rows(extra[30:])
+    assert [n for n, _ in t._store._chunks] == [100, 100, 80]
+    assert list(t.data) == _rows(150) + extra
+    other = _spill(_rows(50, seed=2))
+    t.extend(other)
+    assert t.num_rows == 330 and list(t.data)[280:] == _rows(50, seed=2)
+
+
+def test_compare_and_filter_across_chunks():
+    rows = _rows(450, nulls=False)
+    t = _spill(rows)
+    mask = t.gr(10, "k")
+    assert mask.count() == sum(1 for r in rows if r[0] > 10)
+    filtered = t.filter_rows(mask)
+    assert list(filtered.data) == [r for r in rows if r[0] > 10]
+
+
+def test_external_sort_matches_in_memory(small_budget):
+    rows = _rows(800)
+    t = _spill(rows)
+    memory = Table(columns=COLUMNS, data=rows, types=TYPES)
+    for reverse in (False, True, [False, True]):
+        columns = ("k", "s") if isinstance(reverse, list) else ("k",)
+        spilled = t.sort_by(*columns, reverse=reverse)
+        assert spilled.storage == "spill"
+        assert list(spilled.data) == list(memory.sort_by(*columns, reverse=reverse).data)
+
+
+def test_sort_store_writes_several_runs():
+    t = _spill(_rows(500))
+    key_rows = sorted(_rows(500), key=lambda r: (r[0] is None, r[0]))
+    out = sort_store(t._store, [0], [False], budget=1)
+    assert list(out.iter_rows()) == key_rows
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "outer", "semi", "anti"])
+def test_spilled_join_matches_in_memory(small_budget, how):
+    left_rows = _rows(400)
+    right_rows = [[k, k * 10] for k in range(0, 25, 2)] * 2
+    right = Table(columns=["k", "b"], data=right_rows, types={"k": int, "b": int})
+    memory = Table(columns=COLUMNS, data=left_rows, types=TYPES).join(right, "k", how=how)
+    spilled = _spill(left_rows).join(right, "k", how=how)
+    assert spilled.storage == "spill"
+    assert spilled.columns == memory.columns
+    assert sorted(map(tuple, spilled.data), key=repr) == sorted(map(tuple, memory.data), key=repr)
+
+
+def test_join_spilled_splits_into_parts():
+    left = _spill(_rows(300))
+    right = Table(columns=["k", "a"], data=[[k, -k] for k in range(20)], types={"k": int, "a": int})
+    columns, store, types = join_spilled(left, right, "k", budget=500)
+    assert columns == ["k", "a", "s", "a_right"]
+    expected = sorted(tuple(r) + (-r[0],) for r in _rows(300) if r[0] is not None)
+    assert sorted(map(tuple, store.iter_rows())) == expected
+
+
+def test_set_storage_round_trip():
+    rows = _rows(300)
+    t = Table(columns=COLUMNS, data=rows, types=TYPES, storage="columns")
+    t.set_storage("spill")
+    assert t.storage == "spill" and t._store.disk_bytes() > 0
+    assert list(t.data) == rows
+    t.set_storage("rows")
+    assert t.storage == "rows" and list(t.data) == rows
+
+
+def test_csv_load_to_spill(tmp_path):
+    path = str(tmp_path / "data.csv")
+    rows = _rows(250, nulls=False)
+    with open(path, "w") as f:
+        f.write("k,a,s\n")
+        for k, a, s in rows:
+            f.write(f"{k},{a},{s}\n")
+    t = csv_module.load_table(path, types={"k": int, "a": int, "s": str}, chunk_rows=40, storage="spill")
+    assert t.storage == "spill"
+    assert list(t.data) == rows
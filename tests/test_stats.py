@@ -0,0 +1,84 @@
+import random
+import pytest
+import binary_module
+from exceptions import TableException
+from stats import ColumnStats, decide
+from table import Table
+
+OPS = ["eq", "ne", "gr", "ge", "ls", "le"]
+
+
+def test_column_stats_values():
+    t = Table(columns=["a", "s"], data=[[3, "x"], [None, "y"], [1, "x"], [7, None]],
+              types={"a": int, "s": str})
+    s = t.column_stats("a")
+    assert (s.count, s.nulls, s.min, s.max, s.distinct, s.sorted) == (4, 1, 1, 7, 3, False)
+    assert t.column_stats("a") is s
+    assert t.column_stats("s").as_dict() == {"count": 4, "nulls": 1, "min": "x", "max": "y",
+                                             "distinct": 2, "sorted": False}
+
+
+def test_distinct_estimate_and_incomparable_values():
+    s = ColumnStats(list(range(20000)) * 2, block_rows=4096)
+    assert s.sorted is False
+    assert abs(s.distinct - 20000) < 20000 * 0.25
+    mixed = ColumnStats([1, "a", 2])
+    assert mixed.min is None and mixed.max is None and mixed.comparable is False
+
+
+def test_stats_follow_table_changes():
+    t = Table(columns=["a"], data=[[i] for i in range(10)], types={"a": int}, storage="columns")
+    assert t.column_stats("a").sorted
+    t.append_rows([[20], [5]])
+    s = t.column_stats("a")
+    assert (s.count, s.max, s.sorted) == (12, 20, False)
+    t.set_values(list(range(12)), "a")
+    assert t.column_stats("a").max == 11 and t.column_stats("a").sorted
+
+
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+@pytest.mark.parametrize("sort", [False, True])
+def test_compare_with_stats_matches_plain(storage, sort):
+    rnd = random.Random(storage)
+    values = [rnd.randint(0, 50) for _ in range(300)]
+    if sort:
+        values.sort()
+    t = Table(columns=["a"], data=[[v] for v in values], types={"a": int}, storage=storage)
+    plain = {op: list(getattr(t, op)(25, "a")) for op in OPS}
+    # мелкие блоки, чтобы часть из них решалась по min/max
+    t._stats["a"] = ColumnStats(t._store.column(0), block_rows=16)
+    for op in OPS:
+        assert list(getattr(t, op)(25, "a")) == plain[op]
+
+
+def test_decide():
+    assert decide("gr", 5, 6, 9, 0) is True
+    assert decide("gr", 5, 1, 5, 0) is False
+    assert decide("gr", 5, 1, 9, 0) is None
+    assert decide("gr", 5, 6, 9, 1) is None
+    assert decide("eq", 5, 6, 9, 1) is False
+    assert decide("eq", 5, 5, 5, 0) is True
+    assert decide("eq", "a", 1, 2, 0) is None
+
+
+def test_describe():
+    t = Table(columns=["a", "s"], data=[[1, "x"], [2, "y"]], types={"a": int, "s": str})
+    d = t.describe()
+    assert d.columns == ["column", "type", "count", "nulls", "distinct", "min", "max", "sorted"]
+    assert list(d.data) == [["a", "int", 2, 0, 2, 1, 2, True], ["s", "str", 2, 0, 2, "x", "y", True]]
+
+
+def test_binary_where_skips_groups(tmp_path, monkeypatch):
+    path = str(tmp_path / "t.bin")
+    t = Table(columns=["a", "b"], data=[[i, str(i)] for i in range(100)], types={"a": int, "b": str})
+    binary_module.save_table(t, path, block_rows=10)
+    decoded = []
+    decode = binary_module._decode_column
+    monkeypatch.setattr(binary_module, "_decode_column", lambda *args: decoded.append(1) or decode(*args))
+    loaded = binary_module.load_table(path, columns=["b"], where=[("a", "ge", 35), ("a", "ls", 52)])
+    assert loaded.columns == ["b"]
+    assert loaded.get_values("b") == [str(i) for i in range(35, 52)]
+    # прочитаны только группы 30-39, 40-49, 50-59 (по два столбца)
+    assert len(decoded) == 6
+    with pytest.raises(TableException):
+        binary_module.load_table(path, where=[("a", "like", 1)])
@@ -0,0 +1,35 @@
+from table import Table
+
+
+def _table(storage="rows"):
+    return Table(columns=["a"], data=[[1], [2], [3]], types={"a": int}, storage=storage)
+
+
+def test_table_from_view_data_is_writable():
+    view = _table().get_rows_by_number(1, 3)
+    t = Table(columns=view.columns, data=view.data, types=view.types)
+    t.set_values([7, 8], "a")
+    assert list(t.data) == [[7], [8]]
+    t.append_rows([[9]])
+    assert t.get_values("a") == [7, 8, 9]
+    assert view.get_values("a") == [2, 3]
+
+
+def test_data_setter_from_view():
+    source = _table()
+    t = _table()
+    t.data = source.get_rows_by_number(0, 2).data
+    t.set_values([5, 6], "a")
+    assert t.get_values("a") == [5, 6]
+    assert source.get_values("a") == [1, 2, 3]
+
+
+def test_copy_table_does_not_share_store():
+    for storage in ("rows", "columns"):
+        t = _table(storage)
+        copy = t.get_rows_by_number(0, 2, copy_table=True)
+        assert not t._store.shared
+        copy.set_values([0, 0], "a")
+        assert t.get_values("a") == [1, 2, 3]
+        assert copy.get_values("a") == [0, 0]
+
@@ -0,0 +1,86 @@
+import csv
+import gzip
+import pytest
+import csv_module
+import text_module
+from exceptions import TableException
+from table import Table
+
+
+def _table(storage="columns", names=None):
+    names = names or ["a", "b", "c"]
+    return Table(columns=["n", "name", "x"], data=[[i, names[i % len(names)], i / 2] for i in range(7)],
+                 types={"n": int, "name": str, "x": float}, storage=storage)
+
+
+def _read_csv(path, opener=open):
+    with opener(path, "rt", newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+@pytest.mark.parametrize("storage", ["rows", "columns"])
+@pytest.mark.parametrize("names", [None, ["plain", 'с "кавычкой"', "a,b", "две\nстроки"]])
+def test_csv_writer_matches_csv_module(tmp_path, storage, names):
+    # поколоночные куски без спецсимволов пишутся в обход csv.writer - результат тот же
+    path = str(tmp_path / "t.csv")
+    t = _table(storage, names)
+    csv_module.save_table(t, path, chunk_rows=3)
+    expected = [t.columns] + [[str(v) for v in row] for row in t.data]
+    assert _read_csv(path) == expected
+    loaded = csv_module.load_table(path, types=t.types, storage=storage)
+    assert list(loaded.data) == list(t.data)
+
+
+def test_csv_writer_gzip_and_stream(tmp_path):
+    src, path = str(tmp_path / "src.csv"), str(tmp_path / "out.csv.gz")
+    csv_module.save_table(_table(), src)
+    chunks = csv_module.iter_table_chunks(src, chunk_rows=2, types={"n": int})
+    csv_module.save_table(chunks, path, compression="gzip")
+    assert _read_csv(path, gzip.open) == _read_csv(src)
+    with pytest.raises(TableException):
+        csv_module.save_table(_table(), path, compression="zip")
+
+
+def test_csv_writer_row_lists_need_columns(tmp_path):
+    path = str(tmp_path / "t.csv")
+    csv_module.save_table([[[1, "a"]], [[2, "b"], [3, "c"]]], path, columns=["n", "s"])
+    assert _read_csv(path) == [["n", "s"], ["1", "a"], ["2", "b"], ["3", "c"]]
+    with pytest.raises(TableException):
+        csv_module.save_table([[[1, "a"]]], path)
+
+
+def test_text_writer_plain(tmp_path):
+    path = str(tmp_path / "t.txt")
+    t = Table(columns=["n", "s"], data=[[1, "a"], [22, "bb"]], types={"n": int, "s": str})
+    text_module.save_table(t, path, chunk_rows=1)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "n | s\n------\n1 | a\n22 | bb\n"
+
+
+def test_text_writer_aligned(tmp_path, capsys):
+    path = str(tmp_path / "t.txt.gz")
+    t = Table(columns=["n", "name"], data=[[1, "a"], [100, "bbb"]], types={"n": int, "name": str})
+    text_module.save_table(t, path, align=True, compression="gzip")
+    expected = ("n   | name\n"
+                "----------\n"
+                "  1 | a   \n"
+                "100 | bbb \n")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert f.read() == expected
+    t.print_table(align=True)
+    assert capsys.readouterr().out == expected
+
+
+def test_text_writer_stream_needs_widths(tmp_path):
+    path = str(tmp_path / "t.txt")
+    chunks = [_table().get_rows_by_number(0, 3), _table().get_rows_by_number(3, 7)]
+    with pytest.raises(TableException):
+        text_module.save_table(iter(chunks), path, align=True)
+    widths = text_module.column_widths(_table())
+    text_module.save_table(iter(chunks), path, widths=widths)
+    aligned = str(tmp_path / "aligned.txt")
+    text_module.save_table(_table(), aligned, align=True)
+    with open(path, encoding="utf-8") as f, open(aligned, encoding="utf-8") as g:
+        lines = f.read().splitlines()
+        assert len(lines) == 9
+        assert [len(line) for line in lines[2:]] == [len(line) for line in g.read().splitlines()[2:]]
@@ -1,7 +1,67 @@
-def save_table(table, file_path):
-    with open(file_path, 'w', encoding='utf-8') as f:
-        # Аналог print_table
-        f.write(" | ".join(table.columns) + "\n")
-        f.write("-" * (3 * len(table.columns)) + "\n")
-        for row in table.data:
-            f.write(" | ".join(str(x) for x in row) + "\n")
+from itertools import repeat
+from exceptions import TableException
+from output import open_output
+from profiling import instrumented
+from storage import chunk_stores
+
+# Текстовый вид таблицы (как print_table): заголовок, строка из "-" и строки
+# значений через " | ". Запись идет кусками: каждый столбец куска
+# форматируется целиком, и кусок пишется одним вызовом write.
+# align=True - столбцы выровнены по ширине (числа - по правому краю);
+# ширины считаются одним проходом по столбцам до записи.
+
+CHUNK_ROWS = 65536
+
+_RIGHT_ALIGNED = (int, float)
+
+
+def column_widths(table):
+    # Ширина каждого столбца: самое длинное из имени и значений
+    store = table._store
+    return [max(len(c), max(map(len, map(str, store.column(j))), default=0))
+            for j, c in enumerate(table.columns)]
+
+
+def _format_block(store, ncols, widths, right):
+    n = store.nrows()
+    if not ncols:
+        return "\n" * n
+    cols = []
+    for j in range(ncols):
+        col = map(str, store.column(j))
+        if widths is not None:
+            col = map(str.rjust if right[j] else str.ljust, col, repeat(widths[j]))
+        cols.append(col)
+    lines = "\n".join(map(" | ".join, zip(*cols)))
+    return lines + "\n" if n else ""
+
+
+def write_text(source, f, columns=None, align=False, widths=None, chunk_rows=CHUNK_ROWS):
+    # Запись в открытый текстовый файл f.
+    # source - таблица или итерируемое кусков (таблиц или списков строк), см. storage.chunk_stores
+    # widths - готовые ширины столбцов для выравнивания потока кусков
+    #   (для таблицы при align=True считаются сами)
+    columns, stores = chunk_stores(source, columns, chunk_rows)
+    right = [False] * len(columns)
+    if align and widths is None:
+        if not hasattr(source, "_store"):
+            raise TableException("Для выравнивания потока кусков нужны widths")
+        widths = column_widths(source)
+    if widths is not None:
+        types = getattr(source, "types", {})
+        right = [types.get(c) in _RIGHT_ALIGNED for c in columns]
+        header = " | ".join(c.ljust(w) for c, w in zip(columns, widths))
+        f.write(header + "\n" + "-" * len(header) + "\n")
+    else:
+        f.write(" | ".join(columns) + "\n" + "-" * (3 * len(columns)) + "\n")
+    for store in stores:
+        f.write(_format_block(store, len(columns), widths, right))
+
+
+@instrumented("text_module.save_table", io="write")
+def save_table(table, file_path, columns=None, align=False, widths=None, compression=None,
+               chunk_rows=CHUNK_ROWS):
+    # Аналог print_table в файл; table - таблица или итерируемое кусков (см. write_text)
+    # compression - None или "gzip"
+    with open_output(file_path, compression) as f:
+        write_text(table, f, columns=columns, align=align, widths=widths, chunk_rows=chunk_rows)